@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from solana.blockhash import Blockhash
+from solana.rpc.api import Client as SolanaClient
+from solana.rpc.commitment import Confirmed
+from solana.transaction import Transaction
+from typing import Dict, Optional, Tuple
+
+from ..environment import RECENT_BLOCKHASH_TTL, RECENT_BLOCKHASH_IDLE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class RecentBlockhashProvider:
+    """
+    Caches the recent blockhash for RECENT_BLOCKHASH_TTL seconds.
+
+    While the blockhash is requested, a background thread refreshes it twice per TTL, so senders don't wait for
+    the getRecentBlockhash round trip. The thread exits after RECENT_BLOCKHASH_IDLE_TIMEOUT seconds without requests.
+
+    A message signed again with the same blockhash gets the same signature, and the cluster drops it as a duplicate.
+    So sign() remembers recent signatures, and signs a message, which was already signed, with a newer blockhash.
+    """
+    # Blockhashes live for about 150 slots, signatures are remembered for longer
+    MAX_SIGNATURES = 65536
+    NEW_BLOCKHASH_TIMEOUT = 2.0
+    NEW_BLOCKHASH_CHECK_DELAY = 0.1
+
+    def __init__(self, client: SolanaClient, ttl: float, idle_timeout: float):
+        self._client = client
+        self._ttl = ttl
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._blockhash: Optional[Blockhash] = None
+        self._update_time = 0.0
+        self._request_time = 0.0
+        self._refresher: Optional[threading.Thread] = None
+        self._signatures: OrderedDict = OrderedDict()
+        self._resigned = 0
+
+    def get_blockhash(self, used: Optional[Blockhash] = None) -> Blockhash:
+        """Returns the recent blockhash, other than the used one if it is passed"""
+        with self._lock:
+            self._request_time = time.time()
+            self._start_refresher()
+            if (self._blockhash is None) or (self._request_time - self._update_time >= self._ttl):
+                self._set_blockhash(self._fetch_blockhash())
+            if self._blockhash != used:
+                return self._blockhash
+
+        deadline = time.time() + self.NEW_BLOCKHASH_TIMEOUT
+        while True:
+            blockhash = self._fetch_blockhash()
+            if (blockhash != used) or (time.time() >= deadline):
+                break
+            time.sleep(self.NEW_BLOCKHASH_CHECK_DELAY)
+        if blockhash == used:
+            logger.warning(f'No blockhash newer than {used} in {self.NEW_BLOCKHASH_TIMEOUT} seconds')
+        with self._lock:
+            self._set_blockhash(blockhash)
+        return blockhash
+
+    def sign(self, transaction: Transaction, signer, blockhash: Optional[Blockhash] = None) -> Blockhash:
+        """Signs the transaction by the blockhash or by the recent one, returns the blockhash used for it"""
+        if blockhash is None:
+            blockhash = self.get_blockhash()
+        while True:
+            transaction.recent_blockhash = blockhash
+            transaction.sign(signer)
+            signature = transaction.signature()
+            with self._lock:
+                is_new = signature not in self._signatures
+                if is_new:
+                    self._signatures[signature] = None
+                    if len(self._signatures) > self.MAX_SIGNATURES:
+                        self._signatures.popitem(last=False)
+                else:
+                    self._resigned += 1
+            if is_new:
+                return blockhash
+            new_blockhash = self.get_blockhash(used=blockhash)
+            if new_blockhash == blockhash:
+                return blockhash
+            blockhash = new_blockhash
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'signatures': len(self._signatures), 'resigned': self._resigned}
+
+    def invalidate(self, blockhash: Blockhash):
+        with self._lock:
+            if self._blockhash == blockhash:
+                logger.debug(f'Invalidate recent blockhash {blockhash}')
+                self._blockhash = None
+
+    def _fetch_blockhash(self) -> Blockhash:
+        blockhash_resp = self._client.get_recent_blockhash(commitment=Confirmed)
+        if not blockhash_resp["result"]:
+            raise RuntimeError("failed to get recent blockhash")
+        return Blockhash(blockhash_resp["result"]["value"]["blockhash"])
+
+    def _set_blockhash(self, blockhash: Blockhash):
+        self._blockhash = blockhash
+        self._update_time = time.time()
+
+    def _start_refresher(self):
+        if self._ttl <= 0 or self._refresher is not None:
+            return
+        self._refresher = threading.Thread(target=self._refresh, daemon=True)
+        self._refresher.start()
+
+    def _refresh(self):
+        while True:
+            time.sleep(self._ttl / 2)
+            with self._lock:
+                if time.time() - self._request_time > self._idle_timeout:
+                    self._refresher = None
+                    return
+            try:
+                blockhash = self._fetch_blockhash()
+            except Exception as err:
+                logger.warning(f'Failed to refresh recent blockhash: {err}')
+                continue
+            with self._lock:
+                self._set_blockhash(blockhash)
+
+
+_providers_lock = threading.Lock()
+_providers: Dict[Tuple[int, str], RecentBlockhashProvider] = {}
+
+
+def get_blockhash_provider(client: SolanaClient) -> RecentBlockhashProvider:
+    """Returns the blockhash provider, which is shared by all clients of the endpoint in the current process"""
+    key = (os.getpid(), str(client._provider.endpoint_uri))
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = RecentBlockhashProvider(client, RECENT_BLOCKHASH_TTL, RECENT_BLOCKHASH_IDLE_TIMEOUT)
+            _providers[key] = provider
+        return provider
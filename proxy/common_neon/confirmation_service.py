@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+
+from base58 import b58encode
+from concurrent.futures import Future, wait as wait_futures
+from solana.rpc.api import Client as SolanaClient
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .utils import send_rpc_batch_request
+from ..environment import CONFIRMATION_CHECK_DELAY, CONFIRMATION_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class ConfirmationService:
+    """
+    Waits for confirmations of signatures sent by all senders of the process.
+
+    Signatures of all waiting callers are checked together: each round sends one JSON-RPC batch of
+    getSignatureStatuses requests with up to batch_size signatures each, and resolves futures of signatures, which
+    are confirmed or finalized. Rounds are repeated every check_delay seconds by a background thread, which exits
+    when there is nothing to wait for.
+    """
+    def __init__(self, client: SolanaClient, batch_size: int, check_delay: float):
+        self._client = client
+        self._batch_size = batch_size
+        self._check_delay = check_delay
+        self._lock = threading.Lock()
+        # Signature -> (future, number of callers waiting for it)
+        self._pending: Dict[str, Tuple[Future, int]] = {}
+        self._poller: Optional[threading.Thread] = None
+        self._rounds = 0
+        self._requests = 0
+        self._errors = 0
+        self._confirmed = 0
+        self._max_pending = 0
+
+    def confirm(self, signatures: List[Union[str, bytes]], timeout: float) -> bool:
+        """Returns True if all signatures are confirmed, or False if the timeout expired before that"""
+        signatures = [b58encode(sign).decode('utf-8') if isinstance(sign, bytes) else sign for sign in signatures]
+        futures = self.watch(signatures)
+        try:
+            _, not_done = wait_futures(futures, timeout=timeout)
+            return not len(not_done)
+        finally:
+            self.unwatch(signatures)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'max_pending': self._max_pending,
+                'rounds': self._rounds,
+                'requests': self._requests,
+                'errors': self._errors,
+                'confirmed': self._confirmed,
+            }
+
+    def watch(self, signatures: List[str]) -> List[Future]:
+        """Returns futures resolved by statuses of confirmed signatures, each call must be followed by unwatch()"""
+        futures = []
+        with self._lock:
+            for sign in signatures:
+                future, count = self._pending.get(sign, (None, 0))
+                if future is None:
+                    future = Future()
+                self._pending[sign] = (future, count + 1)
+                futures.append(future)
+            self._max_pending = max(self._max_pending, len(self._pending))
+
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+        return futures
+
+    def unwatch(self, signatures: List[str]):
+        with self._lock:
+            for sign in signatures:
+                future, count = self._pending[sign]
+                if count > 1:
+                    self._pending[sign] = (future, count - 1)
+                else:
+                    del self._pending[sign]
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                signatures = [sign for sign, (future, _) in self._pending.items() if not future.done()]
+                if not len(signatures):
+                    self._poller = None
+                    return
+            self._check_signatures(signatures)
+            time.sleep(self._check_delay)
+
+    def _check_signatures(self, signatures: List[str]):
+        sign_lists = [signatures[i:i + self._batch_size] for i in range(0, len(signatures), self._batch_size)]
+        with self._lock:
+            self._rounds += 1
+            self._requests += len(sign_lists)
+
+        try:
+            response_list = send_rpc_batch_request(self._client, 'getSignatureStatuses', [(sign_list,) for sign_list in sign_lists])
+        except Exception as err:
+            with self._lock:
+                self._errors += 1
+            logger.warning(f'Failed to get statuses of {len(signatures)} signatures: {err}')
+            return
+
+        for sign_list, response in zip(sign_lists, response_list):
+            result = response.get('result')
+            if result is None:
+                with self._lock:
+                    self._errors += 1
+                logger.debug(f'Failed to get statuses of {len(sign_list)} signatures: {response}')
+                continue
+            for sign, status in zip(sign_list, result['value']):
+                if status is None or status.get('confirmationStatus') == 'processed':
+                    continue
+                self._resolve(sign, status)
+
+    def _resolve(self, sign: str, status: Dict[str, Any]):
+        with self._lock:
+            future, _ = self._pending.get(sign, (None, 0))
+            if future is None or future.done():
+                return
+            self._confirmed += 1
+        future.set_result(status)
+
+
+_services_lock = threading.Lock()
+_services: Dict[Tuple[int, str], ConfirmationService] = {}
+
+
+def get_confirmation_service(client: SolanaClient) -> ConfirmationService:
+    """Returns the confirmation service, which is shared by all clients of the endpoint in the current process"""
+    key = (os.getpid(), str(client._provider.endpoint_uri))
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = ConfirmationService(client, CONFIRMATION_BATCH_SIZE, CONFIRMATION_CHECK_DELAY)
+            _services[key] = service
+        return service
@@ -1,57 +1,204 @@
-import base58
-import psycopg2
+import logging
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
 
-from ..environment import EVM_LOADER_ID, WRITE_TRANSACTION_COST_IN_DB
-from ..indexer.sql_dict import POSTGRES_USER, POSTGRES_HOST, POSTGRES_DB, POSTGRES_PASSWORD
+from psycopg2.extras import execute_values
+from typing import Any, Dict, List, Optional, Tuple
+
+from .receipt_analyzer import ReceiptInfo
+from ..environment import WRITE_TRANSACTION_COST_IN_DB, OPERATOR_COST_QUEUE_SIZE, OPERATOR_COST_BATCH_SIZE, \
+    OPERATOR_COST_FLUSH_INTERVAL, OPERATOR_COST_QUEUE_TIMEOUT
+from ..indexer.pg_common import pg_pool
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# hash, cost, used_gas, sender, to_address, sig, status, reason
+CostRow = Tuple[Any, ...]
 
 class SQLCost():
     def __init__(self):
-
-        self.conn = psycopg2.connect(
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST
-        )
-
-        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        cur = self.conn.cursor()
-        cur.execute('''
-                CREATE TABLE IF NOT EXISTS OPERATOR_COST
-                (
-                    id SERIAL PRIMARY KEY,
-                    hash char(64),
-                    cost bigint,
-                    used_gas bigint,
-                    sender char(40),
-                    to_address char(40) ,
-                    sig char(100),
-                    status varchar(100),
-                    reason varchar(100)
-                )'''
-                    )
+        with pg_pool().cursor() as cur:
+            cur.execute('''
+                    CREATE TABLE IF NOT EXISTS OPERATOR_COST
+                    (
+                        id SERIAL PRIMARY KEY,
+                        hash char(64),
+                        cost bigint,
+                        used_gas bigint,
+                        sender char(40),
+                        to_address char(40) ,
+                        sig char(100),
+                        status varchar(100),
+                        reason varchar(100)
+                    )'''
+                        )
 
     def close(self):
-        self.conn.close()
+        pass
 
     def insert(self, hash, cost, used_gas, sender, to_address, sig, status, reason):
-        cur = self.conn.cursor()
-        cur.execute('''
-                INSERT INTO OPERATOR_COST (hash, cost, used_gas, sender, to_address, sig, status, reason)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-            ''',
-            (hash, cost, used_gas, sender, to_address, sig, status, reason)
-        )
-
-
-operator_cost = SQLCost()
-
-
-def update_transaction_cost(receipt, eth_trx, extra_sol_trx=False, reason=None):
+        self.insert_batch([(hash, cost, used_gas, sender, to_address, sig, status, reason)])
+
+    def insert_batch(self, rows: List[CostRow]):
+        with pg_pool().cursor() as cur:
+            execute_values(cur, '''
+                    INSERT INTO OPERATOR_COST (hash, cost, used_gas, sender, to_address, sig, status, reason)
+                    VALUES %s
+                ''',
+                rows, page_size=len(rows)
+            )
+
+
+class CostRecorder:
+    """
+    Writes cost rows to the DB by a background thread, so senders of Solana transactions don't wait for the DB.
+
+    Rows are written by one INSERT in batches of batch_size rows, or flush_interval seconds after the first row
+    of a batch was taken from the queue. At most queue_size rows wait in the queue: a sender waits for a free place
+    up to queue_timeout seconds, after that the row is dropped. A full queue means the DB doesn't keep up, and
+    an iterative transaction adds a row per iteration, so the timeout should be short. A batch, which failed to be
+    written, is dropped too. close() writes rows, which are still queued.
+    """
+    def __init__(self, db: SQLCost, queue_size: int, batch_size: int, flush_interval: float, queue_timeout: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_timeout = queue_timeout
+        self._db = db
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._added = 0
+        self._written = 0
+        self._batches = 0
+        self._waits = 0
+        self._dropped = 0
+        self._failed = 0
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def add(self, row: CostRow):
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._waits += 1
+            try:
+                self._queue.put(row, timeout=self.queue_timeout)
+            except queue.Full:
+                with self._lock:
+                    self._dropped += 1
+                logger.warning(f'Operator cost queue is full, the cost of {row[5]} is dropped')
+                return
+        with self._lock:
+            self._added += 1
+
+    def flush(self):
+        """Writes all queued rows by the calling thread"""
+        while True:
+            rows = self._take(block=False)
+            if not len(rows):
+                return
+            self._write_rows(rows)
+
+    def close(self, timeout: Optional[float] = None):
+        self._closed.set()
+        try:
+            # Wakes the writer up, a full queue doesn't let it sleep anyway
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._writer.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'queue_size': self._queue.maxsize,
+                'added': self._added,
+                'written': self._written,
+                'batches': self._batches,
+                'waits': self._waits,
+                'dropped': self._dropped,
+                'failed': self._failed,
+            }
+
+    def _write(self):
+        while not self._closed.is_set():
+            rows = self._take(block=True)
+            if len(rows):
+                self._write_rows(rows)
+
+    def _take(self, block: bool) -> List[CostRow]:
+        """Returns up to batch_size rows, the blocking call waits for them up to flush_interval seconds"""
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and (timeout > 0) and not self._closed.is_set():
+                    row = self._queue.get(timeout=timeout)
+                else:
+                    row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is None:
+                if block:
+                    break
+                continue
+            rows.append(row)
+        return rows
+
+    def _write_rows(self, rows: List[CostRow]):
+        try:
+            self._db.insert_batch(rows)
+        except Exception as err:
+            with self._lock:
+                self._failed += len(rows)
+            logger.warning(f'Failed to write {len(rows)} operator cost rows: {err}')
+            return
+        with self._lock:
+            self._written += len(rows)
+            self._batches += 1
+
+
+_recorder_lock = threading.Lock()
+_recorder: Optional[CostRecorder] = None
+_recorder_pid: Optional[int] = None
+
+
+def operator_cost() -> CostRecorder:
+    """Returns the cost recorder of the current process, the table and the writer thread are created on the first call"""
+    global _recorder, _recorder_pid
+
+    with _recorder_lock:
+        if _recorder is None or _recorder_pid != os.getpid():
+            _recorder = CostRecorder(SQLCost(), OPERATOR_COST_QUEUE_SIZE, OPERATOR_COST_BATCH_SIZE,
+                                     OPERATOR_COST_FLUSH_INTERVAL, OPERATOR_COST_QUEUE_TIMEOUT)
+            _recorder_pid = os.getpid()
+            # Acceptors are multiprocessing children, which exit by os._exit() without atexit handlers,
+            # but with finalizers. In the main process finalizers are called at exit too
+            multiprocessing.util.Finalize(None, _close_operator_cost, exitpriority=10)
+        return _recorder
+
+
+def _close_operator_cost():
+    with _recorder_lock:
+        # Forked processes inherit the recorder of the parent
+        recorder = _recorder if _recorder_pid == os.getpid() else None
+    if recorder is not None:
+        recorder.close(recorder.flush_interval + recorder.queue_timeout)
+        logger.debug(f'Operator cost: {recorder.get_stats()}')
+
+
+def update_transaction_cost(receipt: ReceiptInfo, eth_trx, extra_sol_trx=False, reason=None):
     if not WRITE_TRANSACTION_COST_IN_DB:
         return
 
-    cost = receipt['meta']['preBalances'][0] - receipt['meta']['postBalances'][0]
     if eth_trx:
         hash = eth_trx.hash_signed().hex()
         sender = eth_trx.sender()
@@ -61,31 +208,13 @@ def update_transaction_cost(receipt, eth_trx, extra_sol_trx=False, reason=None):
         sender = None
         to_address = None
 
-    sig = receipt['transaction']['signatures'][0]
-    used_gas=None
-
-    tx_info = receipt
-    accounts = tx_info["transaction"]["message"]["accountKeys"]
-    evm_loader_instructions = []
-
-    for idx, instruction in enumerate(tx_info["transaction"]["message"]["instructions"]):
-        if accounts[instruction["programIdIndex"]] == EVM_LOADER_ID:
-            evm_loader_instructions.append(idx)
-
-    for inner in (tx_info['meta']['innerInstructions']):
-        if inner["index"] in evm_loader_instructions:
-            for event in inner['instructions']:
-                if accounts[event['programIdIndex']] == EVM_LOADER_ID:
-                    used_gas = base58.b58decode(event['data'])[2:10]
-                    used_gas = int().from_bytes(used_gas, "little")
-
-    operator_cost.insert(
+    operator_cost().add((
         hash,
-        cost,
-        used_gas if used_gas else 0,
+        receipt.cost,
+        receipt.used_gas if receipt.used_gas else 0,
         sender,
         to_address,
-        sig,
+        receipt.signature,
         'extra' if extra_sol_trx else 'ok',
         reason if reason else ''
-    )
+    ))
@@ -1,9 +1,13 @@
 import json
 import logging
+import threading
+import time
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Hashable, Tuple, Union
+from .emulator_pool import emulator_pool
 from .errors import EthereumError
-from ..environment import neon_cli, ETH_TOKEN_MINT_ID
+from .lru_cache import LRUCache
+from ..environment import neon_cli, ETH_TOKEN_MINT_ID, EMULATION_CACHE_SIZE, EMULATION_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -66,4 +70,120 @@ def decode_revert_message(data: str) -> Optional[str]:
 def emulator(contract, sender, data, value):
     data = data or "none"
     value = value or ""
+    pool = emulator_pool()
+    if pool is not None:
+        return pool.call("--token_mint", str(ETH_TOKEN_MINT_ID), sender, contract, data, value)
     return neon_cli().call("emulate", "--token_mint", str(ETH_TOKEN_MINT_ID), sender, contract, data, value)
+
+
+class EthCallCache:
+    """
+    Results of eth_call emulation for the latest indexed block.
+
+    Entries are keyed by call parameters and are dropped as soon as the block height advances.
+    A result emulated at another height than the current one isn't stored, the height is checked and the result
+    is stored under one lock. Reverts are cached as EthereumError objects. Results larger than max_entry_size
+    aren't cached.
+    """
+    def __init__(self, max_entries: int, max_entry_size: int):
+        self._cache = LRUCache(max_entries)
+        self._max_entry_size = max_entry_size
+        self._block_height = None
+        self._lock = threading.Lock()
+
+    def is_enabled(self) -> bool:
+        return self._cache.max_size > 0
+
+    def get(self, key: Hashable, block_height: int) -> Optional[Union[str, EthereumError]]:
+        with self._lock:
+            if not self._check_block_height(block_height):
+                return None
+            return self._cache.get(key)
+
+    def put(self, key: Hashable, block_height: int, result: Union[str, EthereumError]):
+        size = len(result.data or '') if isinstance(result, EthereumError) else len(result)
+        if size > self._max_entry_size:
+            return
+        with self._lock:
+            if self._check_block_height(block_height):
+                self._cache.put(key, result)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._cache.get_stats(), block_height=self._block_height)
+
+    def _check_block_height(self, block_height: int) -> bool:
+        """Moves the cache to a newer block height, returns False for an older one"""
+        if self._block_height is not None and block_height < self._block_height:
+            return False
+        if self._block_height != block_height:
+            self._block_height = block_height
+            self._cache.clear()
+        return True
+
+
+def get_emulation_key(contract: str, sender: str, data: Optional[str], value: Optional[str], nonce: int) -> Tuple:
+    """Normalizes parameters of eth_estimateGas and of a raw transaction to the same form"""
+    def strip_hex(text: Optional[str]) -> str:
+        text = (text or '').lower()
+        if text == 'none':
+            return ''
+        return text[2:] if text.startswith('0x') else text
+
+    return strip_hex(contract), strip_hex(sender), strip_hex(data), int(strip_hex(value) or '0', 16), nonce
+
+
+class EmulationCache:
+    """
+    Emulation results of eth_estimateGas, which are reused by eth_sendRawTransaction of the same call.
+
+    Entries are keyed by get_emulation_key(): a new transaction of the sender changes the nonce, other changes of
+    the state are bounded by ttl seconds since the estimate. The wall clock doesn't depend on the indexer, which
+    can lag behind Solana. An entry is taken only once, so a retry of the transaction emulates it again.
+    A cache with max_entries == 0 is disabled.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self._cache = LRUCache(max_entries)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_enabled(self) -> bool:
+        return self._cache.max_size > 0
+
+    def put(self, key: Hashable, result: Dict[str, Any]):
+        self._cache.put(key, (time.time(), result))
+
+    def pop(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        entry = self._cache.pop(key)
+        is_hit = (entry is not None) and (time.time() - entry[0] <= self._ttl)
+        with self._lock:
+            if is_hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[1] if is_hit else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / requests if requests else 0.0}
+
+
+_emulation_cache_lock = threading.Lock()
+_emulation_cache: Optional[EmulationCache] = None
+
+
+def emulation_cache() -> EmulationCache:
+    global _emulation_cache
+
+    with _emulation_cache_lock:
+        if _emulation_cache is None:
+            _emulation_cache = EmulationCache(EMULATION_CACHE_SIZE, EMULATION_CACHE_TTL)
+        return _emulation_cache
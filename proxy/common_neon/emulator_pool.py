@@ -0,0 +1,231 @@
+import itertools
+import json
+import logging
+import os
+import subprocess
+import threading
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+from ..environment import SOLANA_URL, EVM_LOADER_ID, LOG_NEON_CLI_DEBUG, neon_cli_timeout, \
+    NEON_EMULATOR_DAEMON, NEON_EMULATOR_POOL_SIZE, NEON_EMULATOR_HEALTH_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class EmulatorError(Exception):
+    pass
+
+
+class EmulatorWorker:
+    """
+    One long-lived emulator process.
+
+    The process reads line-delimited JSON requests from stdin and writes line-delimited JSON responses to stdout:
+    - request:  {"id": 1, "method": "emulate", "params": ["--token_mint", "...", "<sender>", "<contract>", ...]}
+    - response: {"id": 1, "result": "<the same text neon-cli prints>"} or {"id": 1, "error": "<message>"}
+
+    The "ping" method is used for health checks. Requests are multiplexed over the pipe by id, so several
+    threads can wait for results of the same process at the same time.
+    """
+    def __init__(self, idx: int, cmd: List[str]):
+        self.idx = idx
+        self.cmd = cmd
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._request_counter = itertools.count(1)
+        self.restart_count = -1
+        self.process = None
+        self.start()
+
+    def __str__(self):
+        pid = self.process.pid if self.process else None
+        return f'emulator#{self.idx}(pid={pid})'
+
+    def start(self):
+        with self._lock:
+            self._fail_pending(f'{self} is restarted')
+            self.process = subprocess.Popen(self.cmd,
+                                            stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE,
+                                            universal_newlines=True,
+                                            bufsize=1)
+            self.restart_count += 1
+            reader = threading.Thread(target=self._read_responses, args=(self.process,), daemon=True)
+            reader.start()
+        logger.debug(f'Started {self}: {" ".join(self.cmd)}')
+
+    def stop(self):
+        with self._lock:
+            self._fail_pending(f'{self} is stopped')
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def call(self, method: str, params: List[str], timeout: float) -> str:
+        future = Future()
+        with self._lock:
+            request_id = next(self._request_counter)
+            self._pending[request_id] = future
+            request = json.dumps({'id': request_id, 'method': method, 'params': params})
+            try:
+                self.process.stdin.write(request + '\n')
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as err:
+                del self._pending[request_id]
+                raise EmulatorError(f'{self} is not available: {err}')
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise subprocess.TimeoutExpired(self.cmd, timeout)
+
+    def ping(self, timeout: float) -> bool:
+        try:
+            self.call('ping', [], timeout)
+            return True
+        except Exception as err:
+            logger.warning(f'Health check of {self} failed: {err}')
+            return False
+
+    def _read_responses(self, process: subprocess.Popen):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f'{self} returned non-JSON line: {line.strip()}')
+                continue
+
+            with self._lock:
+                future = self._pending.pop(response.get('id'), None)
+            if future is None:
+                continue
+            if 'error' in response:
+                future.set_exception(EmulatorError(response['error']))
+            else:
+                future.set_result(response.get('result'))
+
+        # Reap the process before failing requests, so the pool sees the worker as dead and restarts it
+        process.wait()
+        with self._lock:
+            if process is self.process:
+                self._fail_pending(f'{self} exited with code {process.poll()}')
+
+    def _fail_pending(self, reason: str):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(EmulatorError(reason))
+
+
+class EmulatorPool:
+    """
+    A fixed set of persistent emulator processes.
+
+    A request goes to the alive worker with the least number of requests in flight. Dead workers are restarted
+    on the request path and by the health check thread, which also pings idle workers. A worker, which took
+    a request while the ping was waiting, isn't restarted: it can be busy with a slow emulation, and a hung
+    request fails by its own timeout.
+    """
+    PING_TIMEOUT = 5.0
+
+    def __init__(self, cmd: List[str], size: int, timeout: float, health_check_interval: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._workers = [EmulatorWorker(idx, cmd) for idx in range(size)]
+        self._request_count = 0
+        self._error_count = 0
+        self._max_queue_depth = 0
+        self._stop = threading.Event()
+
+        if health_check_interval > 0:
+            self._health_check_interval = health_check_interval
+            threading.Thread(target=self._check_health, daemon=True).start()
+
+    def call(self, *args) -> str:
+        worker = self._get_worker()
+        try:
+            return worker.call('emulate', list(args), self.timeout)
+        except Exception:
+            with self._lock:
+                self._error_count += 1
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'alive_workers': sum(1 for worker in self._workers if worker.is_alive()),
+                'restarts': sum(worker.restart_count for worker in self._workers),
+                'queue_depth': sum(worker.in_flight() for worker in self._workers),
+                'max_queue_depth': self._max_queue_depth,
+                'requests': self._request_count,
+                'errors': self._error_count,
+            }
+
+    def close(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.stop()
+
+    def _get_worker(self) -> EmulatorWorker:
+        with self._lock:
+            for worker in self._workers:
+                if not worker.is_alive():
+                    logger.warning(f'{worker} is dead (exit code {worker.process.poll()}), restarting')
+                    worker.start()
+
+            worker = min(self._workers, key=lambda w: w.in_flight())
+            self._request_count += 1
+            queue_depth = sum(w.in_flight() for w in self._workers) + 1
+            self._max_queue_depth = max(self._max_queue_depth, queue_depth)
+            return worker
+
+    def _check_health(self):
+        while not self._stop.wait(self._health_check_interval):
+            for worker in self._workers:
+                if worker.is_alive() and (worker.in_flight() > 0 or worker.ping(self.PING_TIMEOUT)):
+                    continue
+                with self._lock:
+                    if worker.is_alive() and worker.in_flight() > 0:
+                        continue
+                    logger.warning(f'{worker} is unhealthy, restarting')
+                    worker.stop()
+                    worker.start()
+            logger.debug(f'Emulator pool stats: {self.get_stats()}')
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[EmulatorPool] = None
+_pool_pid: Optional[int] = None
+
+
+def emulator_pool() -> Optional[EmulatorPool]:
+    """
+    Returns the emulator pool of the current process, or None if NEON_EMULATOR_DAEMON isn't set.
+
+    The pool is created on the first call, because acceptor processes are forked after the module is imported
+    and neither pipes nor reader threads survive the fork.
+    """
+    global _pool, _pool_pid
+
+    if not NEON_EMULATOR_DAEMON:
+        return None
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            cmd = NEON_EMULATOR_DAEMON.split() + \
+                  ["--commitment=recent", "--url", SOLANA_URL, "--evm_loader={}".format(EVM_LOADER_ID)] + \
+                  (["-vvv"] if LOG_NEON_CLI_DEBUG else [])
+            _pool = EmulatorPool(cmd, NEON_EMULATOR_POOL_SIZE, neon_cli_timeout, NEON_EMULATOR_HEALTH_CHECK_INTERVAL)
+            _pool_pid = os.getpid()
+        return _pool
@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+
+from solana.blockhash import Blockhash
+from solana.publickey import PublicKey
+from solana.transaction import Transaction, PACKET_DATA_SIZE, SIG_LENGTH
+from solana.utils import shortvec_encoding as shortvec
+from typing import Any, Dict, NamedTuple, Optional
+
+from ..environment import NONITERATIVE_MAX_STEPS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Any blockhash will do: it doesn't change the size of a transaction
+SIZE_CHECK_BLOCKHASH = Blockhash(str(PublicKey(0)))
+
+
+def get_transaction_size(trx: Transaction, fee_payer: PublicKey) -> (int, int):
+    """Returns the size of the signed transaction in the wire format and the number of its accounts"""
+    size_trx = Transaction(recent_blockhash=SIZE_CHECK_BLOCKHASH, fee_payer=fee_payer).add(trx)
+    message = size_trx.compile_message()
+    sign_count = message.header.num_required_signatures
+    size = len(shortvec.encode_length(sign_count)) + sign_count * SIG_LENGTH + len(message.serialize())
+    return size, len(message.account_keys)
+
+
+class ExecutionPlan(NamedTuple):
+    strategy: str
+    reason: str
+    steps_emulated: int
+    trx_size: int
+    account_count: int
+
+
+class ExecutionPlanner:
+    """
+    Chooses how to execute a Neon transaction before anything is sent.
+
+    - NONITERATIVE: one Solana transaction, if it fits into a packet and executes up to noniterative_max_steps steps.
+    - ITERATIVE: steps are sent in instruction data of several transactions.
+    - HOLDER: the Neon transaction is written to the holder account first, it is used for deployments, for
+      transactions which don't fit into a packet and for long ones, see IterativeTransactionSender.
+
+    Senders fall back to another strategy if the chosen one fails, the planner counts such fallbacks, and keeps the
+    range of emulated steps where the noniterative execution succeeded and failed, to tune noniterative_max_steps.
+    """
+    NONITERATIVE = 'noniterative'
+    ITERATIVE = 'iterative'
+    HOLDER = 'holder'
+
+    def __init__(self, noniterative_max_steps: int, max_trx_size: int = PACKET_DATA_SIZE):
+        self.noniterative_max_steps = noniterative_max_steps
+        self.max_trx_size = max_trx_size
+        self._lock = threading.Lock()
+        self._planned = {self.NONITERATIVE: 0, self.ITERATIVE: 0, self.HOLDER: 0}
+        self._fallbacks: Dict[str, int] = {}
+        self._max_noniterative_steps_ok: Optional[int] = None
+        self._min_noniterative_steps_failed: Optional[int] = None
+
+    def plan(self, is_deploy: bool, steps_emulated: int, steps: int, trx_size: int, account_count: int) -> ExecutionPlan:
+        if is_deploy:
+            strategy, reason = self.HOLDER, 'deployment'
+        elif trx_size > self.max_trx_size:
+            strategy, reason = self.HOLDER, f'transaction size {trx_size} > {self.max_trx_size}'
+        elif steps_emulated > self.noniterative_max_steps:
+            strategy, reason = self.iterative_strategy(steps_emulated, steps), \
+                f'{steps_emulated} steps > {self.noniterative_max_steps}'
+        else:
+            strategy, reason = self.NONITERATIVE, f'{steps_emulated} steps, transaction size {trx_size}'
+
+        plan = ExecutionPlan(strategy, reason, steps_emulated, trx_size, account_count)
+        with self._lock:
+            self._planned[strategy] += 1
+        logger.debug(f'Execution plan: {plan}')
+        return plan
+
+    def iterative_strategy(self, steps_emulated: int, steps: int) -> str:
+        """
+        An iterative call from instruction data can be performed in batches only
+        with a change in the number of steps in the iteration.
+        Each next iteration the number of steps decreases.
+        Thus, starting from a certain number of steps,
+        it is appropriate to use a call from the account data,
+        since there the number of steps is unchanged.
+        """
+        return self.HOLDER if steps_emulated / steps > steps / 2 else self.ITERATIVE
+
+    def record(self, plan: ExecutionPlan, strategy: str):
+        """Records the strategy, which executed the transaction"""
+        with self._lock:
+            if strategy == self.NONITERATIVE:
+                if self._max_noniterative_steps_ok is None or plan.steps_emulated > self._max_noniterative_steps_ok:
+                    self._max_noniterative_steps_ok = plan.steps_emulated
+            elif plan.strategy == self.NONITERATIVE:
+                if self._min_noniterative_steps_failed is None or \
+                        plan.steps_emulated < self._min_noniterative_steps_failed:
+                    self._min_noniterative_steps_failed = plan.steps_emulated
+
+            if strategy != plan.strategy:
+                key = f'{plan.strategy}->{strategy}'
+                self._fallbacks[key] = self._fallbacks.get(key, 0) + 1
+                logger.debug(f'Execution plan {plan} failed, executed as {strategy}. Stats: {self._get_stats()}')
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._get_stats()
+
+    def _get_stats(self) -> Dict[str, Any]:
+        planned = sum(self._planned.values())
+        fallbacks = sum(self._fallbacks.values())
+        return {
+            'planned': dict(self._planned),
+            'fallbacks': dict(self._fallbacks),
+            'accuracy': (planned - fallbacks) / planned if planned else None,
+            'max_noniterative_steps_ok': self._max_noniterative_steps_ok,
+            'min_noniterative_steps_failed': self._min_noniterative_steps_failed,
+        }
+
+
+_planner_lock = threading.Lock()
+_planner: Optional[ExecutionPlanner] = None
+_planner_pid: Optional[int] = None
+
+
+def execution_planner() -> ExecutionPlanner:
+    """Returns the planner of the current process, so statistics aren't mixed up by forked processes"""
+    global _planner, _planner_pid
+
+    with _planner_lock:
+        if _planner is None or _planner_pid != os.getpid():
+            _planner = ExecutionPlanner(NONITERATIVE_MAX_STEPS)
+            _planner_pid = os.getpid()
+        return _planner
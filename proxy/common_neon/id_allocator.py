@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+
+from typing import Optional
+
+
+def is_process_alive(pid: int) -> bool:
+    """A crashed worker stays a zombie until the parent process reaps it, so zombies are considered dead"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            # The state follows the executable name in parentheses
+            return stat.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+class SharedIdAllocator:
+    """
+    Fixed-capacity allocator of ids, shared by processes forked after its creation.
+
+    The state is an array of owner pids in shared memory, 0 marks a free id. allocate() returns the lowest free
+    id and free() releases it, both under a lock for a few array operations, without a round trip to another
+    process. Ids of processes which exited without freeing them are reclaimed when there are no free ids left.
+
+    Each namespace (an operator key) has its own `capacity` ids, up to `max_namespaces` namespaces are registered
+    on first use.
+    """
+    NAMESPACE_SIZE = 32
+
+    def __init__(self, capacity: int, max_namespaces: int = 1):
+        self.capacity = capacity
+        self.max_namespaces = max_namespaces
+        self._owners = multiprocessing.Array('i', capacity * max_namespaces)
+        self._namespaces = multiprocessing.Array('c', self.NAMESPACE_SIZE * max_namespaces, lock=False)
+        self._namespace_count = multiprocessing.Value('i', 0, lock=False)
+        # No free ids below these indexes
+        self._min_free = multiprocessing.Array('i', max_namespaces, lock=False)
+
+    def allocate(self, namespace: bytes = b'') -> Optional[int]:
+        """Returns an id leased by the current process, or None if all ids of the namespace are in use"""
+        pid = os.getpid()
+        with self._owners.get_lock():
+            ns_idx = self._get_namespace_index(namespace)
+            acc_id = self._find_free(ns_idx)
+            if acc_id is None and self._reclaim(ns_idx):
+                acc_id = self._find_free(ns_idx)
+            if acc_id is None:
+                return None
+            self._owners[ns_idx * self.capacity + acc_id] = pid
+            self._min_free[ns_idx] = acc_id + 1
+            return acc_id
+
+    def free(self, acc_id: int, namespace: bytes = b''):
+        with self._owners.get_lock():
+            ns_idx = self._get_namespace_index(namespace)
+            self._owners[ns_idx * self.capacity + acc_id] = 0
+            self._min_free[ns_idx] = min(self._min_free[ns_idx], acc_id)
+
+    def get_owner(self, acc_id: int, namespace: bytes = b'') -> int:
+        with self._owners.get_lock():
+            return self._owners[self._get_namespace_index(namespace) * self.capacity + acc_id]
+
+    def get_stats(self):
+        with self._owners.get_lock():
+            used = sum(1 for owner in self._owners.get_obj() if owner)
+            namespaces = self._namespace_count.value
+        return {'capacity': self.capacity, 'namespaces': namespaces, 'max_namespaces': self.max_namespaces,
+                'used': used}
+
+    def _get_namespace_index(self, namespace: bytes) -> int:
+        key = namespace.ljust(self.NAMESPACE_SIZE, b'\0')
+        if len(key) != self.NAMESPACE_SIZE:
+            raise ValueError(f'Namespace is longer than {self.NAMESPACE_SIZE} bytes')
+        count = self._namespace_count.value
+        for ns_idx in range(count):
+            if self._namespaces[ns_idx * self.NAMESPACE_SIZE:(ns_idx + 1) * self.NAMESPACE_SIZE] == key:
+                return ns_idx
+        if count == self.max_namespaces:
+            raise RuntimeError(f'Too many namespaces, the maximum is {self.max_namespaces}')
+        self._namespaces[count * self.NAMESPACE_SIZE:(count + 1) * self.NAMESPACE_SIZE] = key
+        self._namespace_count.value = count + 1
+        return count
+
+    def _find_free(self, ns_idx: int) -> Optional[int]:
+        owners = self._owners.get_obj()
+        offset = ns_idx * self.capacity
+        for acc_id in range(self._min_free[ns_idx], self.capacity):
+            if not owners[offset + acc_id]:
+                return acc_id
+        return None
+
+    def _reclaim(self, ns_idx: int) -> bool:
+        """Frees ids of dead processes"""
+        owners = self._owners.get_obj()
+        offset = ns_idx * self.capacity
+        reclaimed = False
+        for acc_id in range(self.capacity):
+            owner = owners[offset + acc_id]
+            if owner and not is_process_alive(owner):
+                owners[offset + acc_id] = 0
+                self._min_free[ns_idx] = min(self._min_free[ns_idx], acc_id)
+                reclaimed = True
+        return reclaimed
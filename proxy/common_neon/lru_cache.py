@@ -0,0 +1,73 @@
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache.
+
+    The cache is bounded by max_size: by the number of entries, or by the total weight of entries if the sizeof
+    function is passed. A cache with max_size == 0 doesn't store anything.
+    """
+    def __init__(self, max_size: int, sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_size = max_size
+        self._sizeof = sizeof or (lambda _: 1)
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        size = self._sizeof(value)
+        if size > self.max_size:
+            return False
+
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (value, size)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, old_size) = self._data.popitem(last=False)
+                self._size -= old_size
+        return True
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._pop(key)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._data), 'size': self._size, 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+        return entry
@@ -0,0 +1,271 @@
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .errors import EthereumError
+from .sender_queue import SenderQueue
+from ..environment import MEMPOOL_WORKERS, MEMPOOL_MAX_SIZE, MEMPOOL_MAX_AGE
+from ..indexer.pending_txs_db import PendingTxsDB
+from ..indexer.pg_common import pg_listener
+from ..indexer.utils import NeonTxInfo
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+# A transaction with the time it was accepted
+PendingTx = Tuple[NeonTxInfo, Callable[[], Any], float]
+
+
+class PendingSender:
+    """Transactions of a sender, which wait for their nonces without taking threads"""
+    def __init__(self, nonce: int, get_nonce: Callable[[], int]):
+        self.nonce = nonce
+        self.get_nonce = get_nonce
+        self.is_running = False
+        # Nonce -> transactions with it, in the order they were accepted
+        self.parked: Dict[int, List[PendingTx]] = {}
+
+
+class Mempool:
+    """
+    Executes accepted transactions by a pool of background threads.
+
+    At most max_size transactions are queued or executed by the worker process, more transactions are rejected.
+    A transaction is given to a thread only when its nonce is the next one of the sender, one transaction of
+    the sender at a time; transactions with future nonces are parked until the preceding ones are executed by this
+    or another worker. A transaction which waited for more than max_age seconds is dropped without execution.
+    Pending transactions are stored in the DB, so all workers see them until they are executed or expire.
+    """
+    def __init__(self, pending_db: PendingTxsDB, workers: int, max_size: int, max_age: float):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._db = pending_db
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._senders: Dict[str, PendingSender] = {}
+        self._size = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._executed = 0
+        self._failed = 0
+        self._expired = 0
+        self._dropped = 0
+        self._max_queue_time = 0.0
+        self._db.del_expired_txs(max_age)
+        pg_listener(SenderQueue.CHANNEL).subscribe(self._on_sender_done)
+
+    def submit(self, neon_tx: NeonTxInfo, execute: Callable[[], Any], nonce: int, get_nonce: Callable[[], int]):
+        """Accepts the transaction of the sender with the current nonce, get_nonce() is called after failures"""
+        self._drop_txs(self._take_expired())
+        with self._lock:
+            if self._size >= self.max_size:
+                self._rejected += 1
+                raise EthereumError(-32000, f'transaction pool is full ({self.max_size} transactions)')
+            self._size += 1
+
+        accept_time = time.time()
+        try:
+            if not self._db.add_tx(neon_tx, accept_time):
+                logger.debug(f'Transaction {neon_tx.sign} is already pending')
+                self._on_done()
+                return
+        except BaseException:
+            self._on_done()
+            raise
+
+        addr = self._get_sender_key(neon_tx.addr)
+        with self._lock:
+            self._accepted += 1
+            sender = self._senders.get(addr)
+            is_new_sender = sender is None
+            if is_new_sender:
+                sender = PendingSender(nonce, get_nonce)
+                self._senders[addr] = sender
+            sender.nonce = max(sender.nonce, nonce)
+            sender.parked.setdefault(int(neon_tx.nonce, 16), []).append((neon_tx, execute, accept_time))
+            pending_tx, stale_txs = self._take_next(addr)
+        self._drop_txs(stale_txs)
+        if pending_tx is not None:
+            self._executor.submit(self._execute, addr, pending_tx)
+        elif is_new_sender:
+            # The nonce could be read before the previous transaction of the sender was executed
+            self._executor.submit(self._recheck, addr)
+
+    def get_tx(self, neon_sign: str) -> Optional[NeonTxInfo]:
+        return self._db.get_tx(neon_sign, self.max_age)
+
+    def get_pending_nonce(self, from_addr: str, nonce: int) -> int:
+        """Returns the nonce after the pending transactions, which directly follow the nonce of the account"""
+        for pending_nonce in self._db.get_nonce_list(from_addr.lower(), nonce, self.max_age):
+            if pending_nonce != nonce:
+                break
+            nonce += 1
+        return nonce
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self._size,
+                'max_size': self.max_size,
+                'senders': len(self._senders),
+                'parked': sum(len(tx_list) for sender in self._senders.values() for tx_list in sender.parked.values()),
+                'accepted': self._accepted,
+                'rejected': self._rejected,
+                'executed': self._executed,
+                'failed': self._failed,
+                'expired': self._expired,
+                'dropped': self._dropped,
+                'max_queue_time': self._max_queue_time,
+            }
+
+    @staticmethod
+    def _get_sender_key(addr: str) -> str:
+        """Senders are named as in notifications of SenderQueue"""
+        addr = addr.lower()
+        return addr[2:] if addr.startswith('0x') else addr
+
+    def _take_next(self, addr: str) -> Tuple[Optional[PendingTx], List[PendingTx]]:
+        """
+        Returns the transaction with the next nonce of the sender, if no transaction of the sender is executed, and
+        transactions with nonces before it. The caller holds the lock.
+        """
+        sender = self._senders[addr]
+        stale_txs = []
+        for nonce in [nonce for nonce in sender.parked.keys() if nonce < sender.nonce]:
+            stale_txs += sender.parked.pop(nonce)
+        self._dropped += len(stale_txs)
+
+        pending_tx = None
+        tx_list = sender.parked.get(sender.nonce)
+        if (not sender.is_running) and tx_list:
+            pending_tx = tx_list.pop(0)
+            if not tx_list:
+                del sender.parked[sender.nonce]
+            sender.is_running = True
+        elif (not sender.is_running) and (not sender.parked):
+            del self._senders[addr]
+        return pending_tx, stale_txs
+
+    def _take_expired(self) -> List[PendingTx]:
+        expired_txs = []
+        min_accept_time = time.time() - self.max_age
+        with self._lock:
+            for addr, sender in list(self._senders.items()):
+                for nonce, tx_list in list(sender.parked.items()):
+                    expired_txs += [pending_tx for pending_tx in tx_list if pending_tx[2] < min_accept_time]
+                    tx_list[:] = [pending_tx for pending_tx in tx_list if pending_tx[2] >= min_accept_time]
+                    if not tx_list:
+                        del sender.parked[nonce]
+                if (not sender.is_running) and (not sender.parked):
+                    del self._senders[addr]
+            self._expired += len(expired_txs)
+        return expired_txs
+
+    def _drop_txs(self, pending_tx_list: List[PendingTx]):
+        """Removes transactions, which will never be executed: expired or with nonces of executed transactions"""
+        for neon_tx, _, _ in pending_tx_list:
+            logger.debug(f'Transaction {neon_tx.sign} with the nonce {neon_tx.nonce} is dropped')
+            try:
+                self._db.del_tx(neon_tx.sign)
+            except Exception as err:
+                logger.warning(f'Failed to remove pending transaction {neon_tx.sign}: {err}')
+            self._on_done()
+
+    def _execute(self, addr: str, pending_tx: PendingTx):
+        neon_tx, execute, accept_time = pending_tx
+        queue_time = time.time() - accept_time
+        is_ok = False
+        try:
+            with self._lock:
+                self._max_queue_time = max(self._max_queue_time, queue_time)
+            if queue_time > self.max_age:
+                logger.warning(f'Transaction {neon_tx.sign} is dropped after {queue_time:.1f} seconds in the queue')
+                with self._lock:
+                    self._expired += 1
+                return
+            execute()
+            is_ok = True
+        except Exception as err:
+            logger.warning(f'Transaction {neon_tx.sign} failed: {err}')
+        finally:
+            try:
+                self._db.del_tx(neon_tx.sign)
+            except Exception as err:
+                logger.warning(f'Failed to remove pending transaction {neon_tx.sign}: {err}')
+            with self._lock:
+                if is_ok:
+                    self._executed += 1
+                elif queue_time <= self.max_age:
+                    self._failed += 1
+            self._on_done()
+            self._on_executed(addr, int(neon_tx.nonce, 16) + 1 if is_ok else None)
+        logger.debug(f'Mempool: {self.get_stats()}')
+
+    def _on_executed(self, addr: str, nonce: Optional[int]):
+        """Runs the next transaction of the sender, the nonce is requested if the transaction failed"""
+        if nonce is None:
+            with self._lock:
+                get_nonce = self._senders[addr].get_nonce
+            try:
+                nonce = get_nonce()
+            except Exception as err:
+                logger.warning(f'Failed to get the nonce of {addr}: {err}')
+
+        with self._lock:
+            sender = self._senders[addr]
+            sender.is_running = False
+            if nonce is not None:
+                sender.nonce = max(sender.nonce, nonce)
+            pending_tx, stale_txs = self._take_next(addr)
+        self._drop_txs(stale_txs + self._take_expired())
+        if pending_tx is not None:
+            self._executor.submit(self._execute, addr, pending_tx)
+
+    def _recheck(self, addr: str):
+        """Transactions of the sender could be executed by another worker"""
+        with self._lock:
+            sender = self._senders.get(addr)
+            if (sender is None) or sender.is_running:
+                return
+            # Keeps other threads from taking the sender while the nonce is requested
+            sender.is_running = True
+        self._on_executed(addr, None)
+
+    def _on_sender_done(self, payload: Optional[str]):
+        if (payload is not None) and payload.endswith(SenderQueue.UNLOCKED):
+            return
+        with self._lock:
+            if payload is None:
+                # Notifications could be lost, while the listener was reconnecting
+                addr_list = [addr for addr, sender in self._senders.items() if sender.parked]
+            elif (payload in self._senders) and self._senders[payload].parked:
+                addr_list = [payload]
+            else:
+                return
+        for addr in addr_list:
+            self._executor.submit(self._recheck, addr)
+
+    def _on_done(self):
+        with self._lock:
+            self._size -= 1
+
+
+_mempool_lock = threading.Lock()
+_mempool: Optional[Mempool] = None
+_mempool_pid: Optional[int] = None
+
+
+def mempool() -> Mempool:
+    """Returns the mempool of the current process, its threads are started on the first call"""
+    global _mempool, _mempool_pid
+
+    with _mempool_lock:
+        if _mempool is None or _mempool_pid != os.getpid():
+            _mempool = Mempool(PendingTxsDB(), MEMPOOL_WORKERS, MEMPOOL_MAX_SIZE, MEMPOOL_MAX_AGE)
+            _mempool_pid = os.getpid()
+        return _mempool
@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+
+from collections import deque
+from sha3 import keccak_256
+from solana.publickey import PublicKey
+from solana.transaction import Transaction
+from typing import Any, Deque, Dict, List, NamedTuple, Tuple
+
+from ..core.acceptor.pool import perm_acc_id_glob
+from .address import accountWithSeed
+from .constants import STORAGE_SIZE, EMPTY_STORAGE_TAG, FINALIZED_STORAGE_TAG
+from .neon_instruction import NeonInstruction
+from .solana_interactor import SolanaInteractor
+from ..environment import EVM_LOADER_ID, PERM_ACCOUNT_POOL_SIZE, PERM_ACCOUNT_POOL_MAX_SIZE, \
+    PERM_ACCOUNT_POOL_WAIT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class PermAccounts(NamedTuple):
+    acc_id: int
+    storage: PublicKey
+    holder: PublicKey
+
+
+def get_perm_account_seeds(acc_id: int) -> Tuple[bytes, bytes]:
+    acc_id_bytes = acc_id.to_bytes((acc_id.bit_length() + 7) // 8, 'big')
+
+    storage_seed = keccak_256(b"storage" + acc_id_bytes).hexdigest()[:32]
+    storage_seed = bytes(storage_seed, 'utf8')
+
+    holder_seed = keccak_256(b"holder" + acc_id_bytes).hexdigest()[:32]
+    holder_seed = bytes(holder_seed, 'utf8')
+    return storage_seed, holder_seed
+
+
+class PermAccountPool:
+    """
+    Storage/holder account pairs of the operator, which are created and validated in advance.
+
+    A background thread keeps at least `size` validated pairs ready, and creates more of them while all are in
+    use, up to `max_size` pairs. acquire() takes a ready pair without any RPC calls, or waits for the thread if
+    there is none. A pair, which was used by a failed transaction, is validated again before it becomes ready.
+    Pair ids are leased from the namespace of the operator in perm_acc_id_glob, which is shared by worker
+    processes. A pair which fails validation is dropped and its id is freed, so the pair is validated again when
+    the id is leased next time.
+    """
+    def __init__(self, solana_interactor: SolanaInteractor, size: int, max_size: int, wait_timeout: float,
+                 retry_delay: float = 1.0):
+        self.size = size
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self._retry_delay = retry_delay
+        self._sender = solana_interactor
+        self._instruction = NeonInstruction(solana_interactor.get_operator_key())
+        # Each operator has its own ids, because the accounts are derived from the operator key
+        self._id_namespace = bytes(solana_interactor.get_operator_key())
+        self._cond = threading.Condition()
+        self._ready: Deque[PermAccounts] = deque()
+        self._returned: List[PermAccounts] = []
+        self._in_use = 0
+        self._in_progress = 0
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._created = 0
+        self._dropped = 0
+        threading.Thread(target=self._top_up, daemon=True).start()
+
+    def acquire(self) -> PermAccounts:
+        start_time = time.time()
+        with self._cond:
+            self._acquires += 1
+            if not len(self._ready):
+                self._waits += 1
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: len(self._ready), timeout=self.wait_timeout):
+                    raise RuntimeError(f'No storage/holder accounts are ready in {self.wait_timeout} seconds')
+                wait_time = time.time() - start_time
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+            accounts = self._ready.popleft()
+            self._in_use += 1
+            if len(self._ready) < self.size:
+                self._cond.notify_all()
+        logger.debug("LOCK RESOURCES {}".format(accounts.acc_id))
+        return accounts
+
+    def release(self, accounts: PermAccounts, is_valid: bool):
+        """is_valid is False if the transaction failed, and the accounts could be left in an unknown state"""
+        logger.debug("FREE RESOURCES {}".format(accounts.acc_id))
+        with self._cond:
+            self._in_use -= 1
+            if is_valid:
+                self._ready.append(accounts)
+            else:
+                self._returned.append(accounts)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'ready': len(self._ready),
+                'in_use': self._in_use,
+                'validating': len(self._returned) + self._in_progress,
+                'acquires': self._acquires,
+                'waits': self._waits,
+                'avg_wait_time': self._wait_time / self._waits if self._waits else 0.0,
+                'max_wait_time': self._max_wait_time,
+                'created': self._created,
+                'dropped': self._dropped,
+            }
+
+    def _get_missing_count(self) -> int:
+        total = len(self._ready) + self._in_use + len(self._returned) + self._in_progress
+        return max(min(self.size - len(self._ready), self.max_size - total), 0)
+
+    def _top_up(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._returned) or self._get_missing_count())
+                returned, self._returned = self._returned, []
+                missing_count = self._get_missing_count()
+                self._in_progress += len(returned) + missing_count
+
+            new_id_list = [acc_id for acc_id in (perm_acc_id_glob.allocate(self._id_namespace)
+                                                     for _ in range(missing_count))
+                           if acc_id is not None]
+            if len(new_id_list) < missing_count:
+                logger.warning(f'{missing_count - len(new_id_list)} storage/holder ids are not available, '
+                               f'all {perm_acc_id_glob.capacity} ids are leased')
+            acc_id_list = [accounts.acc_id for accounts in returned] + new_id_list
+            try:
+                ready = self._prepare(acc_id_list)
+                failed = False
+            except Exception as err:
+                logger.warning(f'Failed to prepare storage/holder accounts {acc_id_list}: {err}')
+                ready = []
+                failed = True
+
+            ready_id_set = {accounts.acc_id for accounts in ready}
+            dropped_id_list = [] if failed else [acc_id for acc_id in acc_id_list if acc_id not in ready_id_set]
+            for acc_id in dropped_id_list:
+                perm_acc_id_glob.free(acc_id, self._id_namespace)
+
+            with self._cond:
+                self._in_progress -= len(returned) + missing_count
+                if failed:
+                    self._returned.extend(PermAccounts(acc_id, None, None) for acc_id in acc_id_list)
+                else:
+                    self._created += sum(1 for accounts in ready if accounts.acc_id in new_id_list)
+                    self._dropped += len(dropped_id_list)
+                    self._ready.extend(ready)
+                self._cond.notify_all()
+            logger.debug(f'Storage/holder account pool: {self.get_stats()}')
+            # The lowest free id is leased first, so a dropped id is taken again on the next round
+            if failed or len(dropped_id_list) or len(new_id_list) < missing_count:
+                time.sleep(self._retry_delay)
+
+    def _prepare(self, acc_id_list: List[int]) -> List[PermAccounts]:
+        """Creates missing accounts of the pairs and returns valid pairs"""
+        if not len(acc_id_list):
+            return []
+
+        operator_key = self._sender.get_operator_key()
+        seed_list = [seed for acc_id in acc_id_list for seed in get_perm_account_seeds(acc_id)]
+        account_list = [accountWithSeed(operator_key, seed) for seed in seed_list]
+        info_list = self._sender.get_multiple_accounts_info(account_list)
+        minimum_balance = self._sender.get_multiple_rent_exempt_balances_for_size([STORAGE_SIZE])[0]
+
+        ready = []
+        for idx, acc_id in enumerate(acc_id_list):
+            pair = slice(2 * idx, 2 * idx + 2)
+            trx = Transaction()
+            try:
+                for account, info, seed in zip(account_list[pair], info_list[pair], seed_list[pair]):
+                    if info is None:
+                        logger.debug("Minimum balance required for account {}".format(minimum_balance))
+                        trx.add(self._instruction.create_account_with_seed_trx(account, seed, minimum_balance, STORAGE_SIZE))
+                    else:
+                        if info.lamports < minimum_balance:
+                            raise Exception("insufficient balance")
+                        if PublicKey(info.owner) != PublicKey(EVM_LOADER_ID):
+                            raise Exception("wrong owner")
+                        if info.tag not in {EMPTY_STORAGE_TAG, FINALIZED_STORAGE_TAG}:
+                            raise Exception("not empty, not finalized")
+
+                if len(trx.instructions) > 0:
+                    self._sender.send_transaction(trx, eth_trx=None, reason='createAccountWithSeed')
+            except Exception as err:
+                logger.warning("Account is locked err({}) id({}) owner({})".format(str(err), acc_id, operator_key))
+                continue
+            ready.append(PermAccounts(acc_id, *account_list[pair]))
+        return ready
+
+
+_pools_lock = threading.Lock()
+_pools: Dict[Tuple[int, str], PermAccountPool] = {}
+
+
+def perm_account_pool(solana_interactor: SolanaInteractor) -> PermAccountPool:
+    """Returns the pool of the operator in the current process, the pool starts to prepare accounts on creation"""
+    key = (os.getpid(), str(solana_interactor.get_operator_key()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = PermAccountPool(solana_interactor, PERM_ACCOUNT_POOL_SIZE, PERM_ACCOUNT_POOL_MAX_SIZE,
+                                   PERM_ACCOUNT_POOL_WAIT_TIMEOUT)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,185 @@
+import base58
+import logging
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .step_budgets import get_iteration_steps
+from ..environment import EVM_LOADER_ID
+from ..indexer.utils import NeonTxResultInfo
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+BLOCKED_ACCOUNT_LOGS = ("trying to execute transaction on ro locked account",
+                        "trying to execute transaction on rw locked account")
+COMPUTE_LIMIT_ERRORS = ('ProgramFailedToComplete', 'ComputationalBudgetExceeded')
+KECCAK_PROGRAM_ID = 'KeccakSecp256k11111111111111111111111111111'
+# Tag of the Neon EVM event with the result of the transaction
+NEON_EVENT_RETURN = 6
+
+
+class ReceiptInfo:
+    """
+    Everything the proxy reads from a Solana transaction receipt, found by one pass over it.
+
+    The receipt can be a getTransaction result, an RPC response with it, the result of SendTransactionError
+    or a dict with 'err' and 'logs'; the shape is recognized once. Events and compute measurements are available
+    only for getTransaction results.
+    """
+    def __init__(self, receipt: Dict[str, Any]):
+        self.receipt = receipt
+        self.transaction: Optional[Dict[str, Any]] = None
+        self.error = None
+        self.instruction_error = None
+        self.logs: Optional[List[str]] = None
+        self.is_blocked = False
+        self.signature: Optional[str] = None
+        self.slot: Optional[int] = None
+        self.cost: Optional[int] = None
+        self.used_gas: Optional[int] = None
+        self.iteration_steps: Optional[int] = None
+        # Data of Neon EVM events with indexes of their instructions
+        self.events: List[Tuple[int, bytes]] = []
+        self.measurements: List[Dict[str, Any]] = []
+        self.measurement_error: Optional[str] = None
+
+        self._normalize(receipt)
+        instructions = self._scan_instructions() if self.transaction is not None else []
+        self._scan_logs(instructions)
+
+    def is_error(self) -> bool:
+        """True if an instruction failed, see also `error` for errors of the whole transaction"""
+        return self.instruction_error is not None
+
+    def is_compute_limit_exceeded(self) -> bool:
+        return isinstance(self.instruction_error, list) and (self.instruction_error[1] in COMPUTE_LIMIT_ERRORS)
+
+    def is_storage_empty(self) -> bool:
+        if not isinstance(self.instruction_error, list) or not isinstance(self.instruction_error[1], dict):
+            return False
+        return self.instruction_error[1].get('Custom') in (1, 4)
+
+    def get_neon_res(self, ix_idx: int = -1) -> NeonTxResultInfo:
+        """Results of the Neon transaction, from all evm_loader instructions or from the instruction ix_idx"""
+        neon_res = NeonTxResultInfo()
+        for event_ix_idx, log in self.events:
+            if ix_idx in (-1, event_ix_idx):
+                neon_res.decode_event(log, event_ix_idx, self.transaction)
+        return neon_res
+
+    def _normalize(self, receipt: Dict[str, Any]):
+        result = receipt.get('result')
+        if isinstance(result, dict) and ('meta' in result):
+            self.transaction = result
+        elif 'meta' in receipt:
+            self.transaction = receipt
+
+        if self.transaction is not None:
+            meta = self.transaction['meta'] or {}
+            self.error = meta.get('err')
+            self.logs = meta.get('logMessages')
+        else:
+            data = receipt.get('data')
+            data = data if isinstance(data, dict) else {}
+            self.error = data.get('err', receipt.get('err'))
+            for logs in (receipt.get('logMessages'), data.get('logs'), receipt.get('logs')):
+                if logs is not None:
+                    self.logs = logs
+                    break
+
+        if isinstance(self.error, dict):
+            self.instruction_error = self.error.get('InstructionError')
+
+    def _scan_instructions(self) -> List[Tuple[str, Optional[str]]]:
+        """Returns programs of instructions with data of evm_loader ones, collects events, gas and cost"""
+        tx = self.transaction
+        meta = tx['meta'] or {}
+        self.signature = tx['transaction']['signatures'][0]
+        self.slot = tx.get('slot')
+        if meta.get('preBalances') and meta.get('postBalances'):
+            self.cost = meta['preBalances'][0] - meta['postBalances'][0]
+
+        message = tx['transaction']['message']
+        accounts = message['accountKeys']
+        instructions = []
+        for ix in message['instructions']:
+            program = accounts[ix['programIdIndex']]
+            data = None
+            if program == EVM_LOADER_ID:
+                data = base58.b58decode(ix['data']).hex()
+                if self.iteration_steps is None:
+                    self.iteration_steps = get_iteration_steps(data)
+            instructions.append((program, data))
+
+        for inner in meta.get('innerInstructions') or []:
+            ix_idx = inner['index']
+            if instructions[ix_idx][0] != EVM_LOADER_ID:
+                continue
+            for event in inner['instructions']:
+                if accounts[event['programIdIndex']] != EVM_LOADER_ID:
+                    continue
+                log = base58.b58decode(event['data'])
+                self.events.append((ix_idx, log))
+                if log[0] == NEON_EVENT_RETURN:
+                    self.used_gas = int.from_bytes(log[2:10], 'little')
+        return instructions
+
+    def _scan_logs(self, instructions: List[Tuple[str, Optional[str]]]):
+        """Finds blocked accounts in logs of failed transactions, and measurements of successful ones"""
+        if self.logs is None:
+            return
+        if self.error is not None:
+            self.is_blocked = any(blocked in log for log in self.logs for blocked in BLOCKED_ACCOUNT_LOGS)
+            return
+        if self.transaction is None:
+            return
+
+        # Logs of each top-level instruction start with 'Program <id> invoke [1]'
+        groups: List[Tuple[str, List[str]]] = []
+        for log in self.logs:
+            if log.startswith('Program ') and log.endswith(' invoke [1]'):
+                groups.append((log[8:-11], []))
+            if not groups:
+                self.measurement_error = f'Log before the first instruction: {log}'
+                return
+            groups[-1][1].append(log)
+
+        try:
+            self.measurements = self._get_measurements(instructions, groups)
+        except Exception as err:
+            self.measurement_error = str(err)
+
+    @staticmethod
+    def _get_measurements(instructions: List[Tuple[str, Optional[str]]],
+                          groups: List[Tuple[str, List[str]]]) -> List[Dict[str, Any]]:
+        measurements = []
+        groups = iter(groups)
+        for program, data in instructions:
+            if program == KECCAK_PROGRAM_ID:
+                continue
+            group_program, logs = next(groups, (None, []))
+            if group_program != program:
+                raise Exception(f'Invalid program in log messages: expect {group_program}, actual {program}')
+            if not logs[-1].startswith(f'Program {program} success'):
+                raise Exception("Can't get exit result")
+            if program != EVM_LOADER_ID:
+                continue
+
+            memory_prefix = 'Program log: Total memory occupied: '
+            consumed_prefix = f'Program {program} consumed '
+            if len(logs) < 3 or not logs[-3].startswith(memory_prefix) or not logs[-2].startswith(consumed_prefix):
+                raise Exception("Can't parse measurements for evm_loader")
+            measurements.append({
+                'program': program,
+                'measurements': {
+                    'instructions': logs[-2][len(consumed_prefix):].split(' ', 1)[0],
+                    'memory': logs[-3][len(memory_prefix):].split(' ', 1)[0],
+                },
+                'result': 'success',
+                'data': data,
+            })
+        return measurements
+
+
+def analyze_receipt(receipt: Dict[str, Any]) -> ReceiptInfo:
+    return ReceiptInfo(receipt)
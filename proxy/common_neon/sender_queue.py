@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+
+from ..environment import SENDER_QUEUE_TIMEOUT, SENDER_QUEUE_MAX_GAP, SENDER_LOCK_TIMEOUT
+from ..indexer.pg_common import pg_listener
+from ..indexer.sender_locks_db import SenderLocksDB
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class SenderQueue:
+    """
+    Orders transactions of the same sender across worker processes.
+
+    ordered() lets only one transaction of the sender be checked and executed at a time. Threads of the process wait
+    for each other without DB connections; across processes the sender is leased by a row of neon_sender_locks,
+    which is inserted and deleted by short statements, so no DB transaction is open while the transaction is executed.
+    A lease older than lock_timeout seconds is taken over, so the sender isn't stuck after its worker dies.
+
+    A transaction with a nonce ahead of the sender's one, by no more than max_gap, waits up to queue_timeout seconds
+    for the preceding transactions without the lease: it is woken by a notification sent when a transaction of
+    the sender is done.
+    """
+    CHANNEL = 'neon_sender_done'
+    # Payload suffix of a lease freed without execution: it doesn't change the nonce
+    UNLOCKED = ':unlocked'
+    # Leases of dead workers don't send notifications, so waiters for a lease check it periodically
+    LOCK_POLL_INTERVAL = 1.0
+
+    def __init__(self, locks_db: SenderLocksDB, queue_timeout: float, max_gap: int, lock_timeout: float):
+        self.queue_timeout = queue_timeout
+        self.max_gap = max_gap
+        self.lock_timeout = lock_timeout
+        self._db = locks_db
+        self._cond = threading.Condition()
+        # Senders locked by threads of the process
+        self._owners: Set[str] = set()
+        # Senders with waiting transactions and the number of notifications about each of them
+        self._waiting: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._unlocks: Dict[str, int] = {}
+        self._epoch = 0
+        self._queued = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        pg_listener(self.CHANNEL).subscribe(self._on_notification)
+
+    @contextmanager
+    def ordered(self, sender: str, nonce: int, get_nonce: Callable[[], int],
+                queue_timeout: Optional[float] = None) -> Iterator[int]:
+        """
+        Yields the current nonce of the sender, while no other transaction of the sender is executed.
+        It is equal to the nonce of the transaction, unless the transaction is late or its predecessors are missing.
+        """
+        sender = sender.lower()
+        start_time = time.time()
+        deadline = start_time + (self.queue_timeout if queue_timeout is None else queue_timeout)
+        is_queued = False
+        is_waiting = True
+
+        self._add_waiting(sender, 1)
+        try:
+            while True:
+                owner = self._lock(sender)
+                is_started = False
+                try:
+                    with self._cond:
+                        version = (self._versions.get(sender, 0), self._epoch)
+                    current_nonce = get_nonce()
+                    remaining_time = deadline - time.time()
+                    if (nonce <= current_nonce) or (nonce - current_nonce > self.max_gap) or (remaining_time <= 0):
+                        is_waiting = False
+                        self._add_waiting(sender, -1)
+                        self._on_dequeued(is_queued, start_time)
+                        is_started = True
+                        yield current_nonce
+                        return
+                finally:
+                    # The failed transaction could change the nonce too
+                    self._unlock(sender, owner, is_started)
+
+                if not is_queued:
+                    is_queued = True
+                    logger.debug(f'Transaction {sender}:{nonce} waits for the nonce {current_nonce}')
+                with self._cond:
+                    self._cond.wait_for(lambda: version != (self._versions.get(sender, 0), self._epoch),
+                                        timeout=remaining_time)
+        finally:
+            if is_waiting:
+                self._add_waiting(sender, -1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'waiting_senders': len(self._waiting),
+                'locked_senders': len(self._owners),
+                'queued': self._queued,
+                'avg_wait_time': self._wait_time / self._queued if self._queued else 0.0,
+                'max_wait_time': self._max_wait_time,
+            }
+
+    def _lock(self, sender: str) -> str:
+        """Takes the sender in the process, then its lease, returns the owner of the lease"""
+        deadline = time.time() + self.lock_timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: sender not in self._owners, timeout=self.lock_timeout):
+                raise TimeoutError(f'Sender {sender} is locked for more than {self.lock_timeout} seconds')
+            self._owners.add(sender)
+
+        owner = f'{os.getpid()}:{os.urandom(8).hex()}'
+        try:
+            while True:
+                with self._cond:
+                    version = (self._unlocks.get(sender, 0), self._epoch)
+                if self._db.try_lock(sender, owner, self.lock_timeout):
+                    return owner
+                remaining_time = deadline - time.time()
+                if remaining_time <= 0:
+                    raise TimeoutError(f'Sender {sender} is leased for more than {self.lock_timeout} seconds')
+                with self._cond:
+                    self._cond.wait_for(lambda: version != (self._unlocks.get(sender, 0), self._epoch),
+                                        timeout=min(remaining_time, self.LOCK_POLL_INTERVAL))
+        except BaseException:
+            with self._cond:
+                self._owners.discard(sender)
+                self._cond.notify_all()
+            raise
+
+    def _unlock(self, sender: str, owner: str, is_started: bool):
+        try:
+            self._db.unlock(sender, owner, self.CHANNEL, sender if is_started else sender + self.UNLOCKED)
+        except Exception as err:
+            logger.warning(f'Failed to unlock {sender}, the lease expires in {self.lock_timeout} seconds: {err}')
+        with self._cond:
+            self._owners.discard(sender)
+            if is_started:
+                # Local waiters don't wait for the notification to come back
+                self._on_sender_done(sender, True)
+            self._cond.notify_all()
+
+    def _add_waiting(self, sender: str, count: int):
+        with self._cond:
+            count += self._waiting.get(sender, 0)
+            if count:
+                self._waiting[sender] = count
+            else:
+                del self._waiting[sender]
+                self._versions.pop(sender, None)
+                self._unlocks.pop(sender, None)
+
+    def _on_dequeued(self, is_queued: bool, start_time: float):
+        if not is_queued:
+            return
+        wait_time = time.time() - start_time
+        with self._cond:
+            self._queued += 1
+            self._wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def _on_notification(self, payload: Optional[str]):
+        with self._cond:
+            if payload is None:
+                # Notifications could be lost, while the listener was reconnecting
+                self._epoch += 1
+            elif payload.endswith(self.UNLOCKED):
+                self._on_sender_done(payload[:-len(self.UNLOCKED)], False)
+            else:
+                self._on_sender_done(payload, True)
+            self._cond.notify_all()
+
+    def _on_sender_done(self, sender: str, is_executed: bool):
+        """Counts the notification, the caller holds the condition"""
+        if sender not in self._waiting:
+            return
+        self._unlocks[sender] = self._unlocks.get(sender, 0) + 1
+        if is_executed:
+            self._versions[sender] = self._versions.get(sender, 0) + 1
+
+
+_queue_lock = threading.Lock()
+_queue: Optional[SenderQueue] = None
+_queue_pid: Optional[int] = None
+
+
+def sender_queue() -> SenderQueue:
+    """Returns the sender queue of the current process"""
+    global _queue, _queue_pid
+
+    with _queue_lock:
+        if _queue is None or _queue_pid != os.getpid():
+            _queue = SenderQueue(SenderLocksDB(), SENDER_QUEUE_TIMEOUT, SENDER_QUEUE_MAX_GAP, SENDER_LOCK_TIMEOUT)
+            _queue_pid = os.getpid()
+        return _queue
@@ -0,0 +1,149 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from solana.account import Account as sol_Account
+from solana.rpc.api import Client as SolanaClient
+from solana.rpc.commitment import Confirmed
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..environment import OPERATOR_KEYPAIR_DIR, OPERATOR_STATS_INTERVAL
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def read_keypair(path: str) -> sol_Account:
+    """Reads a keypair file in the format of solana-keygen: a JSON list of 64 bytes"""
+    with open(path.strip(), mode='r') as file:
+        pk = (file.read())
+        nums = list(map(int, pk.strip("[] \n").split(',')))
+        nums = nums[0:32]
+        values = bytes(nums)
+        return sol_Account(values)
+
+
+def read_keypair_dir(path: str) -> List[sol_Account]:
+    """Reads all *.json keypairs of the directory in the order of file names, duplicates are skipped"""
+    signers = []
+    key_set = set()
+    for file_path in sorted(glob.glob(os.path.join(path, '*.json'))):
+        signer = read_keypair(file_path)
+        key = str(signer.public_key())
+        if key in key_set:
+            logger.warning(f'Operator {key} from {file_path} is duplicated')
+            continue
+        key_set.add(key)
+        signers.append(signer)
+    return signers
+
+
+class OperatorStats:
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.balance: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = self.requests - self.in_flight
+        return {
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_time': self.total_time / done if done else 0.0,
+            'balance': self.balance,
+        }
+
+
+class SignerPool:
+    """
+    Operator keypairs which sign Solana transactions of requests.
+
+    signer() gives the operator with the least number of requests in flight. Ties are broken in round-robin
+    order, which starts from a different operator in each worker, so idle workers don't pile onto the first
+    operator. While stats_interval > 0, a background thread logs the balance and throughput of each operator.
+    """
+    def __init__(self, signers: List[sol_Account], client: SolanaClient, start_index: int = 0,
+                 stats_interval: float = 0):
+        if not len(signers):
+            raise Exception("no operator keypairs")
+        self.signers = signers
+        self._client = client
+        self._lock = threading.Lock()
+        self._stats = [OperatorStats() for _ in signers]
+        self._next_index = start_index % len(signers)
+
+        if stats_interval > 0:
+            self._stats_interval = stats_interval
+            threading.Thread(target=self._log_stats, daemon=True).start()
+
+    def __len__(self):
+        return len(self.signers)
+
+    @contextmanager
+    def signer(self) -> Iterator[sol_Account]:
+        idx = self._acquire()
+        start_time = time.time()
+        is_ok = False
+        try:
+            yield self.signers[idx]
+            is_ok = True
+        finally:
+            with self._lock:
+                stats = self._stats[idx]
+                stats.in_flight -= 1
+                stats.total_time += time.time() - start_time
+                if not is_ok:
+                    stats.errors += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {str(signer.public_key()): stats.as_dict() for signer, stats in zip(self.signers, self._stats)}
+
+    def update_balances(self):
+        for signer, stats in zip(self.signers, self._stats):
+            try:
+                balance = self._client.get_balance(signer.public_key(), commitment=Confirmed)['result']['value']
+            except Exception as err:
+                logger.warning(f'Failed to get balance of operator {signer.public_key()}: {err}')
+                continue
+            with self._lock:
+                stats.balance = balance
+
+    def _acquire(self) -> int:
+        with self._lock:
+            count = len(self.signers)
+            order = [(self._next_index + shift) % count for shift in range(count)]
+            idx = min(order, key=lambda i: self._stats[i].in_flight)
+            self._next_index = (idx + 1) % count
+            stats = self._stats[idx]
+            stats.in_flight += 1
+            stats.requests += 1
+            return idx
+
+    def _log_stats(self):
+        while True:
+            time.sleep(self._stats_interval)
+            self.update_balances()
+            for key, stats in self.get_stats().items():
+                logger.debug(f'Operator {key}: {stats}')
+
+
+def get_operator_signers(default_signer: sol_Account) -> List[sol_Account]:
+    """Returns operators from OPERATOR_KEYPAIR_DIR, or only the default signer if the directory isn't set"""
+    if not OPERATOR_KEYPAIR_DIR:
+        return [default_signer]
+    signers = read_keypair_dir(OPERATOR_KEYPAIR_DIR)
+    if not len(signers):
+        raise Exception(f'no operator keypairs in {OPERATOR_KEYPAIR_DIR}')
+    logger.debug(f'Loaded {len(signers)} operators from {OPERATOR_KEYPAIR_DIR}')
+    return signers
+
+
+def signer_pool(default_signer: sol_Account, client: SolanaClient, start_index: int = 0) -> SignerPool:
+    return SignerPool(get_operator_signers(default_signer), client, start_index, OPERATOR_STATS_INTERVAL)
@@ -0,0 +1,148 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+from .lru_cache import LRUCache
+from ..environment import EVM_STEPS_MIN, EVM_STEPS_MAX, EVM_STEPS_COMPUTE_UNITS
+from ..indexer.step_budgets_db import StepBudgetsDB
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Tags of iterative instructions, their data is: tag, collateral pool index (4 bytes), step count (8 bytes)
+ITERATIVE_INSTRUCTION_TAGS = ('0d', '0e')
+
+
+def get_iteration_steps(instruction_data: str) -> Optional[int]:
+    """Returns the step count of an iterative evm_loader instruction, or None for other instructions"""
+    if instruction_data[:2].lower() not in ITERATIVE_INSTRUCTION_TAGS or len(instruction_data) < 26:
+        return None
+    return int.from_bytes(bytes.fromhex(instruction_data[10:26]), byteorder='little')
+
+
+class StepBudgetSample:
+    """Iterations of one transaction, StepBudgets.submit() adds them to the averages by one update"""
+    def __init__(self, contract: Optional[bytes], compute_units: int):
+        self.contract = contract
+        self.compute_units = compute_units
+        self.iteration_compute_units = 0
+        self.iteration_steps = 0
+        self.min_cu_per_step: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return not self.contract or (self.iteration_steps == 0 and self.min_cu_per_step is None)
+
+    def get_cu_per_step(self) -> Optional[float]:
+        if self.iteration_steps == 0:
+            return None
+        return self.iteration_compute_units / self.iteration_steps
+
+    def on_iteration(self, measurements: List[Dict[str, Any]]):
+        """Learns from measurements of a successful iteration, see ReceiptInfo.measurements"""
+        for measurement in measurements:
+            steps = get_iteration_steps(measurement['data'])
+            if not steps:
+                continue
+            self.iteration_compute_units += int(measurement['measurements']['instructions'])
+            self.iteration_steps += steps
+
+    def on_compute_limit(self, steps: int):
+        """The iteration with the step count exceeded the compute limit"""
+        if not steps:
+            return
+        cu_per_step = 1.1 * self.compute_units / steps
+        self.min_cu_per_step = max(self.min_cu_per_step or 0.0, cu_per_step)
+
+
+class StepBudgets:
+    """
+    Number of EVM steps per iteration for each contract, learned from compute units spent by its iterations.
+
+    The table keeps an exponential moving average of compute units per step for each contract address, the budget
+    is the number of steps which fits into compute_units. The average includes the constant overhead of an
+    iteration, so the estimation is conservative. An iteration which exceeded the compute limit raises the average
+    to 110% of the value at which the iteration would fit.
+
+    A transaction collects its iterations in a StepBudgetSample, a background thread adds the sample to the table
+    by one atomic statement. Averages are read from the table at most once in CACHE_TTL seconds.
+    """
+    CACHE_SIZE = 10000
+    CACHE_TTL = 60.0
+    QUEUE_SIZE = 1000
+
+    def __init__(self, db: StepBudgetsDB, compute_units: int, min_steps: int, max_steps: int, alpha: float = 0.2):
+        self.compute_units = compute_units
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+        self.alpha = alpha
+        self._db = db
+        # contract -> (cu_per_step or None, expiration time)
+        self._cache = LRUCache(self.CACHE_SIZE)
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def get_steps(self, contract: Optional[bytes], default_steps: int) -> int:
+        if not contract:
+            return default_steps
+        cu_per_step = self._get_cu_per_step(contract.hex())
+        if cu_per_step is None:
+            return default_steps
+        steps = int(self.compute_units / cu_per_step)
+        return min(max(steps, self.min_steps), self.max_steps)
+
+    def new_sample(self, contract: Optional[bytes]) -> StepBudgetSample:
+        return StepBudgetSample(contract, self.compute_units)
+
+    def submit(self, sample: StepBudgetSample):
+        """Queues the sample for the background writer, the sample is dropped if the queue is full"""
+        if sample.is_empty():
+            return
+        try:
+            self._queue.put_nowait(sample)
+        except queue.Full:
+            logger.warning(f'Step budget queue is full, the sample of 0x{sample.contract.hex()} is dropped')
+
+    def update(self, sample: StepBudgetSample):
+        key = sample.contract.hex()
+        cu_per_step = self._db.update(key, sample.get_cu_per_step(), sample.min_cu_per_step, self.alpha)
+        self._cache.put(key, (cu_per_step, time.time() + self.CACHE_TTL))
+        logger.debug(f'Step budget of 0x{key}: {cu_per_step} CU per step')
+
+    def _get_cu_per_step(self, key: str) -> Optional[float]:
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+        cu_per_step = self._db.get_cu_per_step(key)
+        self._cache.put(key, (cu_per_step, time.time() + self.CACHE_TTL))
+        return cu_per_step
+
+    def _write(self):
+        while True:
+            sample = self._queue.get()
+            try:
+                self.update(sample)
+            except Exception as err:
+                logger.warning(f'Failed to update the step budget of 0x{sample.contract.hex()}: {err}')
+            finally:
+                self._queue.task_done()
+
+
+_budgets_lock = threading.Lock()
+_budgets: Optional[StepBudgets] = None
+_budgets_pid: Optional[int] = None
+
+
+def step_budgets() -> StepBudgets:
+    """Returns the step budgets of the current process, the table is created on the first call"""
+    global _budgets, _budgets_pid
+
+    with _budgets_lock:
+        if _budgets is None or _budgets_pid != os.getpid():
+            _budgets = StepBudgets(StepBudgetsDB(), EVM_STEPS_COMPUTE_UNITS, EVM_STEPS_MIN, EVM_STEPS_MAX)
+            _budgets_pid = os.getpid()
+        return _budgets
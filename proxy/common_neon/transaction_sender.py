@@ -2,7 +2,7 @@ import json
 import logging
 import math
 import os
-from typing import List
+from typing import Any, Dict, List, Optional
 import rlp
 import time
 
@@ -11,18 +11,16 @@ from sha3 import keccak_256
 from solana.sysvar import *
 from solana.transaction import AccountMeta, Transaction
 
-from proxy.indexer.utils import check_error
-
-from ..core.acceptor.pool import new_acc_id_glob, acc_list_glob
-
 from .address import accountWithSeed, AccountInfo, getTokenAddr
-from .constants import STORAGE_SIZE, EMPTY_STORAGE_TAG, FINALIZED_STORAGE_TAG, ACCOUNT_SEED_VERSION
-from .emulator_interactor import call_emulated
+from .constants import ACCOUNT_SEED_VERSION
+from .emulator_interactor import call_emulated, emulation_cache, get_emulation_key
+from .execution_planner import ExecutionPlan, execution_planner, get_transaction_size
 from .layouts import ACCOUNT_INFO_LAYOUT
 from .neon_instruction import NeonInstruction
-from .solana_interactor import SolanaInteractor, check_for_errors,\
-    check_if_program_exceeded_instructions, check_if_accounts_blocked, get_logs_from_reciept
-from ..environment import EVM_LOADER_ID, RETRY_ON_BLOCKED
+from .perm_account_pool import perm_account_pool
+from .solana_interactor import SolanaInteractor
+from .step_budgets import StepBudgetSample, step_budgets
+from ..environment import RETRY_ON_BLOCKED, MAX_STEPS_IN_PACK, HOLDER_WRITE_WINDOW, HOLDER_WRITE_MAX_ATTEMPTS
 from ..indexer.utils import NeonTxResultInfo
 from ..common_neon.eth_proto import Trx as EthTrx
 
@@ -34,7 +32,8 @@ class TransactionSender:
     def __init__(self, solana_interactor: SolanaInteractor, eth_trx: EthTrx, steps: int) -> None:
         self.sender = solana_interactor
         self.eth_trx = eth_trx
-        self.steps = steps
+        self.steps = step_budgets().get_steps(eth_trx.toAddress, steps)
+        self.step_budget_sample = step_budgets().new_sample(eth_trx.toAddress)
 
         self.instruction = NeonInstruction(self.sender.get_operator_key())
 
@@ -44,56 +43,64 @@ class TransactionSender:
 
         noniterative_executor = self.create_noniterative_executor()
 
-        call_iterative = False
-        call_from_holder = False
+        planner = execution_planner()
+        is_deploy = not self.eth_trx.toAddress
+        trx_size, account_count = (0, 0) if is_deploy else \
+            get_transaction_size(noniterative_executor.make_call_transaction(), self.sender.get_operator_key())
+        plan = planner.plan(is_deploy=is_deploy, steps_emulated=self.steps_emulated, steps=self.steps,
+                            trx_size=trx_size, account_count=account_count)
+        strategy = plan.strategy
 
-        if not self.eth_trx.toAddress:
-            call_from_holder = True
-        else:
+        if strategy == planner.NONITERATIVE:
             try:
                 logger.debug("Try single trx call")
-                return noniterative_executor.call_signed_noniterative()
+                result = noniterative_executor.call_signed_noniterative()
+                planner.record(plan, planner.NONITERATIVE)
+                return result
             except Exception as err:
                 logger.debug(str(err))
                 errStr = str(err)
                 if "Program failed to complete" in errStr or "Computational budget exceeded" in errStr:
                     logger.debug("Program exceeded instructions")
-                    if self.steps_emulated / self.steps > self.steps / 2:
-                        """
-                            An iterative call from instruction data can be performed in batches only
-                            with a change in the number of steps in the iteration.
-                            Each next iteration the number of steps decreases.
-                            Thus, starting from a certain number of steps,
-                            it is appropriate to use a call from the account data,
-                            since there the number of steps is unchanged.
-                        """
-                        call_from_holder = True
-                    else:
-                        call_iterative = True
+                    strategy = planner.iterative_strategy(self.steps_emulated, self.steps)
                 elif str(err).startswith("transaction too large:"):
                     logger.debug("Transaction too large, call call_signed_with_holder_acc():")
-                    call_from_holder = True
+                    strategy = planner.HOLDER
                 else:
                     raise
 
         self.init_perm_accs()
-        iterative_executor = self.create_iterative_executor()
         try:
-            if call_iterative:
-                try:
-                    return iterative_executor.call_signed_iterative_combined()
-                except Exception as err:
-                    logger.debug(str(err))
-                    if str(err).startswith("transaction too large:"):
-                        logger.debug("Transaction too large, call call_signed_with_holder_acc():")
-                        call_from_holder = True
-                    else:
-                        raise
-
-            if call_from_holder:
-                return iterative_executor.call_signed_with_holder_combined()
+            result = self.execute_iterative(plan, strategy)
+        except BaseException:
+            self.free_perm_accs(is_valid=False)
+            raise
         finally:
-            self.free_perm_accs()
+            step_budgets().submit(self.step_budget_sample)
+        self.free_perm_accs(is_valid=True)
+        return result
+
+
+    def execute_iterative(self, plan: ExecutionPlan, strategy: str):
+        planner = execution_planner()
+        iterative_executor = self.create_iterative_executor()
+        if strategy == planner.ITERATIVE:
+            try:
+                result = iterative_executor.call_signed_iterative_combined()
+                planner.record(plan, planner.ITERATIVE)
+                return result
+            except Exception as err:
+                logger.debug(str(err))
+                if str(err).startswith("transaction too large:"):
+                    logger.debug("Transaction too large, call call_signed_with_holder_acc():")
+                    strategy = planner.HOLDER
+                else:
+                    raise
+
+        if strategy == planner.HOLDER:
+            result = iterative_executor.call_signed_with_holder_combined()
+            planner.record(plan, planner.HOLDER)
+            return result
 
 
     def create_noniterative_executor(self):
@@ -103,43 +110,17 @@ class TransactionSender:
 
     def create_iterative_executor(self):
         self.instruction.init_iterative(self.storage, self.holder, self.perm_accs_id)
-        return IterativeTransactionSender(self.sender, self.instruction, self.create_acc_trx, self.eth_trx, self.steps, self.steps_emulated)
+        return IterativeTransactionSender(self.sender, self.instruction, self.create_acc_trx, self.eth_trx, self.steps, self.steps_emulated,
+                                          self.step_budget_sample)
 
 
     def init_perm_accs(self):
-        while True:
-            with new_acc_id_glob.get_lock():
-                try:
-                    self.perm_accs_id = acc_list_glob.pop(0)
-                except IndexError:
-                    self.perm_accs_id = new_acc_id_glob.value
-                    new_acc_id_glob.value += 1
-
-            logger.debug("LOCK RESOURCES {}".format(self.perm_accs_id))
+        self.perm_accs = perm_account_pool(self.sender).acquire()
+        self.perm_accs_id, self.storage, self.holder = self.perm_accs
 
-            acc_id_bytes = self.perm_accs_id.to_bytes((self.perm_accs_id.bit_length() + 7) // 8, 'big')
 
-            storage_seed = keccak_256(b"storage" + acc_id_bytes).hexdigest()[:32]
-            storage_seed = bytes(storage_seed, 'utf8')
-
-            holder_seed = keccak_256(b"holder" + acc_id_bytes).hexdigest()[:32]
-            holder_seed = bytes(holder_seed, 'utf8')
-
-            try:
-                self.storage, self.holder = self.create_multiple_accounts_with_seed(
-                        seeds=[storage_seed, holder_seed],
-                        sizes=[STORAGE_SIZE, STORAGE_SIZE]
-                    )
-            except Exception as err:
-                logger.warn("Account is locked err({}) id({}) owner({})".format(str(err), self.perm_accs_id, self.sender.get_operator_key()))
-            else:
-                break
-
-
-    def free_perm_accs(self):
-        logger.debug("FREE RESOURCES {}".format(self.perm_accs_id))
-        with new_acc_id_glob.get_lock():
-            acc_list_glob.append(self.perm_accs_id)
+    def free_perm_accs(self, is_valid: bool):
+        perm_account_pool(self.sender).release(self.perm_accs, is_valid)
 
 
     def create_account_with_seed(self, seed, storage_size):
@@ -156,30 +137,16 @@ class TransactionSender:
         return account
 
 
-    def create_multiple_accounts_with_seed(self, seeds: List[bytes], sizes: List[int]) -> List[PublicKey]:
-        accounts = list(map(lambda seed: accountWithSeed(self.sender.get_operator_key(), seed), seeds))
-        accounts_info = self.sender.get_multiple_accounts_info(accounts)
-        minimum_balances = self.sender.get_multiple_rent_exempt_balances_for_size(sizes)
-
-        trx = Transaction()
-
-        for account_key, account_info, seed, minimum_balance, storage_size in zip(accounts, accounts_info, seeds, minimum_balances, sizes):
-            if account_info is None:
-                logger.debug("Minimum balance required for account {}".format(minimum_balance))
-                trx.add(self.instruction.create_account_with_seed_trx(account_key, seed, minimum_balance, storage_size))
-            else:
-                if account_info.lamports < minimum_balance:
-                    raise Exception("insufficient balance")
-                if PublicKey(account_info.owner) != PublicKey(EVM_LOADER_ID):
-                    raise Exception("wrong owner")
-                if account_info.tag not in {EMPTY_STORAGE_TAG, FINALIZED_STORAGE_TAG}:
-                    raise Exception("not empty, not finalized")
-
-        if len(trx.instructions) > 0:
-            self.sender.send_transaction(trx, eth_trx=self.eth_trx, reason='createAccountWithSeed')
-
-        return accounts
-
+    def get_estimate_emulation(self, to_address_arg: str) -> Optional[Dict[str, Any]]:
+        cache = emulation_cache()
+        if not cache.is_enabled():
+            return None
+        key = get_emulation_key(to_address_arg, self.eth_trx.sender(), self.eth_trx.callData.hex(),
+                                hex(self.eth_trx.value), self.eth_trx.nonce)
+        result = cache.pop(key)
+        state = 'reused' if result is not None else 'not found'
+        logger.debug(f'Emulation of the estimate is {state}: {cache.get_stats()}')
+        return result
 
     def create_account_list_by_emulate(self):
         sender_ether = bytes.fromhex(self.eth_trx.sender())
@@ -196,7 +163,9 @@ class TransactionSender:
         logger.debug("send_addr: %s", self.eth_trx.sender())
         logger.debug("dest_addr: %s", to_address.hex())
 
-        output_json = call_emulated(to_address_arg, sender_ether.hex(), self.eth_trx.callData.hex(), hex(self.eth_trx.value))
+        output_json = self.get_estimate_emulation(to_address_arg)
+        if output_json is None:
+            output_json = call_emulated(to_address_arg, sender_ether.hex(), self.eth_trx.callData.hex(), hex(self.eth_trx.value))
         logger.debug("emulator returns: %s", json.dumps(output_json, indent=3))
 
         # resize storage account
@@ -315,25 +284,30 @@ class NoniterativeTransactionSender:
         self.eth_trx = eth_trx
 
 
-    def call_signed_noniterative(self):
+    def make_call_transaction(self) -> Transaction:
         call_txs_05 = Transaction()
         if len(self.create_acc_trx.instructions) > 0:
             call_txs_05.add(self.create_acc_trx)
         call_txs_05.add(self.instruction.make_noniterative_call_transaction(len(call_txs_05.instructions)))
+        return call_txs_05
+
+
+    def call_signed_noniterative(self):
+        call_txs_05 = self.make_call_transaction()
 
         for _i in range(RETRY_ON_BLOCKED):
-            result = self.sender.send_measured_transaction(call_txs_05, self.eth_trx, 'CallFromRawEthereumTX')
+            receipt = self.sender.send_measured_transaction(call_txs_05, self.eth_trx, 'CallFromRawEthereumTX')
 
-            if check_for_errors(result):
-                if check_if_program_exceeded_instructions(result):
+            if receipt.is_error():
+                if receipt.is_compute_limit_exceeded():
                     raise Exception("Program failed to complete")
-                elif check_if_accounts_blocked(result):
+                elif receipt.is_blocked:
                     time.sleep(0.5)
                     continue
                 else:
-                    raise Exception(json.dumps(result['meta']))
+                    raise Exception(json.dumps(receipt.receipt['meta']))
             else:
-                return (NeonTxResultInfo(result), result['transaction']['signatures'][0])
+                return (receipt.get_neon_res(), receipt.signature)
 
 
 class IterativeTransactionSender:
@@ -353,13 +327,15 @@ class IterativeTransactionSender:
             self.step_count = step_count
 
 
-    def __init__(self, solana_interactor: SolanaInteractor, neon_instruction: NeonInstruction, create_acc_trx: Transaction, eth_trx: EthTrx, steps: int, steps_emulated: int):
+    def __init__(self, solana_interactor: SolanaInteractor, neon_instruction: NeonInstruction, create_acc_trx: Transaction, eth_trx: EthTrx, steps: int, steps_emulated: int,
+                 step_budget_sample: StepBudgetSample):
         self.sender = solana_interactor
         self.instruction = neon_instruction
         self.create_acc_trx = create_acc_trx
         self.eth_trx = eth_trx
         self.steps = steps
         self.steps_emulated = steps_emulated
+        self.step_budget_sample = step_budget_sample
         self.success_steps = 0
         self.instruction_type = self.CONTINUE_REGULAR
 
@@ -389,31 +365,19 @@ class IterativeTransactionSender:
         logger.debug('write_trx_to_holder_account')
         msg = self.eth_trx.signature() + len(self.eth_trx.unsigned_msg()).to_bytes(8, byteorder="little") + self.eth_trx.unsigned_msg()
 
-        offset = 0
-        rest = msg
         write_trxs = []
         if create_acc_trx is not None:
             write_trxs.append(create_acc_trx)
-        while len(rest):
-            (part, rest) = (rest[:1000], rest[1000:])
-            trx = self.instruction.make_write_transaction(offset, part)
-            write_trxs.append(trx)
-            offset += len(part)
-
-        while len(write_trxs) > 0:
-            (trxs, write_trxs) = (write_trxs[:20], write_trxs[20:])
-            logger.debug(f'write_trxs {len(write_trxs)} trxs {len(trxs)}')
+        for offset in range(0, len(msg), 1000):
+            write_trxs.append(self.instruction.make_write_transaction(offset, msg[offset:offset + 1000]))
 
-            while len(trxs) > 0:
-                logger.debug(f'write {len(trxs)} trxs')
-                receipts = self.sender.send_multiple_transactions_unconfirmed(trxs)
-                results = self.sender.collect_results(receipts, eth_trx=self.eth_trx, reason='WriteHolder')
-
-                success_trxs = []
-                for result, trx in zip(results, trxs):
-                    if result is not None:
-                        success_trxs.append(trx)
-                trxs = [trx for trx in trxs if trx not in success_trxs]
+        start_time = time.time()
+        result = self.sender.send_pipelined(write_trxs, HOLDER_WRITE_WINDOW, HOLDER_WRITE_MAX_ATTEMPTS,
+                                            eth_trx=self.eth_trx, reason='WriteHolder')
+        elapsed = max(time.time() - start_time, 1e-6)
+        logger.debug(f'Wrote {len(msg)} bytes to the holder by {len(write_trxs)} trxs in {elapsed:.2f} s: '
+                     f'{len(msg) / elapsed / 1024:.1f} KiB/s, {result.sent - len(write_trxs)} resent, '
+                     f'{result.max_in_flight} in flight at most')
 
 
     def call_continue(self):
@@ -475,10 +439,10 @@ class IterativeTransactionSender:
         trx = self.instruction.make_cancel_transaction()
 
         logger.debug("Cancel")
-        result = self.sender.send_measured_transaction(trx, self.eth_trx, 'CancelWithNonce')
+        receipt = self.sender.send_measured_transaction(trx, self.eth_trx, 'CancelWithNonce')
         neon_res = NeonTxResultInfo()
-        neon_res.slot = result['slot']
-        return (neon_res, result['transaction']['signatures'][0])
+        neon_res.slot = receipt.slot
+        return (neon_res, receipt.signature)
 
 
     def send_and_confirm_continue(self, trxs: List[Transaction], none_receipts: List[str], retry_on_blocked: int = 1, step_count: int = 1) -> ContinueReturn:
@@ -496,24 +460,28 @@ class IterativeTransactionSender:
         logger.debug(f"result_list: {len(result_list)} receipts: {len(receipts)}")
         for result, receipt in zip(result_list, receipts):
             if result is not None:
-                if not check_error(result):
+                if result.error is None:
                     self.success_steps += 1
-                    self.sender.get_measurements(result)
-                    neon_res = NeonTxResultInfo(result)
+                    measurements = self.sender.get_measurements(result)
+                    neon_res = result.get_neon_res()
                     if neon_res.is_valid():
-                        success_signature = result['transaction']['signatures'][0]
+                        success_signature = result.signature
                         success_neon_res = neon_res
-                elif check_if_accounts_blocked(result):
+                    else:
+                        # The last iteration can execute less steps than requested, so it isn't measured
+                        self.step_budget_sample.on_iteration(measurements)
+                elif result.is_blocked:
                     logger.debug("Blocked account")
                     retry_on_blocked -= 1
                     time.sleep(0.5)
                     try_one_step = True
-                elif check_if_program_exceeded_instructions(result):
+                elif result.is_compute_limit_exceeded():
                     logger.debug("Compute Limit")
+                    self.step_budget_sample.on_compute_limit(result.iteration_steps)
                     step_count = int(step_count * 90 / 100)
                     try_one_step = True
                 else:
-                    logs += get_logs_from_reciept(result)
+                    logs += result.logs or []
                     found_errors = True
             else:
                 none_receipts.append(receipt)
@@ -521,7 +489,6 @@ class IterativeTransactionSender:
 
 
     def steps_count(self):
-        MAX_STEPS_IN_PACK = 16
         counted_steps = math.ceil(self.steps_emulated/self.steps) + self.addition_count()
         if self.success_steps >= counted_steps:
             return MAX_STEPS_IN_PACK
@@ -1,4 +1,7 @@
-from typing import Dict, Optional, Any
+from itertools import zip_longest
+from solana.rpc.api import Client as SolanaClient
+from solana.rpc.types import RPCResponse
+from typing import Dict, Optional, Any, List, cast
 
 
 def get_from_dict(src: Dict, *path) -> Optional[Any]:
@@ -11,3 +14,24 @@ def get_from_dict(src: Dict, *path) -> Optional[Any]:
         if val is None:
             return None
     return val
+
+
+def send_rpc_batch_request(client: SolanaClient, method: str, params_list: List[Any]) -> List[RPCResponse]:
+    """Sends one JSON-RPC batch with a request per params item, responses are returned in the same order"""
+    request_data = []
+    for params in params_list:
+        request_id = next(client._provider._request_counter) + 1
+        request = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+        request_data.append(request)
+
+    response = client._provider.session.post(client._provider.endpoint_uri, headers={"Content-Type": "application/json"}, json=request_data)
+    response.raise_for_status()
+
+    response_data = cast(List[RPCResponse], response.json())
+    response_data.sort(key=lambda r: r["id"])
+
+    for request, response in zip_longest(request_data, response_data):
+        if request is None or response is None or request["id"] != response["id"]:
+            raise Exception("Invalid RPC response: request {} response {}".format(request, response))
+
+    return response_data
@@ -10,6 +10,7 @@
 """
 import logging
 import multiprocessing
+import os
 import socket
 import threading
 # import time
@@ -21,15 +22,16 @@ from .acceptor import Acceptor
 from ..threadless import ThreadlessWork
 from ..event import EventQueue, EventDispatcher
 from ...common.flags import Flags
+from ...common_neon.id_allocator import SharedIdAllocator
 
 logger = logging.getLogger(__name__)
 
 LOCK = multiprocessing.Lock()
 
 proxy_id_glob = multiprocessing.Value('i', 0)
-new_acc_id_glob = multiprocessing.Value('i', 0)
-manager = multiprocessing.Manager()
-acc_list_glob = manager.list()
+# Ids of storage/holder account pairs, leased by worker processes
+perm_acc_id_glob = SharedIdAllocator(int(os.environ.get("PERM_ACCOUNT_MAX_IDS", "1024")),
+                                     int(os.environ.get("OPERATOR_MAX_COUNT", "16")))
 
 
 class AcceptorPool:
@@ -12,6 +12,9 @@ neon_cli_timeout = float(os.environ.get("NEON_CLI_TIMEOUT", "0.1"))
 
 NEW_USER_AIRDROP_AMOUNT = int(os.environ.get("NEW_USER_AIRDROP_AMOUNT", "0"))
 CONFIRMATION_CHECK_DELAY = float(os.environ.get("NEON_CONFIRMATION_CHECK_DELAY", "0.1"))
+CONFIRMATION_TIMEOUT = float(os.environ.get("NEON_CONFIRMATION_TIMEOUT", "10"))
+# getSignatureStatuses accepts up to 256 signatures
+CONFIRMATION_BATCH_SIZE = min(max(int(os.environ.get("NEON_CONFIRMATION_BATCH_SIZE", "256")), 1), 256)
 CONTINUE_COUNT_FACTOR = int(os.environ.get("CONTINUE_COUNT_FACTOR", "3"))
 TIMEOUT_TO_RELOAD_NEON_CONFIG = int(os.environ.get("TIMEOUT_TO_RELOAD_NEON_CONFIG", "3600"))
 MINIMAL_GAS_PRICE=int(os.environ.get("MINIMAL_GAS_PRICE", 1))*10**9
@@ -19,8 +22,63 @@ EXTRA_GAS = int(os.environ.get("EXTRA_GAS", "0"))
 LOG_SENDING_SOLANA_TRANSACTION = os.environ.get("LOG_SENDING_SOLANA_TRANSACTION", "NO") == "YES"
 LOG_NEON_CLI_DEBUG = os.environ.get("LOG_NEON_CLI_DEBUG", "NO") == "YES"
 WRITE_TRANSACTION_COST_IN_DB = os.environ.get("WRITE_TRANSACTION_COST_IN_DB", "NO") == "YES"
+# Cost rows are written by a background thread in batches of OPERATOR_COST_BATCH_SIZE rows or each
+# OPERATOR_COST_FLUSH_INTERVAL seconds. While the queue is full, each row of a sender waits up to
+# OPERATOR_COST_QUEUE_TIMEOUT seconds and is dropped after that: an iterative transaction adds a row per iteration
+OPERATOR_COST_QUEUE_SIZE = max(int(os.environ.get("OPERATOR_COST_QUEUE_SIZE", "10000")), 1)
+OPERATOR_COST_BATCH_SIZE = max(int(os.environ.get("OPERATOR_COST_BATCH_SIZE", "100")), 1)
+OPERATOR_COST_FLUSH_INTERVAL = float(os.environ.get("OPERATOR_COST_FLUSH_INTERVAL", "1"))
+OPERATOR_COST_QUEUE_TIMEOUT = float(os.environ.get("OPERATOR_COST_QUEUE_TIMEOUT", "0.1"))
 RETRY_ON_BLOCKED = max(int(os.environ.get("RETRY_ON_BLOCKED", "32")), 1)
 RETRY_ON_FAIL = int(os.environ.get("RETRY_ON_FAIL", "2"))
+# Transactions which execute more EVM steps are not tried in one Solana transaction
+NONITERATIVE_MAX_STEPS = int(os.environ.get("NONITERATIVE_MAX_STEPS", "1000"))
+# EVM steps per iteration, for contracts without a learned step budget
+EVM_STEPS = max(int(os.environ.get("EVM_STEPS", "250")), 1)
+EVM_STEPS_MIN = max(int(os.environ.get("EVM_STEPS_MIN", "50")), 1)
+EVM_STEPS_MAX = max(int(os.environ.get("EVM_STEPS_MAX", "1000")), EVM_STEPS_MIN)
+# Compute units an iteration may spend, step budgets of contracts are learned to fit into it
+EVM_STEPS_COMPUTE_UNITS = int(os.environ.get("EVM_STEPS_COMPUTE_UNITS", "180000"))
+MAX_STEPS_IN_PACK = max(int(os.environ.get("MAX_STEPS_IN_PACK", "16")), 1)
+# Transactions writing a Neon transaction to the holder account, which are sent and not confirmed yet.
+# A write transaction is resent until it is confirmed, at most HOLDER_WRITE_MAX_ATTEMPTS times
+HOLDER_WRITE_WINDOW = max(int(os.environ.get("HOLDER_WRITE_WINDOW", "50")), 1)
+HOLDER_WRITE_MAX_ATTEMPTS = max(int(os.environ.get("HOLDER_WRITE_MAX_ATTEMPTS", "10")), 1)
+# Storage/holder account pairs, which are kept validated and ready to use in each worker process
+PERM_ACCOUNT_POOL_SIZE = max(int(os.environ.get("PERM_ACCOUNT_POOL_SIZE", "2")), 1)
+PERM_ACCOUNT_POOL_MAX_SIZE = max(int(os.environ.get("PERM_ACCOUNT_POOL_MAX_SIZE", "16")), PERM_ACCOUNT_POOL_SIZE)
+PERM_ACCOUNT_POOL_WAIT_TIMEOUT = float(os.environ.get("PERM_ACCOUNT_POOL_WAIT_TIMEOUT", "60"))
+# Directory of operator keypairs (*.json), requests are spread over them. The keypair of solana-cli is used if empty
+OPERATOR_KEYPAIR_DIR = os.environ.get("OPERATOR_KEYPAIR_DIR", "")
+OPERATOR_STATS_INTERVAL = float(os.environ.get("OPERATOR_STATS_INTERVAL", "60"))
+# Transactions of a sender are executed one by one, a transaction with a future nonce waits for its predecessors
+SENDER_QUEUE_TIMEOUT = float(os.environ.get("SENDER_QUEUE_TIMEOUT", "5"))
+SENDER_QUEUE_MAX_GAP = int(os.environ.get("SENDER_QUEUE_MAX_GAP", "16"))
+# A worker leases the sender while it executes a transaction, the lease of a dead worker expires in SENDER_LOCK_TIMEOUT
+SENDER_LOCK_TIMEOUT = float(os.environ.get("SENDER_LOCK_TIMEOUT", "120"))
+# eth_sendRawTransaction returns the hash after checks, and the transaction is executed by MEMPOOL_WORKERS threads
+MEMPOOL_MODE = os.environ.get("MEMPOOL_MODE", "NO") == "YES"
+MEMPOOL_WORKERS = max(int(os.environ.get("MEMPOOL_WORKERS", "8")), 1)
+MEMPOOL_MAX_SIZE = max(int(os.environ.get("MEMPOOL_MAX_SIZE", "256")), 1)
+MEMPOOL_MAX_AGE = float(os.environ.get("MEMPOOL_MAX_AGE", "120"))
+NEON_EMULATOR_DAEMON = os.environ.get("NEON_EMULATOR_DAEMON", "")
+NEON_EMULATOR_POOL_SIZE = max(int(os.environ.get("NEON_EMULATOR_POOL_SIZE", "4")), 1)
+NEON_EMULATOR_HEALTH_CHECK_INTERVAL = float(os.environ.get("NEON_EMULATOR_HEALTH_CHECK_INTERVAL", "10"))
+RECENT_BLOCKHASH_TTL = float(os.environ.get("RECENT_BLOCKHASH_TTL", "1.0"))
+RECENT_BLOCKHASH_IDLE_TIMEOUT = float(os.environ.get("RECENT_BLOCKHASH_IDLE_TIMEOUT", "60"))
+BATCH_REQUEST_MAX_SIZE = int(os.environ.get("BATCH_REQUEST_MAX_SIZE", "100"))
+BATCH_REQUEST_MAX_WORKERS = max(int(os.environ.get("BATCH_REQUEST_MAX_WORKERS", "8")), 1)
+BATCH_REQUEST_POOL_SIZE = max(int(os.environ.get("BATCH_REQUEST_POOL_SIZE", "32")), 1)
+GET_LOGS_MAX_BLOCK_RANGE = int(os.environ.get("GET_LOGS_MAX_BLOCK_RANGE", "10000"))
+GET_LOGS_MAX_RESULTS = int(os.environ.get("GET_LOGS_MAX_RESULTS", "10000"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", str(32 * 1024 * 1024)))
+WAIT_FOR_RECEIPT_MAX_TIMEOUT = float(os.environ.get("WAIT_FOR_RECEIPT_MAX_TIMEOUT", "30"))
+ETH_CALL_CACHE_SIZE = int(os.environ.get("ETH_CALL_CACHE_SIZE", "0"))
+ETH_CALL_CACHE_MAX_ENTRY_SIZE = int(os.environ.get("ETH_CALL_CACHE_MAX_ENTRY_SIZE", "16384"))
+# Emulation results of eth_estimateGas, which eth_sendRawTransaction reuses within EMULATION_CACHE_TTL seconds.
+# The reuse is off by default, EMULATION_CACHE_SIZE > 0 turns it on
+EMULATION_CACHE_SIZE = int(os.environ.get("EMULATION_CACHE_SIZE", "0"))
+EMULATION_CACHE_TTL = float(os.environ.get("EMULATION_CACHE_TTL", "1.0"))
 
 class solana_cli:
     def call(self, *args):
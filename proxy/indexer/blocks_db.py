@@ -1,3 +1,4 @@
+from .pg_common import pg_pool, migrate_to_json
 from .utils import BaseDB, str_fmt_object
 
 
@@ -84,21 +85,21 @@ class SolanaBlocksDB(BaseDB):
             self._fetchone(self._column_lst, [('height', block_num)], ['finalized desc']))
 
     def set_block(self, block: SolanaBlockDBInfo):
-        cursor = self._conn.cursor()
-        cursor.execute(f'''
-            INSERT INTO {self._table_name}
-            ({', '.join(self._full_column_lst)})
-            VALUES
-            ({', '.join(['%s' for _ in range(len(self._full_column_lst))])})
-            ON CONFLICT (slot, finalized) DO UPDATE SET
-                hash=EXCLUDED.hash,
-                height=EXCLUDED.height,
-                parent_hash=EXCLUDED.parent_hash,
-                blocktime=EXCLUDED.blocktime,
-                signatures=EXCLUDED.signatures
-            ''',
-            (block.slot, block.finalized, block.height, block.hash,
-             block.parent_hash, block.time, self.encode_list(block.signs)))
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {self._table_name}
+                ({', '.join(self._full_column_lst)})
+                VALUES
+                ({', '.join(['%s' for _ in range(len(self._full_column_lst))])})
+                ON CONFLICT (slot, finalized) DO UPDATE SET
+                    hash=EXCLUDED.hash,
+                    height=EXCLUDED.height,
+                    parent_hash=EXCLUDED.parent_hash,
+                    blocktime=EXCLUDED.blocktime,
+                    signatures=EXCLUDED.signatures
+                ''',
+                (block.slot, block.finalized, block.height, block.hash,
+                 block.parent_hash, block.time, self.encode_list(block.signs)))
 
     def fill_block_height(self, height, slots):
         rows = []
@@ -106,12 +107,15 @@ class SolanaBlocksDB(BaseDB):
             rows.append((slot, height))
             height += 1
 
-        cursor = self._conn.cursor()
-        cursor.executemany(
-            f'INSERT INTO {self._table_name}(slot, finalized, height) VALUES(%s, True, %s) ON CONFLICT DO NOTHING',
-            rows)
+        with pg_pool().cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self._table_name}(slot, finalized, height) VALUES(%s, True, %s) ON CONFLICT DO NOTHING',
+                rows)
+
+    def migrate_encoding(self):
+        migrate_to_json(self._table_name, ['slot', 'finalized'], 'signatures')
 
     def del_not_finalized(self, from_slot: int, to_slot: int):
-        cursor = self._conn.cursor()
-        cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
-                       (from_slot, to_slot))
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
+                           (from_slot, to_slot))
@@ -6,14 +6,17 @@ import time
 import logging
 
 try:
-    from indexer_base import logger, IndexerBase, PARALLEL_REQUESTS
+    from indexer_base import logger, IndexerBase, PARALLEL_REQUESTS, MIGRATE_PICKLED_DATA
     from indexer_db import IndexerDB
+    from pg_common import run_migration
     from utils import SolanaIxSignInfo, NeonTxResultInfo, NeonTxSignInfo, Canceller, str_fmt_object, FINALIZED
 except ImportError:
-    from .indexer_base import logger, IndexerBase, PARALLEL_REQUESTS
+    from .indexer_base import logger, IndexerBase, PARALLEL_REQUESTS, MIGRATE_PICKLED_DATA
     from .indexer_db import IndexerDB, FINALIZED
+    from .pg_common import run_migration
     from .utils import SolanaIxSignInfo, NeonTxResultInfo, NeonTxInfo, Canceller, str_fmt_object, FINALIZED
 
+from ..common_neon.receipt_analyzer import ReceiptInfo, analyze_receipt
 from ..environment import EVM_LOADER_ID
 
 CANCEL_TIMEOUT = int(os.environ.get("CANCEL_TIMEOUT", "60"))
@@ -26,6 +29,7 @@ class SolanaIxInfo:
         self.tx = tx
         self._is_valid = isinstance(tx, dict)
         self._msg = self.tx['transaction']['message'] if self._is_valid else None
+        self._receipt: Optional[ReceiptInfo] = None
         self._set_defaults()
 
     def __str__(self):
@@ -50,6 +54,14 @@ class SolanaIxInfo:
     def clear(self):
         self._set_defaults()
 
+    def get_receipt(self) -> ReceiptInfo:
+        """The receipt is analyzed once for all instructions of the transaction"""
+        assert self._is_valid
+
+        if self._receipt is None:
+            self._receipt = analyze_receipt(self.tx)
+        return self._receipt
+
     def iter_ixs(self):
         if not self._is_valid:
             return
@@ -344,7 +356,7 @@ class DummyIxDecoder:
         the parsing order can be other than the execution order
         """
         if not tx.neon_res.is_valid():
-            tx.neon_res.decode(self.ix.tx, self.ix.sign.idx)
+            tx.neon_res = self.ix.get_receipt().get_neon_res(self.ix.sign.idx)
             if tx.neon_res.is_valid():
                 return self._decoding_done(tx, 'found Neon results')
         return self._decoding_success(tx, 'mark ix used')
@@ -463,7 +475,7 @@ class CallFromRawIxDecoder(DummyIxDecoder):
         if neon_tx.error:
             return self._decoding_skip(f'Neon tx rlp error "{neon_tx.error}"')
 
-        tx = NeonTxObject('', neon_tx=neon_tx, neon_res=NeonTxResultInfo(self.ix.tx, self.ix.sign.idx))
+        tx = NeonTxObject('', neon_tx=neon_tx, neon_res=self.ix.get_receipt().get_neon_res(self.ix.sign.idx))
         return self._decoding_done(tx, 'call success')
 
 
@@ -621,6 +633,9 @@ class Indexer(IndexerBase):
                  log_level = 'INFO'):
         IndexerBase.__init__(self, solana_url, evm_loader_id, log_level, 0)
         self.db = IndexerDB(self.client)
+        self.db.migrate_logs()
+        if MIGRATE_PICKLED_DATA:
+            run_migration('blocks and transactions', self.db.migrate_encoding)
         self.canceller = Canceller()
         self.blocked_storages = {}
         self.processed_slot = self.db.get_min_receipt_slot()
@@ -669,9 +684,8 @@ class Indexer(IndexerBase):
         max_slot = self.processed_slot - 1
         last_block_slot = self.db.get_last_block_slot()
 
-        for slot, sign, tx in self.transaction_receipts.get_trxs(self.processed_slot, reverse=False):
-            if slot > last_block_slot:
-                break
+        for slot, sign, tx in self.transaction_receipts.get_trxs(self.processed_slot, reverse=False,
+                                                                  end_slot=last_block_slot):
 
             if max_slot != slot:
                 self.state.complete_done_txs()
@@ -1,22 +1,36 @@
 import os
 import time
 import logging
+import threading
 import traceback
+from collections import deque
 from solana.rpc.api import Client
 from multiprocessing.dummy import Pool as ThreadPool
-from typing import Dict, Union
+from typing import Any, Callable, Dict, Iterable, List, Union
 
 try:
+    from pg_common import run_migration
     from sql_dict import SQLDict
     from trx_receipts_storage import TrxReceiptsStorage
     from utils import FINALIZED
 except ImportError:
+    from .pg_common import run_migration
     from .sql_dict import SQLDict
     from .trx_receipts_storage import TrxReceiptsStorage
     from .utils import FINALIZED
 
+from ..common_neon.utils import send_rpc_batch_request
+
 
 PARALLEL_REQUESTS = int(os.environ.get("PARALLEL_REQUESTS", "2"))
+RECEIPTS_BATCH_SIZE = max(int(os.environ.get("RECEIPTS_BATCH_SIZE", "100")), 1)
+RECEIPTS_MAX_RETRIES = int(os.environ.get("RECEIPTS_MAX_RETRIES", "10"))
+RECEIPTS_RETRY_DELAY = float(os.environ.get("RECEIPTS_RETRY_DELAY", "0.5"))
+RECEIPTS_MAX_RETRY_DELAY = float(os.environ.get("RECEIPTS_MAX_RETRY_DELAY", "30"))
+RECEIPTS_WRITE_BATCH_SIZE = int(os.environ.get("RECEIPTS_WRITE_BATCH_SIZE", "1000"))
+RECEIPTS_WRITE_INTERVAL = float(os.environ.get("RECEIPTS_WRITE_INTERVAL", "1.0"))
+RECEIPTS_READ_BATCH_SIZE = max(int(os.environ.get("RECEIPTS_READ_BATCH_SIZE", "1000")), 1)
+MIGRATE_PICKLED_DATA = os.environ.get("MIGRATE_PICKLED_DATA", "NO") == "YES"
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -35,6 +49,103 @@ log_levels = {
     'CRITICAL': logging.CRITICAL
 }
 
+class TxReceiptsFetcher:
+    """
+    Fetches transaction receipts with JSON-RPC batches of getTransaction requests.
+
+    At most `concurrency` batches are in flight. The batch size adapts to the RPC node: it grows by one request
+    after a successful batch up to max_batch_size and is halved after a failed one. Signatures without a receipt
+    are retried with exponential backoff, each one at most max_retries times.
+    """
+    def __init__(self, client: Client, concurrency: int, max_batch_size: int, max_retries: int,
+                 retry_delay: float, max_retry_delay: float):
+        self.client = client
+        self.concurrency = max(concurrency, 1)
+        self.max_batch_size = max_batch_size
+        self.batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._lock = threading.Lock()
+
+    def fetch(self, signatures: Iterable[str], on_receipt: Callable[[str, Any], None]) -> List[str]:
+        """Calls on_receipt for each fetched receipt, returns signatures which were not fetched"""
+        pending = list(signatures)
+        retry_counts: Dict[str, int] = {}
+        failed = []
+
+        while len(pending):
+            pending = self._fetch_round(pending, on_receipt)
+            if not len(pending):
+                break
+
+            retry_list = []
+            for sign in pending:
+                retry_counts[sign] = retry_counts.get(sign, 0) + 1
+                if retry_counts[sign] > self.max_retries:
+                    failed.append(sign)
+                else:
+                    retry_list.append(sign)
+            pending = retry_list
+            if not len(pending):
+                break
+
+            retry = max(retry_counts[sign] for sign in pending)
+            delay = min(self.retry_delay * 2 ** (retry - 1), self.max_retry_delay)
+            logger.debug(f'Retry {len(pending)} receipts in {delay} sec, batch size {self.batch_size}')
+            time.sleep(delay)
+
+        if len(failed):
+            logger.warning(f'Failed to get {len(failed)} receipts after {self.max_retries} retries: {failed[:10]}')
+        return failed
+
+    def _fetch_round(self, signatures: List[str], on_receipt: Callable[[str, Any], None]) -> List[str]:
+        queue = deque(signatures)
+        retry_list = []
+
+        def fetch_batches(_):
+            while True:
+                with self._lock:
+                    if not len(queue):
+                        return
+                    batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                retry_list.extend(self._fetch_batch(batch, on_receipt))
+
+        pool = ThreadPool(min(self.concurrency, len(signatures)))
+        try:
+            pool.map(fetch_batches, range(pool._processes))
+        finally:
+            pool.close()
+        return retry_list
+
+    def _fetch_batch(self, batch: List[str], on_receipt: Callable[[str, Any], None]) -> List[str]:
+        params_list = [(sign, {"encoding": "json", "commitment": FINALIZED}) for sign in batch]
+        try:
+            response_list = send_rpc_batch_request(self.client, "getTransaction", params_list)
+        except Exception as err:
+            with self._lock:
+                self.batch_size = max(self.batch_size // 2, 1)
+            logger.debug(f'Failed to get batch of {len(batch)} receipts: {err}')
+            return batch
+
+        with self._lock:
+            self.batch_size = min(self.batch_size + 1, self.max_batch_size)
+
+        retry_list = []
+        for sign, response in zip(batch, response_list):
+            trx = response.get('result')
+            if trx is None:
+                logger.debug(f'No receipt for {sign}: {response.get("error")}')
+                retry_list.append(sign)
+                continue
+            try:
+                on_receipt(sign, trx)
+            except Exception as err:
+                logger.warning(f'Failed to process receipt {sign}: {err}')
+                retry_list.append(sign)
+        return retry_list
+
+
 class IndexerBase:
     def __init__(self,
                  solana_url,
@@ -45,12 +156,18 @@ class IndexerBase:
 
         self.evm_loader_id = evm_loader_id
         self.client = Client(solana_url)
-        self.transaction_receipts = TrxReceiptsStorage('transaction_receipts', log_level)
+        self.transaction_receipts = TrxReceiptsStorage('transaction_receipts', log_level,
+                                                       RECEIPTS_WRITE_BATCH_SIZE, RECEIPTS_WRITE_INTERVAL,
+                                                       RECEIPTS_READ_BATCH_SIZE)
         self.last_slot = start_slot
         self.current_slot = 0
         self.counter_ = 0
         self.max_known_tx = self.transaction_receipts.max_known_trx()
+        self.receipts_fetcher = TxReceiptsFetcher(self.client, PARALLEL_REQUESTS, RECEIPTS_BATCH_SIZE,
+                                                  RECEIPTS_MAX_RETRIES, RECEIPTS_RETRY_DELAY, RECEIPTS_MAX_RETRY_DELAY)
         self._move_data_from_old_table()
+        if MIGRATE_PICKLED_DATA:
+            run_migration('transaction_receipts', self.transaction_receipts.migrate_encoding)
 
 
     def _move_data_from_old_table(self):
@@ -58,6 +175,7 @@ class IndexerBase:
             transaction_receipts_old = SQLDict(tablename="known_transactions")
             for signature, trx in transaction_receipts_old.iteritems():
                 self._add_trx(signature, trx)
+            self.transaction_receipts.flush()
 
 
     def run(self):
@@ -116,11 +234,16 @@ class IndexerBase:
                     poll_txs.add(solana_signature)
 
         logger.debug("start getting receipts")
-        pool = ThreadPool(PARALLEL_REQUESTS)
-        pool.map(self._get_tx_receipts, poll_txs)
+        failed_txs = self.receipts_fetcher.fetch(poll_txs, self._on_tx_receipt)
+        self.counter_ = 0
+        # receipts should be stored before max_known_tx is moved, it's the restart point of the indexer
+        self.transaction_receipts.flush()
+        if len(failed_txs):
+            # max_known_tx isn't moved, so the signatures are requested again on the next iteration,
+            # and receipts aren't processed with gaps
+            raise Exception(f"Failed to get {len(failed_txs)} receipts, keep max known transaction {self.max_known_tx}")
 
         self.current_slot = current_slot
-        self.counter_ = 0
         logger.debug(max_known_tx)
         self.max_known_tx = max_known_tx
 
@@ -136,18 +259,8 @@ class IndexerBase:
         return result['result']
 
 
-    def _get_tx_receipts(self, solana_signature):
-        # trx = None
-        retry = True
-
-        while retry:
-            try:
-                trx = self.client.get_confirmed_transaction(solana_signature)['result']
-                self._add_trx(solana_signature, trx)
-                retry = False
-            except Exception as err:
-                logger.debug(err)
-                time.sleep(1)
+    def _on_tx_receipt(self, solana_signature, trx):
+        self._add_trx(solana_signature, trx)
 
         self.counter_ += 1
         if self.counter_ % 100 == 0:
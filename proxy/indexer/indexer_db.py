@@ -1,17 +1,34 @@
 import base58
 import logging
+import os
+import threading
+import time
 import traceback
 
+from typing import Dict, Optional, Set
+
 try:
     from utils import LogDB, NeonTxInfo, NeonTxResultInfo, SolanaIxSignInfo, FINALIZED
     from blocks_db import SolanaBlocksDB, SolanaBlockDBInfo
     from transactions_db import NeonTxsDB, NeonTxDBInfo
     from sql_dict import SQLDict
+    from pg_common import pg_notify, pg_listener
 except ImportError:
     from .utils import LogDB, NeonTxInfo, NeonTxResultInfo, SolanaIxSignInfo, FINALIZED
     from .blocks_db import SolanaBlocksDB, SolanaBlockDBInfo
     from .transactions_db import NeonTxsDB, NeonTxDBInfo
     from .sql_dict import SQLDict
+    from .pg_common import pg_notify, pg_listener
+
+from ..common_neon.lru_cache import LRUCache
+
+UNKNOWN_TX_CACHE_TTL = float(os.environ.get("UNKNOWN_TX_CACHE_TTL", "1.0"))
+UNKNOWN_TX_CACHE_SIZE = int(os.environ.get("UNKNOWN_TX_CACHE_SIZE", "10000"))
+# Waiters re-check the database with this interval, in case a notification is lost
+WAIT_FOR_TX_POLL_INTERVAL = float(os.environ.get("WAIT_FOR_TX_POLL_INTERVAL", "5.0"))
+
+# Payloads of notifications are the Neon signatures of stored transactions
+NEON_TX_STORED_CHANNEL = 'neon_tx_stored'
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -24,11 +41,24 @@ class IndexerDB:
         self._txs_db = NeonTxsDB()
         self._client = client
 
+        # Neon signatures which were not found, with the time of the next lookup
+        self._unknown_txs = LRUCache(UNKNOWN_TX_CACHE_SIZE if UNKNOWN_TX_CACHE_TTL > 0 else 0)
+        self._tx_waiters_lock = threading.Lock()
+        self._tx_waiters: Dict[str, Set[threading.Event]] = {}
+        self._is_listening = False
+
         self._constants = SQLDict(tablename="constants")
         for k in ['last_block_slot', 'last_block_height', 'min_receipt_slot']:
             if k not in self._constants:
                 self._constants[k] = 0
 
+    def migrate_logs(self):
+        self._logs_db.migrate_from_old_table()
+
+    def migrate_encoding(self):
+        self._blocks_db.migrate_encoding()
+        self._txs_db.migrate_encoding()
+
     def submit_transaction(self, neon_tx: NeonTxInfo, neon_res: NeonTxResultInfo, used_ixs: [SolanaIxSignInfo]):
         try:
             block = self.get_block_by_slot(neon_res.slot)
@@ -44,6 +74,8 @@ class IndexerDB:
                 self._logs_db.push_logs(neon_res.logs, block)
             tx = NeonTxDBInfo(neon_tx=neon_tx, neon_res=neon_res, block=block, used_ixs=used_ixs)
             self._txs_db.set_tx(tx)
+            self._on_tx_stored(neon_tx.sign)
+            pg_notify(NEON_TX_STORED_CHANNEL, neon_tx.sign)
         except Exception as err:
             err_tb = "".join(traceback.format_tb(err.__traceback__))
             logger.warning('Exception on submitting transaction. ' +
@@ -97,8 +129,8 @@ class IndexerDB:
     def set_min_receipt_slot(self, slot):
         self._constants['min_receipt_slot'] = slot
 
-    def get_logs(self, fromBlock, toBlock, address, topics, blockHash):
-        return self._logs_db.get_logs(fromBlock, toBlock, address, topics, blockHash)
+    def get_logs(self, fromBlock, toBlock, address, topics, blockHash, max_results=None):
+        return self._logs_db.get_logs(fromBlock, toBlock, address, topics, blockHash, max_results)
 
     def get_block_by_hash(self, block_hash):
         return self._blocks_db.get_block_by_hash(block_hash)
@@ -112,12 +144,82 @@ class IndexerDB:
             tx.block = self.get_block_by_slot(tx.neon_res.slot)
         return tx
 
+    def get_txs_by_sol_signs(self, sol_sign_list) -> {str: NeonTxDBInfo}:
+        return self._txs_db.get_txs_by_sol_signs(sol_sign_list, self._blocks_db.get_table_name())
+
     def get_tx_by_neon_sign(self, neon_sign) -> NeonTxDBInfo:
+        """
+        Unknown signatures are remembered for UNKNOWN_TX_CACHE_TTL seconds, so clients polling for a receipt
+        don't query the database each time. The entry is dropped as soon as any process stores the transaction.
+        """
+        if self._unknown_txs.max_size > 0:
+            retry_time = self._unknown_txs.get(neon_sign)
+            if retry_time is not None and retry_time > time.time():
+                return None
+            self._start_listening()
+
+        tx = self._find_tx_by_neon_sign(neon_sign)
+        if tx is None and self._unknown_txs.max_size > 0:
+            self._unknown_txs.put(neon_sign, time.time() + UNKNOWN_TX_CACHE_TTL)
+        return tx
+
+    def forget_unknown_tx(self, neon_sign: str):
+        """The transaction is sent, so the next lookup should go to the database"""
+        self._unknown_txs.pop(neon_sign)
+
+    def wait_for_tx_by_neon_sign(self, neon_sign: str, timeout: float) -> Optional[NeonTxDBInfo]:
+        """Blocks until the transaction is stored or the timeout expires"""
+        self._start_listening()
+        event = threading.Event()
+        with self._tx_waiters_lock:
+            self._tx_waiters.setdefault(neon_sign, set()).add(event)
+
+        try:
+            deadline = time.time() + timeout
+            while True:
+                # The event is cleared before the lookup, so a notification sent during the lookup isn't lost
+                event.clear()
+                tx = self._find_tx_by_neon_sign(neon_sign)
+                if tx is not None:
+                    self.forget_unknown_tx(neon_sign)
+                    return tx
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                event.wait(min(remaining, WAIT_FOR_TX_POLL_INTERVAL))
+        finally:
+            with self._tx_waiters_lock:
+                events = self._tx_waiters[neon_sign]
+                events.discard(event)
+                if not len(events):
+                    del self._tx_waiters[neon_sign]
+
+    def _find_tx_by_neon_sign(self, neon_sign) -> Optional[NeonTxDBInfo]:
         tx = self._txs_db.get_tx_by_neon_sign(neon_sign)
         if tx:
             tx.block = self.get_block_by_slot(tx.neon_res.slot)
         return tx
 
+    def _start_listening(self):
+        with self._tx_waiters_lock:
+            if self._is_listening:
+                return
+            self._is_listening = True
+        pg_listener(NEON_TX_STORED_CHANNEL).subscribe(self._on_tx_stored)
+
+    def _on_tx_stored(self, neon_sign: Optional[str]):
+        """neon_sign is None if notifications could be lost: all waiters should re-check the database"""
+        if neon_sign is None:
+            self._unknown_txs.clear()
+            with self._tx_waiters_lock:
+                events = [event for event_set in self._tx_waiters.values() for event in event_set]
+        else:
+            self._unknown_txs.pop(neon_sign)
+            with self._tx_waiters_lock:
+                events = list(self._tx_waiters.get(neon_sign, []))
+        for event in events:
+            event.set()
+
     def del_not_finalized(self, from_slot: int, to_slot: int):
         for d in [self._logs_db, self._blocks_db, self._txs_db]:
             d.del_not_finalized(from_slot=from_slot, to_slot=to_slot)
@@ -0,0 +1,62 @@
+import time
+
+from typing import List, Optional
+
+from .pg_common import pg_pool, encode_json, decode_json
+from .utils import BaseDB, NeonTxInfo
+
+
+class PendingTxsDB(BaseDB):
+    """Transactions accepted by the mempool of any worker, which aren't executed yet"""
+    def __init__(self):
+        BaseDB.__init__(self)
+
+    def _create_table_sql(self) -> str:
+        self._table_name = 'neon_pending_transactions'
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self._table_name} (
+                neon_sign CHAR(66) PRIMARY KEY,
+                from_addr CHAR(42),
+                nonce BIGINT,
+                accept_time DOUBLE PRECISION,
+                neon_tx BYTEA
+            );
+            CREATE INDEX IF NOT EXISTS {self._table_name}_from_addr ON {self._table_name}(from_addr, nonce);"""
+
+    def add_tx(self, neon_tx: NeonTxInfo, accept_time: float) -> bool:
+        """Returns False if the transaction is already pending"""
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {self._table_name}(neon_sign, from_addr, nonce, accept_time, neon_tx)
+                VALUES(%s, %s, %s, %s, %s) ON CONFLICT DO NOTHING''',
+                (neon_tx.sign, neon_tx.addr, int(neon_tx.nonce, 16), accept_time, encode_json(vars(neon_tx))))
+            return cursor.rowcount > 0
+
+    def del_tx(self, neon_sign: str):
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._table_name} WHERE neon_sign = %s', (neon_sign,))
+
+    def del_expired_txs(self, max_age: float):
+        """Removes transactions of workers, which died before executing them"""
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._table_name} WHERE accept_time < %s', (time.time() - max_age,))
+
+    def get_tx(self, neon_sign: str, max_age: float) -> Optional[NeonTxInfo]:
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'SELECT neon_tx FROM {self._table_name} WHERE neon_sign = %s AND accept_time >= %s',
+                           (neon_sign, time.time() - max_age))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        neon_tx = NeonTxInfo()
+        vars(neon_tx).update(decode_json(row[0]))
+        return neon_tx
+
+    def get_nonce_list(self, from_addr: str, min_nonce: int, max_age: float) -> List[int]:
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                SELECT DISTINCT nonce FROM {self._table_name}
+                 WHERE from_addr = %s AND nonce >= %s AND accept_time >= %s
+                 ORDER BY nonce''',
+                (from_addr, min_nonce, time.time() - max_age))
+            return [row[0] for row in cursor.fetchall()]
@@ -1,16 +1,32 @@
+import hashlib
+import json
+import logging
 import psycopg2
+import psycopg2.extras
 import os
+import select
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 POSTGRES_DB = os.environ.get("POSTGRES_DB", "neon-db")
 POSTGRES_USER = os.environ.get("POSTGRES_USER", "neon-proxy")
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "neon-proxy-pass")
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "localhost")
+POSTGRES_POOL_MIN_SIZE = max(int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "1")), 0)
+POSTGRES_POOL_MAX_SIZE = max(int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")), 1)
+POSTGRES_POOL_HEALTH_CHECK_INTERVAL = float(os.environ.get("POSTGRES_POOL_HEALTH_CHECK_INTERVAL", "30"))
 
 try:
     from cPickle import dumps, loads, HIGHEST_PROTOCOL as PICKLE_PROTOCOL
 except ImportError:
     from pickle import dumps, loads, HIGHEST_PROTOCOL as PICKLE_PROTOCOL
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
 
 def encode(obj):
     """Serialize an object using pickle to a binary format accepted by SQLite."""
@@ -25,3 +41,359 @@ def decode(obj):
 def dummy(obj):
     """Does nothing"""
     return obj
+
+
+# The version byte of encode_json() values. Pickled values start with the 0x80 opcode, so they can't be confused
+JSON_ENCODING_VERSION = 0x01
+PICKLE_PROTO_OPCODE = 0x80
+
+
+def encode_json(obj):
+    """
+    Serialize a JSON-compatible object to a version byte followed by UTF-8 JSON.
+
+    Unlike pickle, the value is readable from SQL and by other tools, and loading it can't run code:
+    convert_from(substring(value from 2), 'UTF8')::jsonb
+    It isn't more compact or faster than pickle: receipts are ~7% larger and decode 2-3 times slower,
+    see benchmark_receipt_encoding.
+    """
+    data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    return psycopg2.Binary(bytes([JSON_ENCODING_VERSION]) + data)
+
+
+def decode_json(obj):
+    """Deserialize objects stored by encode_json() or by encode() before it."""
+    data = bytes(obj)
+    version = data[0]
+    if version == JSON_ENCODING_VERSION:
+        return json.loads(data[1:])
+    if version == PICKLE_PROTO_OPCODE:
+        return loads(data)
+    raise ValueError(f'Unknown encoding version {version}')
+
+
+def migrate_to_json(table_name: str, key_columns: List[str], value_column: str, batch_size: int = 1000) -> int:
+    """
+    Re-encodes pickled values of the column by encode_json(), returns the number of converted rows.
+
+    Rows are walked once in the order of key_columns, which must be a unique index, so each batch is read by the index.
+    The column is migrated by one process at a time, others return 0 at once.
+    """
+    key_list = ', '.join(key_columns)
+    key_cond = ' AND '.join(f'{table_name}.{key} = rows.{key}' for key in key_columns)
+    lock_key = int.from_bytes(hashlib.sha256(f'{table_name}.{value_column}'.encode('utf-8')).digest()[:8],
+                              'big', signed=True)
+    total = 0
+    conn = pg_connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', (lock_key,))
+            if not cursor.fetchone()[0]:
+                logger.debug(f'{table_name}.{value_column} is migrated by another process')
+                return 0
+
+            last_key = None
+            while True:
+                # Values are read only for pickled rows, get_byte() fails on empty values
+                cursor.execute(f'''
+                    SELECT {key_list},
+                           CASE WHEN length({value_column}) = 0 THEN NULL
+                                WHEN get_byte({value_column}, 0) = {PICKLE_PROTO_OPCODE} THEN {value_column}
+                           END
+                    FROM {table_name}
+                    {'' if last_key is None else f'WHERE ({key_list}) > %s'}
+                    ORDER BY {key_list}
+                    LIMIT {batch_size}''',
+                    None if last_key is None else (last_key,))
+                rows = cursor.fetchall()
+                if not len(rows):
+                    break
+                last_key = tuple(rows[-1][:-1])
+
+                pickled_rows = [row for row in rows if row[-1] is not None]
+                if len(pickled_rows):
+                    # Rows rewritten after they were read aren't changed
+                    psycopg2.extras.execute_values(cursor, f'''
+                        UPDATE {table_name} SET {value_column} = rows.value
+                        FROM (VALUES %s) AS rows ({key_list}, value)
+                        WHERE {key_cond} AND substring({table_name}.{value_column} from 1 for 1) = decode('{PICKLE_PROTO_OPCODE:02x}', 'hex')''',
+                        [(*row[:-1], encode_json(decode(row[-1]))) for row in pickled_rows])
+                    total += len(pickled_rows)
+                    logger.debug(f'Migrated {total} rows of {table_name}.{value_column} to the JSON encoding')
+    finally:
+        conn.close()
+    return total
+
+
+def run_migration(name: str, migrate: Callable[[], Any]) -> threading.Thread:
+    """Runs the migration by a background thread, so the process doesn't wait for it to start"""
+    def run():
+        try:
+            migrate()
+            logger.info(f'Migration {name} is done')
+        except Exception as err:
+            logger.error(f'Migration {name} failed: {err}')
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def pg_connect():
+    """Opens a new autocommit connection"""
+    conn = psycopg2.connect(
+        dbname=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        host=POSTGRES_HOST
+    )
+    conn.autocommit = True
+    return conn
+
+
+class PostgresPool:
+    """
+    Pool of autocommit connections, shared by all DB objects of the process.
+
+    The pool keeps min_size connections open and opens up to max_size ones, callers wait for a free connection
+    when all of them are in use. A connection which was idle for more than health_check_interval seconds is
+    checked with 'SELECT 1' before it is given out. A connection which failed with OperationalError or
+    InterfaceError is closed, so the next caller reconnects.
+    """
+    def __init__(self, min_size: int, max_size: int, health_check_interval: float):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_size)
+        self._idle: List[Tuple[Any, float]] = []
+        self._opened = 0
+        self._in_use = 0
+        self._max_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._reconnects = 0
+
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.time()))
+
+    @contextmanager
+    def connection(self):
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self._waits += 1
+            self._semaphore.acquire()
+
+        try:
+            conn = self._checkout()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._checkin(conn, broken)
+            self._semaphore.release()
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    @contextmanager
+    def transaction(self, cursor_name: Optional[str] = None):
+        """
+        Yields a cursor, all statements executed by the cursor are committed or rolled back together.
+        A cursor with a name is a server-side one, it fetches rows from the server by cursor.itersize rows.
+        """
+        with self.connection() as conn:
+            conn.autocommit = False
+            try:
+                with conn.cursor(name=cursor_name) as cursor:
+                    yield cursor
+                conn.commit()
+            except BaseException:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if not conn.closed:
+                    conn.autocommit = True
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'opened': self._opened,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'max_in_use': self._max_in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'reconnects': self._reconnects,
+            }
+
+    def _connect(self):
+        conn = pg_connect()
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.time() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except psycopg2.Error as err:
+            logger.warning(f'Postgres connection is broken: {err}')
+            return False
+
+    def _checkout(self):
+        conn = None
+        while conn is None:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, idle_since = self._idle.pop()
+            if not self._is_healthy(conn, idle_since):
+                self._close(conn)
+                with self._lock:
+                    self._reconnects += 1
+                conn = None
+
+        if conn is None:
+            conn = self._connect()
+
+        with self._lock:
+            self._in_use += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+            self._checkouts += 1
+        return conn
+
+    def _checkin(self, conn, broken: bool):
+        with self._lock:
+            self._in_use -= 1
+        if broken or conn.closed or conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self._close(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.time()))
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[PostgresPool] = None
+_pool_pid: Optional[int] = None
+# Connections inherited from the parent process: they are never used nor closed in the child,
+# because closing them would terminate the parent's sessions
+_parent_pools: List[PostgresPool] = []
+
+
+def pg_pool() -> PostgresPool:
+    """
+    Returns the connection pool of the current process.
+
+    DB objects should call it on each request instead of keeping the pool, because some of them are created at
+    import time and acceptor processes are forked after that.
+    """
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if _pool is not None:
+                _parent_pools.append(_pool)
+            _pool = PostgresPool(POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE, POSTGRES_POOL_HEALTH_CHECK_INTERVAL)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def pg_notify(channel: str, payload: str):
+    """Sends the notification to all processes, which listen to the channel"""
+    with pg_pool().cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', (channel, payload))
+
+
+class PostgresListener:
+    """
+    Receives notifications of the channel over a dedicated connection and passes their payloads to subscribers.
+
+    Notifications sent while the connection is broken are lost, so after each (re)connect subscribers are called
+    with None: they should treat it as "anything could have changed".
+    """
+    def __init__(self, channel: str, reconnect_delay: float = 1.0, select_timeout: float = 60.0):
+        self.channel = channel
+        self._reconnect_delay = reconnect_delay
+        self._select_timeout = select_timeout
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[Optional[str]], None]] = []
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _dispatch(self, payload: Optional[str]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(payload)
+            except Exception as err:
+                logger.warning(f'Subscriber of {self.channel} failed on {payload}: {err}')
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = pg_connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                self._dispatch(None)
+                while True:
+                    if select.select([conn], [], [], self._select_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as err:
+                logger.warning(f'Listener of {self.channel} is disconnected: {err}')
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            time.sleep(self._reconnect_delay)
+
+
+_listeners_lock = threading.Lock()
+_listeners: Dict[Tuple[int, str], PostgresListener] = {}
+
+
+def pg_listener(channel: str) -> PostgresListener:
+    """Returns the listener of the channel, which is shared by all DB objects of the current process"""
+    key = (os.getpid(), channel)
+    with _listeners_lock:
+        listener = _listeners.get(key)
+        if listener is None:
+            listener = PostgresListener(channel)
+            _listeners[key] = listener
+        return listener
@@ -0,0 +1,38 @@
+import time
+
+from .pg_common import pg_pool
+from .utils import BaseDB
+
+
+class SenderLocksDB(BaseDB):
+    """Leases of senders, a worker process holds the lease while it executes a transaction of the sender"""
+    def __init__(self):
+        BaseDB.__init__(self)
+
+    def _create_table_sql(self) -> str:
+        self._table_name = 'neon_sender_locks'
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self._table_name} (
+                sender CHAR(42) PRIMARY KEY,
+                owner TEXT,
+                lock_time DOUBLE PRECISION
+            );"""
+
+    def try_lock(self, sender: str, owner: str, lock_timeout: float) -> bool:
+        """Takes the lease if it is free or older than lock_timeout seconds, returns False if it is taken"""
+        now = time.time()
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {self._table_name}(sender, owner, lock_time) VALUES(%s, %s, %s)
+                ON CONFLICT (sender) DO UPDATE SET owner = EXCLUDED.owner, lock_time = EXCLUDED.lock_time
+                WHERE {self._table_name}.lock_time < %s''',
+                (sender, owner, now, now - lock_timeout))
+            return cursor.rowcount > 0
+
+    def unlock(self, sender: str, owner: str, channel: str, payload: str):
+        """Frees the lease, if it isn't taken over, and notifies the channel in the same round trip"""
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                DELETE FROM {self._table_name} WHERE sender = %s AND owner = %s;
+                SELECT pg_notify(%s, %s)''',
+                (sender, owner, channel, payload))
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from .pg_common import pg_pool
+from .utils import BaseDB
+
+
+class StepBudgetsDB(BaseDB):
+    """Moving averages of compute units per EVM step of contracts, see StepBudgets"""
+    def __init__(self):
+        BaseDB.__init__(self)
+
+    def _create_table_sql(self) -> str:
+        self._table_name = 'neon_step_budgets'
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self._table_name} (
+                contract CHAR(40) PRIMARY KEY,
+                cu_per_step DOUBLE PRECISION,
+                samples BIGINT
+            );"""
+
+    def get_cu_per_step(self, contract: str) -> Optional[float]:
+        row = self._fetchone(['cu_per_step'], [('contract', contract)])
+        return None if row is None else row[0]
+
+    def update(self, contract: str, cu_per_step: Optional[float], min_cu_per_step: Optional[float],
+               alpha: float) -> float:
+        """
+        Adds cu_per_step to the moving average and raises the result up to min_cu_per_step by one statement,
+        so concurrent updates from other workers aren't lost. None skips the corresponding part.
+        """
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {self._table_name} AS t(contract, cu_per_step, samples)
+                VALUES(%(contract)s, GREATEST(%(avg)s::DOUBLE PRECISION, %(min)s::DOUBLE PRECISION), 1)
+                ON CONFLICT (contract) DO UPDATE SET
+                    cu_per_step = GREATEST(
+                        COALESCE(t.cu_per_step * (1 - %(alpha)s) + %(avg)s::DOUBLE PRECISION * %(alpha)s,
+                                 t.cu_per_step),
+                        %(min)s::DOUBLE PRECISION),
+                    samples = t.samples + 1
+                RETURNING cu_per_step''',
+                {'contract': contract, 'avg': cu_per_step, 'min': min_cu_per_step, 'alpha': alpha})
+            return cursor.fetchone()[0]
@@ -1,3 +1,4 @@
+from .pg_common import pg_pool, migrate_to_json
 from .utils import BaseDB, SolanaIxSignInfo, NeonTxResultInfo, NeonTxInfo, str_fmt_object
 from .blocks_db import SolanaBlockDBInfo
 
@@ -37,11 +38,11 @@ class SolanaNeonTxsDB(BaseDB):
         for ix in used_ixs:
             rows.append((ix.sign, neon_sign, ix.slot, ix.idx))
 
-        cursor = self._conn.cursor()
-        cursor.executemany(f'''
-            INSERT INTO {self._table_name}(sol_sign, neon_sign, slot, idx)
-            VALUES(%s, %s, %s, %s) ON CONFLICT DO NOTHING''',
-            rows)
+        with pg_pool().cursor() as cursor:
+            cursor.executemany(f'''
+                INSERT INTO {self._table_name}(sol_sign, neon_sign, slot, idx)
+                VALUES(%s, %s, %s, %s) ON CONFLICT DO NOTHING''',
+                rows)
 
 
 class NeonTxsDB(BaseDB):
@@ -134,27 +135,64 @@ class NeonTxsDB(BaseDB):
 
         row.append(self.encode_list(tx.neon_res.logs))
 
-        cursor = self._conn.cursor()
-        cursor.execute(f'''
-                       INSERT INTO {self._table_name}
-                       ({', '.join(self._column_lst)})
-                       VALUES
-                       ({', '.join(['%s' for _ in range(len(self._column_lst))])})
-                       ON CONFLICT DO NOTHING
-                       ''',
-                       row)
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                           INSERT INTO {self._table_name}
+                           ({', '.join(self._column_lst)})
+                           VALUES
+                           ({', '.join(['%s' for _ in range(len(self._column_lst))])})
+                           ON CONFLICT DO NOTHING
+                           ''',
+                           row)
 
         self._sol_neon_txs_db.set_txs(tx.neon_tx.sign, tx.used_ixs)
 
     def del_not_finalized(self, from_slot: int, to_slot: int):
-        cursor = self._conn.cursor()
-        cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
-                       (from_slot, to_slot))
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
+                           (from_slot, to_slot))
+
+    def migrate_encoding(self):
+        migrate_to_json(self._table_name, ['neon_sign', 'finalized'], 'logs')
 
     def get_tx_by_neon_sign(self, neon_sign) -> NeonTxDBInfo:
         return self._tx_from_value(
             self._fetchone(self._column_lst, [('neon_sign', neon_sign)], ['finalized desc']))
 
+    def get_txs_by_sol_signs(self, sol_sign_list, blocks_table_name) -> {str: NeonTxDBInfo}:
+        """Returns transactions of the Solana signatures with their blocks, by one query"""
+        if not sol_sign_list:
+            return {}
+
+        block_column_lst = ('slot', 'finalized', 'height', 'hash')
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'''
+                SELECT DISTINCT ON (t.sol_sign)
+                       {', '.join('t.' + column for column in self._column_lst)},
+                       {', '.join('b.' + column for column in block_column_lst)}
+                FROM {self._table_name} AS t
+                LEFT JOIN LATERAL (
+                    SELECT {', '.join(block_column_lst)} FROM {blocks_table_name}
+                    WHERE slot = t.slot
+                    ORDER BY finalized DESC
+                    LIMIT 1
+                ) AS b ON TRUE
+                WHERE t.sol_sign = ANY(%s)
+                ORDER BY t.sol_sign, t.finalized DESC
+                ''',
+                (list(sol_sign_list),))
+            rows = cursor.fetchall()
+
+        tx_dict = {}
+        column_cnt = len(self._column_lst)
+        for value in rows:
+            tx = self._tx_from_value(value[:column_cnt])
+            tx.block = SolanaBlockDBInfo(slot=tx.neon_res.slot, finalized=bool(value[column_cnt + 1]),
+                                         height=value[column_cnt + 2], hash=value[column_cnt + 3])
+            # sol_sign is CHAR(88), shorter signatures are padded by spaces
+            tx_dict[tx.neon_res.sol_sign.rstrip()] = tx
+        return tx_dict
+
     def get_tx_by_sol_sign(self, sol_sign) -> NeonTxDBInfo:
         return self._tx_from_value(
             self._fetchone(self._column_lst, [('sol_sign', sol_sign)], ['finalized desc']))
@@ -1,74 +1,128 @@
-import psycopg2
 import os
 import logging
-from proxy.indexer.pg_common import POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD\
-    , POSTGRES_HOST, encode, decode, dummy
+import threading
+import time
+from psycopg2.extras import execute_values
+from proxy.indexer.pg_common import encode_json, decode_json, migrate_to_json, pg_pool
 
 logger = logging.getLogger(__name__)
 
 class TrxReceiptsStorage:
-    def __init__(self, table_name, log_level = logging.DEBUG):
+    """
+    Stores receipts of Solana transactions.
+
+    If write_batch_size is set, add_trx() puts receipts into a buffer, which is written by one multi-row
+    INSERT in a transaction when write_batch_size receipts are collected, or when write_interval seconds
+    passed since the last write. Call flush() before relying on max_known_trx() for the added receipts.
+
+    get_trxs() streams receipts from a server-side cursor by read_batch_size rows, so the memory usage doesn't
+    depend on the number of stored receipts.
+    """
+    def __init__(self, table_name, log_level = logging.DEBUG, write_batch_size = 0, write_interval = 1.0,
+                 read_batch_size = 1000):
         self.table_name = table_name
         logger.setLevel(log_level)
-        self.conn = psycopg2.connect(
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST
-        )
-
-        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        cur = self.conn.cursor()
-        cur.execute(f'''
-        CREATE TABLE IF NOT EXISTS
-        {self.table_name} (
-            slot        BIGINT,
-            signature   VARCHAR(88),
-            trx         BYTEA,
-            PRIMARY KEY (slot, signature)
-        )
-        ''')
+        self.read_batch_size = read_batch_size
+        self.write_batch_size = write_batch_size
+        self.write_interval = write_interval
+        self._buffer = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_time = time.time()
+        with pg_pool().cursor() as cur:
+            cur.execute(f'''
+            CREATE TABLE IF NOT EXISTS
+            {self.table_name} (
+                slot        BIGINT,
+                signature   VARCHAR(88),
+                trx         BYTEA,
+                PRIMARY KEY (slot, signature)
+            )
+            ''')
 
     def clear(self):
-        cur = self.conn.cursor()
-        cur.execute(f'DELETE FROM {self.table_name}')
+        with pg_pool().cursor() as cur:
+            cur.execute(f'DELETE FROM {self.table_name}')
 
     def size(self):
-        cur = self.conn.cursor()
-        cur.execute(f'SELECT COUNT(*) FROM {self.table_name}')
-        rows = cur.fetchone()[0]
+        with pg_pool().cursor() as cur:
+            cur.execute(f'SELECT COUNT(*) FROM {self.table_name}')
+            rows = cur.fetchone()[0]
         return rows if rows is not None else 0
 
     def max_known_trx(self):
-        cur = self.conn.cursor()
-        cur.execute(f'SELECT slot, signature FROM {self.table_name} ORDER BY slot DESC, signature DESC LIMIT 1')
-        row = cur.fetchone()
+        with pg_pool().cursor() as cur:
+            cur.execute(f'SELECT slot, signature FROM {self.table_name} ORDER BY slot DESC, signature DESC LIMIT 1')
+            row = cur.fetchone()
         if row is not None:
             return (row[0], row[1])
         return (0, None) #table empty - return default value
 
     def add_trx(self, slot, signature, trx):
-        bin_trx = encode(trx)
-        cur = self.conn.cursor()
-        cur.execute(f'''
-                INSERT INTO {self.table_name} (slot, signature, trx)
-                VALUES ({slot},%s,%s)
-                ON CONFLICT (slot, signature)
-                DO UPDATE SET
-                trx = EXCLUDED.trx
-            ''',
-            (signature, bin_trx)
-        )
+        if self.write_batch_size <= 0:
+            self._write([(slot, signature, encode_json(trx))])
+            return
+
+        with self._buffer_lock:
+            self._buffer[(slot, signature)] = encode_json(trx)
+            need_flush = (len(self._buffer) >= self.write_batch_size) or \
+                         (time.time() - self._flush_time >= self.write_interval)
+        if need_flush:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._buffer_lock:
+                buffer, self._buffer = self._buffer, {}
+                self._flush_time = time.time()
+            if not len(buffer):
+                return
+
+            try:
+                self._write([(slot, signature, bin_trx) for (slot, signature), bin_trx in buffer.items()])
+            except Exception:
+                # keep receipts for the next flush, newer versions of the same receipts win
+                with self._buffer_lock:
+                    buffer.update(self._buffer)
+                    self._buffer = buffer
+                raise
+            logger.debug(f'Flushed {len(buffer)} receipts')
+
+    def migrate_encoding(self):
+        migrate_to_json(self.table_name, ['slot', 'signature'], 'trx')
+
+    def _write(self, rows):
+        with pg_pool().transaction() as cur:
+            execute_values(cur, f'''
+                    INSERT INTO {self.table_name} (slot, signature, trx)
+                    VALUES %s
+                    ON CONFLICT (slot, signature)
+                    DO UPDATE SET
+                    trx = EXCLUDED.trx
+                ''',
+                rows,
+                page_size=1000
+            )
 
     def contains(self, slot, signature):
-        cur = self.conn.cursor()
-        cur.execute(f'SELECT 1 FROM {self.table_name} WHERE slot = %s AND signature = %s', (slot, signature,))
-        return cur.fetchone() is not None
+        with self._buffer_lock:
+            if (slot, signature) in self._buffer:
+                return True
+        with pg_pool().cursor() as cur:
+            cur.execute(f'SELECT 1 FROM {self.table_name} WHERE slot = %s AND signature = %s', (slot, signature,))
+            return cur.fetchone() is not None
 
-    def get_trxs(self, start_slot = 0, reverse = False):
-        cur = self.conn.cursor()
+    def get_trxs(self, start_slot = 0, reverse = False, end_slot = None):
         order = 'DESC' if reverse else 'ASC'
-        cur.execute(f'SELECT slot, signature, trx FROM {self.table_name} WHERE slot >= {start_slot} ORDER BY slot {order}')
-        rows = cur.fetchall()
-        for row in rows:
-            yield int(row[0]), row[1], decode(row[2])
+        where_cond = 'slot >= %s'
+        where_keys = [start_slot]
+        if end_slot is not None:
+            where_cond += ' AND slot <= %s'
+            where_keys.append(end_slot)
+
+        with pg_pool().transaction(cursor_name=f'{self.table_name}_get_trxs') as cur:
+            cur.itersize = self.read_batch_size
+            cur.execute(f'SELECT slot, signature, trx FROM {self.table_name} WHERE {where_cond} ORDER BY slot {order}',
+                        where_keys)
+            for row in cur:
+                yield int(row[0]), row[1], decode_json(row[2])
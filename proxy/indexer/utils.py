@@ -2,7 +2,6 @@ import base58
 import base64
 import json
 import logging
-import psycopg2
 import rlp
 import subprocess
 import os
@@ -22,12 +21,13 @@ from web3.auto.gethdev import w3
 
 from ..common_neon.constants import SYSVAR_INSTRUCTION_PUBKEY, INCINERATOR_PUBKEY, KECCAK_PROGRAM
 from ..common_neon.layouts import STORAGE_ACCOUNT_INFO_LAYOUT
+from ..common_neon.errors import EthereumError
 from ..common_neon.eth_proto import Trx as EthTx
 from ..environment import SOLANA_URL, EVM_LOADER_ID, ETH_TOKEN_MINT_ID
 
 
-from proxy.indexer.pg_common import POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST
-from proxy.indexer.pg_common import encode, decode
+from psycopg2.extras import execute_values
+from proxy.indexer.pg_common import encode_json, decode_json, pg_pool
 
 
 FINALIZED = os.environ.get('FINALIZED', 'finalized')
@@ -139,12 +139,15 @@ class NeonTxResultInfo:
             if ix_idx in evm_ix_idxs:
                 for event in inner_ix['instructions']:
                     if accounts[event['programIdIndex']] == EVM_LOADER_ID:
-                        log = base58.b58decode(event['data'])
-                        evm_ix = int(log[0])
-                        if evm_ix == 7:
-                            self._decode_event(log, ix_idx)
-                        elif evm_ix == 6:
-                            self._decode_return(log, ix_idx, tx)
+                        self.decode_event(base58.b58decode(event['data']), ix_idx, tx)
+
+    def decode_event(self, log: bytes, ix_idx: int, tx: {}):
+        """Decodes data of an evm_loader inner instruction of the instruction ix_idx"""
+        evm_ix = int(log[0])
+        if evm_ix == 7:
+            self._decode_event(log, ix_idx)
+        elif evm_ix == 6:
+            self._decode_return(log, ix_idx, tx)
 
     def clear(self):
         self._set_defaults()
@@ -266,22 +269,16 @@ def get_account_list(client, storage_account):
 
 class BaseDB:
     def __init__(self):
-        self._conn = psycopg2.connect(
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USER,
-            password=POSTGRES_PASSWORD,
-            host=POSTGRES_HOST
-        )
-        self._conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        cursor = self._conn.cursor()
-        cursor.execute(self._create_table_sql())
+        with pg_pool().cursor() as cursor:
+            cursor.execute(self._create_table_sql())
 
     def _create_table_sql(self) -> str:
         assert False, 'No script for the table'
 
-    def _fetchone(self, values, keys, order_list=None) -> str:
-        cursor = self._conn.cursor()
+    def get_table_name(self) -> str:
+        return self._table_name
 
+    def _fetchone(self, values, keys, order_list=None) -> str:
         where_cond = '1=1'
         where_keys = []
         for name, value in keys:
@@ -292,25 +289,34 @@ class BaseDB:
         if order_list:
             order_cond = 'ORDER BY ' + ', '.join(order_list)
 
-        cursor.execute(f'SELECT {",".join(values)} FROM {self._table_name} WHERE {where_cond} {order_cond}', where_keys)
-        return cursor.fetchone()
-
-    def __del__(self):
-        self._conn.close()
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'SELECT {",".join(values)} FROM {self._table_name} WHERE {where_cond} {order_cond}',
+                           where_keys)
+            return cursor.fetchone()
 
     def decode_list(self, v):
-        return [] if not v else decode(v)
+        return [] if not v else decode_json(v)
 
     def encode_list(self, v: []):
-        return None if (not v) or (len(v) == 0) else encode(v)
+        return None if (not v) or (len(v) == 0) else encode_json(v)
 
 
 class LogDB(BaseDB):
+    """
+    Stores a row per Neon log with the topics in positional columns topic0..topic3.
+
+    Logs are filtered in SQL by the eth_getLogs rules: a topic position is either null (any value),
+    a topic, or a list of alternative topics.
+    """
+    READ_BATCH_SIZE = 1000
+
     def __init__(self):
         BaseDB.__init__(self)
+        self._column_lst = ('address', 'blockHash', 'blockNumber', 'slot', 'finalized', 'transactionHash',
+                            'transactionIndex', 'logIndex', 'topic0', 'topic1', 'topic2', 'topic3', 'json')
 
     def _create_table_sql(self) -> str:
-        self._table_name = 'logs'
+        self._table_name = 'neon_logs'
         return f"""
             CREATE TABLE IF NOT EXISTS {self._table_name} (
                 address CHAR(42),
@@ -320,45 +326,84 @@ class LogDB(BaseDB):
                 finalized BOOLEAN,
 
                 transactionHash CHAR(66),
-                transactionLogIndex INT,
-                topic TEXT,
+                transactionIndex INT,
+                logIndex INT,
+
+                topic0 CHAR(66),
+                topic1 CHAR(66),
+                topic2 CHAR(66),
+                topic3 CHAR(66),
 
                 json TEXT,
 
-                UNIQUE(transactionLogIndex, transactionHash, topic, slot, finalized)
+                UNIQUE(transactionHash, logIndex, slot, finalized)
             );
             CREATE INDEX IF NOT EXISTS {self._table_name}_finalized ON {self._table_name}(slot, finalized);
+            CREATE INDEX IF NOT EXISTS {self._table_name}_block_number ON {self._table_name}(blockNumber);
+            CREATE INDEX IF NOT EXISTS {self._table_name}_block_hash ON {self._table_name}(blockHash);
+            CREATE INDEX IF NOT EXISTS {self._table_name}_address ON {self._table_name}(address, blockNumber);
+            CREATE INDEX IF NOT EXISTS {self._table_name}_topic0 ON {self._table_name}(topic0, blockNumber);
             """
 
+    def _log_to_row(self, log, slot, finalized):
+        topics = [topic.lower() for topic in log['topics'][:4]]
+        topics += [None] * (4 - len(topics))
+        return (
+            log['address'].lower(),
+            log['blockHash'],
+            int(log['blockNumber'], 16),
+            slot,
+            finalized,
+            log['transactionHash'],
+            int(log['transactionIndex'], 16),
+            int(log['logIndex'], 16),
+            *topics,
+            json.dumps(log)
+        )
+
+    def _insert_rows(self, cursor, rows):
+        execute_values(cursor, f'''
+            INSERT INTO {self._table_name}({', '.join(self._column_lst)})
+            VALUES %s ON CONFLICT DO NOTHING''', rows)
+
     def push_logs(self, logs, block):
-        rows = []
-        for log in logs:
-            for topic in log['topics']:
-                rows.append(
-                    (
-                        log['address'],
-                        log['blockHash'],
-                        int(log['blockNumber'], 16),
-                        block.slot,
-                        block.finalized,
-                        log['transactionHash'],
-                        int(log['transactionLogIndex'], 16),
-                        topic,
-                        json.dumps(log)
-                    )
-                )
+        rows = [self._log_to_row(log, block.slot, block.finalized) for log in logs]
         if len(rows):
-            # logger.debug(rows)
-            cur = self._conn.cursor()
-            cur.executemany('''
-                            INSERT INTO logs(address, blockHash, blockNumber, slot, finalized,
-                                            transactionHash, transactionLogIndex, topic, json)
-                            VALUES (%s, %s, %s, %s,  %s, %s,  %s, %s, %s) ON CONFLICT DO NOTHING''', rows)
+            with pg_pool().cursor() as cursor:
+                self._insert_rows(cursor, rows)
         else:
             logger.debug("NO LOGS")
 
-
-    def get_logs(self, fromBlock = None, toBlock = None, address = None, topics = None, blockHash = None):
+    def migrate_from_old_table(self, old_table_name='logs', batch_size=1000):
+        """Copies logs from the table with a row per topic, which was used before"""
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', (old_table_name,))
+            if not cursor.fetchone()[0]:
+                return
+            cursor.execute(f'SELECT 1 FROM {self._table_name} LIMIT 1')
+            if cursor.fetchone() is not None:
+                return
+
+        count = 0
+        with pg_pool().transaction(cursor_name='migrate_old_logs') as old_cursor:
+            old_cursor.itersize = batch_size
+            old_cursor.execute(f'SELECT DISTINCT slot, finalized, json FROM {old_table_name}')
+            rows = []
+            for slot, finalized, log in old_cursor:
+                rows.append(self._log_to_row(json.loads(log), slot, finalized))
+                if len(rows) >= batch_size:
+                    with pg_pool().cursor() as cursor:
+                        self._insert_rows(cursor, rows)
+                    count += len(rows)
+                    rows = []
+            if len(rows):
+                with pg_pool().cursor() as cursor:
+                    self._insert_rows(cursor, rows)
+                count += len(rows)
+        logger.debug(f'Moved {count} logs to {self._table_name}')
+
+    def get_logs(self, fromBlock = None, toBlock = None, address = None, topics = None, blockHash = None,
+                 max_results = None):
         queries = []
         params = []
 
@@ -375,13 +420,22 @@ class LogDB(BaseDB):
             queries.append("blockHash = %s")
             params.append(blockHash)
 
-        if topics is not None and len(topics) > 0:
-            topics = [item.lower() for item in topics]
-            query_placeholder = ", ".join(["%s" for _ in range(len(topics))])
-            topics_query = f"topic IN ({query_placeholder})"
-
-            queries.append(topics_query)
-            params += topics
+        if topics is not None:
+            if len(topics) > 4:
+                raise EthereumError(-32602, f'invalid topics: {len(topics)} positions, only 4 are allowed')
+            for idx, topic in enumerate(topics):
+                if topic is None:
+                    continue
+                if isinstance(topic, str):
+                    queries.append(f"topic{idx} = %s")
+                    params.append(topic.lower())
+                elif isinstance(topic, list):
+                    # None among alternatives matches any topic, like None at the position
+                    if any(item is None for item in topic) or len(topic) == 0:
+                        continue
+                    query_placeholder = ", ".join(["%s" for _ in range(len(topic))])
+                    queries.append(f"topic{idx} IN ({query_placeholder})")
+                    params += [item.lower() for item in topic]
 
         if address is not None:
             if isinstance(address, str):
@@ -396,32 +450,34 @@ class LogDB(BaseDB):
                 queries.append(address_query)
                 params += address
 
-        query_string = "SELECT * FROM logs WHERE "
-        for idx, query in enumerate(queries):
-            query_string += query
-            if idx < len(queries) - 1:
-                query_string += " AND "
+        where_cond = " AND ".join(queries) if len(queries) else "1=1"
+        # The same log can be stored for not finalized and for finalized block, the finalized one wins
+        query_string = f'''
+            SELECT DISTINCT ON (blockNumber, transactionIndex, transactionHash, logIndex) json
+            FROM {self._table_name}
+            WHERE {where_cond}
+            ORDER BY blockNumber, transactionIndex, transactionHash, logIndex, finalized DESC'''
+        if max_results:
+            query_string += f' LIMIT {max_results + 1}'
 
         logger.debug(query_string)
         logger.debug(params)
 
-        cur = self._conn.cursor()
-        cur.execute(query_string, tuple(params))
-
-        rows = cur.fetchall()
-
-        logs = set()
-        for row in rows:
-            logs.add(row[-1])
+        # The server-side cursor fetches rows by batches, the reading stops as soon as the limit is exceeded
         return_list = []
-        for log in logs:
-            return_list.append(json.loads(log))
+        with pg_pool().transaction(cursor_name=f'{self._table_name}_get_logs') as cur:
+            cur.itersize = self.READ_BATCH_SIZE
+            cur.execute(query_string, tuple(params))
+            for row in cur:
+                if max_results and len(return_list) == max_results:
+                    raise EthereumError(-32005, f'query returned more than {max_results} results')
+                return_list.append(json.loads(row[0]))
         return return_list
 
     def del_not_finalized(self, from_slot: int, to_slot: int):
-        cursor = self._conn.cursor()
-        cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
-                       (from_slot, to_slot))
+        with pg_pool().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self._table_name} WHERE slot >= %s AND slot <= %s AND finalized = false',
+                           (from_slot, to_slot))
 
 
 class Canceller:
@@ -12,6 +12,9 @@ import copy
 import eth_utils
 import json
 import logging
+import os
+import queue
+import re
 import threading
 import traceback
 import unittest
@@ -24,17 +27,27 @@ from ..http.websocket import WebsocketFrame
 from ..http.server import HttpWebServerBasePlugin, httpProtocolTypes
 from solana.account import Account as sol_Account
 from solana.rpc.api import Client as SolanaClient, SendTransactionError as SolanaTrxError
-from typing import List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Optional
 from web3 import Web3
 
 from .solana_rest_api_tools import getAccountInfo, call_signed, neon_config_load, \
     get_token_balance_or_airdrop, estimate_gas
 from ..common_neon.address import EthereumAddress
-from ..common_neon.emulator_interactor import call_emulated
+from ..common_neon.emulator_interactor import call_emulated, EthCallCache
 from ..common_neon.errors import EthereumError
 from ..common_neon.eth_proto import Trx as EthTrx
+from ..common_neon.lru_cache import LRUCache
+from ..common_neon.mempool import mempool
+from ..common_neon.perm_account_pool import perm_account_pool
+from ..common_neon.sender_queue import sender_queue
+from ..common_neon.signer_pool import read_keypair, signer_pool
+from ..common_neon.solana_interactor import SolanaInteractor
 from ..core.acceptor.pool import proxy_id_glob
-from ..environment import neon_cli, solana_cli, SOLANA_URL, MINIMAL_GAS_PRICE
+from ..environment import neon_cli, solana_cli, SOLANA_URL, MINIMAL_GAS_PRICE, ETH_CALL_CACHE_SIZE, \
+    ETH_CALL_CACHE_MAX_ENTRY_SIZE, BATCH_REQUEST_MAX_SIZE, BATCH_REQUEST_MAX_WORKERS, BATCH_REQUEST_POOL_SIZE, \
+    GET_LOGS_MAX_BLOCK_RANGE, GET_LOGS_MAX_RESULTS, RESPONSE_CACHE_SIZE, WAIT_FOR_RECEIPT_MAX_TIMEOUT, \
+    EVM_STEPS, SENDER_QUEUE_MAX_GAP, MEMPOOL_MODE
 from ..indexer.indexer_db import IndexerDB
 from ..indexer.utils import NeonTxInfo
 
@@ -44,6 +57,14 @@ logger.setLevel(logging.DEBUG)
 modelInstanceLock = threading.Lock()
 modelInstance = None
 
+batchExecutorLock = threading.Lock()
+batchExecutor: Optional[ThreadPoolExecutor] = None
+batchExecutorPid: Optional[int] = None
+
+responseCacheLock = threading.Lock()
+responseCache: Optional[LRUCache] = None
+responseCachePid: Optional[int] = None
+
 NEON_PROXY_PKG_VERSION = '0.5.4-dev'
 NEON_PROXY_REVISION = 'NEON_PROXY_REVISION_TO_BE_REPLACED'
 
@@ -54,18 +75,25 @@ class EthereumModel:
         self.client = SolanaClient(SOLANA_URL)
 
         self.db = IndexerDB(self.client)
+        self.eth_call_cache = EthCallCache(ETH_CALL_CACHE_SIZE, ETH_CALL_CACHE_MAX_ENTRY_SIZE)
+        # Marks results of the current request, which never change, see _set_final_result()
+        self.request_local = threading.local()
 
         with proxy_id_glob.get_lock():
             self.proxy_id = proxy_id_glob.value
             proxy_id_glob.value += 1
         logger.debug("worker id {}".format(self.proxy_id))
 
+        self.signer_pool = signer_pool(self.signer, self.client, self.proxy_id)
+        for signer in self.signer_pool.signers:
+            # Start preparing storage/holder accounts for iterative transactions
+            perm_account_pool(SolanaInteractor(signer, self.client))
+
         neon_config_load(self)
 
 
     @staticmethod
     def get_solana_account() -> Optional[sol_Account]:
-        solana_account: Optional[sol_Account] = None
         res = solana_cli().call('config', 'get')
         substr = "Keypair Path: "
         path = ""
@@ -75,13 +103,7 @@ class EthereumModel:
         if path == "":
             raise Exception("cannot get keypair path")
 
-        with open(path.strip(), mode='r') as file:
-            pk = (file.read())
-            nums = list(map(int, pk.strip("[] \n").split(',')))
-            nums = nums[0:32]
-            values = bytes(nums)
-            solana_account = sol_Account(values)
-        return solana_account
+        return read_keypair(path)
 
     def neon_proxy_version(self):
         return 'Neon-proxy/v' + NEON_PROXY_PKG_VERSION + '-' + NEON_PROXY_REVISION
@@ -155,8 +177,11 @@ class EthereumModel:
         topics = None
         blockHash = None
 
-        if 'fromBlock' in obj and obj['fromBlock'] != '0':
-            fromBlock = self.process_block_tag(obj['fromBlock'])
+        # A missing fromBlock means the latest block. Requests from the genesis are limited only by the number
+        # of results, other requests are limited by the block range too
+        is_from_genesis = obj.get('fromBlock') in ('0', '0x0', 0, 'earliest')
+        if not is_from_genesis:
+            fromBlock = self.process_block_tag(obj.get('fromBlock', 'latest'))
         if 'toBlock' in obj and obj['toBlock'] != 'latest':
             toBlock = self.process_block_tag(obj['toBlock'])
         if 'address' in obj:
@@ -165,8 +190,28 @@ class EthereumModel:
            topics = obj['topics']
         if 'blockHash' in obj:
            blockHash = obj['blockHash']
+           fromBlock = None
+
+        if GET_LOGS_MAX_BLOCK_RANGE and fromBlock is not None:
+            lastBlock = toBlock if toBlock is not None else self.db.get_last_block_height()
+            if lastBlock - fromBlock > GET_LOGS_MAX_BLOCK_RANGE:
+                raise EthereumError(-32005, f'query exceeds max block range {GET_LOGS_MAX_BLOCK_RANGE}')
 
-        return self.db.get_logs(fromBlock, toBlock, address, topics, blockHash)
+        return self.db.get_logs(fromBlock, toBlock, address, topics, blockHash, GET_LOGS_MAX_RESULTS)
+
+    def _set_final_result(self):
+        """Marks the result of the current request as immutable, so the rendered response can be cached"""
+        self.request_local.is_final = True
+
+    def take_final_result(self) -> bool:
+        """Returns if the last result in the current thread was marked as immutable, and resets the mark"""
+        is_final = getattr(self.request_local, 'is_final', False)
+        self.request_local.is_final = False
+        return is_final
+
+    def _is_block_complete(self, block):
+        """The block is finalized, and the indexer stored all transactions of it"""
+        return block.finalized and block.slot < self.db.get_min_receipt_slot()
 
     def getBlockBySlot(self, slot, full):
         block = self.db.get_full_block_by_slot(slot)
@@ -176,8 +221,9 @@ class EthereumModel:
         transactions = []
         gasUsed = 0
         trx_index = 0
+        tx_dict = self.db.get_txs_by_sol_signs(block.signs)
         for signature in block.signs:
-            tx = self.db.get_tx_by_sol_sign(signature)
+            tx = tx_dict.get(signature)
             if not tx:
                 continue
 
@@ -203,6 +249,8 @@ class EthereumModel:
             "logsBloom": '0x'+'0'*512,
             "gasLimit": '0x6691b7',
         }
+        if self._is_block_complete(block):
+            self._set_final_result()
         return ret
 
     def eth_getStorageAt(self, account, position, block_identifier):
@@ -232,7 +280,7 @@ class EthereumModel:
             return None
         ret = self.getBlockBySlot(slot, full)
         if ret is not None:
-            logger.debug("eth_getBlockByHash: %s", json.dumps(ret, indent=3))
+            logger.debug("eth_getBlockByHash: %s", ret)
         else:
             logger.debug("Not found block by hash %s", block_hash)
         return ret
@@ -248,8 +296,11 @@ class EthereumModel:
             logger.debug("Not found block by number %s", tag)
             return None
         ret = self.getBlockBySlot(slot, full)
+        if tag == "latest":
+            # The same parameters return another block later
+            self.take_final_result()
         if ret is not None:
-            logger.debug("eth_getBlockByNumber: %s", json.dumps(ret, indent=3))
+            logger.debug("eth_getBlockByNumber: %s", ret)
         else:
             logger.debug("Not found block by number %s", tag)
         return ret
@@ -272,7 +323,26 @@ class EthereumModel:
             contract_id = obj.get('to', 'deploy')
             data = obj.get('data', "None")
             value = obj.get('value', '')
-            return "0x"+call_emulated(contract_id, caller_id, data, value)['result']
+
+            if not self.eth_call_cache.is_enabled():
+                return "0x"+call_emulated(contract_id, caller_id, data, value)['result']
+
+            block_height = self.db.get_last_block_height()
+            key = (str(caller_id or '').lower(), str(contract_id or '').lower(), str(data or '').lower(),
+                   str(value or '').lower())
+            cached = self.eth_call_cache.get(key, block_height)
+            if isinstance(cached, EthereumError):
+                raise EthereumError(code=cached.code, message=cached.message, data=cached.data)
+            elif cached is not None:
+                return cached
+
+            try:
+                result = "0x"+call_emulated(contract_id, caller_id, data, value)['result']
+            except EthereumError as err:
+                self.eth_call_cache.put(key, block_height, err)
+                raise
+            self.eth_call_cache.put(key, block_height, result)
+            return result
         except Exception as err:
             logger.debug("eth_call %s", err)
             raise
@@ -281,7 +351,10 @@ class EthereumModel:
         logger.debug('eth_getTransactionCount: %s', account)
         try:
             acc_info = getAccountInfo(self.client, EthereumAddress(account))
-            return hex(int.from_bytes(acc_info.trx_count, 'little'))
+            nonce = int.from_bytes(acc_info.trx_count, 'little')
+            if tag == 'pending' and MEMPOOL_MODE:
+                nonce = mempool().get_pending_nonce(account, nonce)
+            return hex(nonce)
         except Exception as err:
             print("Can't get account info: %s"%err)
             return hex(0)
@@ -313,6 +386,32 @@ class EthereumModel:
         if not tx:
             logger.debug("Not found receipt")
             return None
+        receipt = self._getTransactionReceipt(tx)
+        if tx.block.finalized:
+            self._set_final_result()
+        return receipt
+
+    def neon_waitForReceipt(self, trxId, timeout=None):
+        """
+        Like eth_getTransactionReceipt, but waits up to timeout seconds (WAIT_FOR_RECEIPT_MAX_TIMEOUT at most)
+        for the transaction to be indexed
+        """
+        logger.debug('neon_waitForReceipt: %s %s', trxId, timeout)
+
+        receipt = self.eth_getTransactionReceipt(trxId)
+        if receipt is not None:
+            return receipt
+
+        if timeout is None:
+            timeout = WAIT_FOR_RECEIPT_MAX_TIMEOUT
+        elif isinstance(timeout, str):
+            timeout = int(timeout, 16) if timeout.startswith('0x') else float(timeout)
+        timeout = min(max(float(timeout), 0.0), WAIT_FOR_RECEIPT_MAX_TIMEOUT)
+
+        tx = self.db.wait_for_tx_by_neon_sign(trxId.lower(), timeout)
+        if tx is None:
+            logger.debug("Not found receipt")
+            return None
         return self._getTransactionReceipt(tx)
 
     def _getTransaction(self, tx):
@@ -337,15 +436,42 @@ class EthereumModel:
         logger.debug("_getTransaction: %s", json.dumps(ret, indent=3))
         return ret
 
+    def _getPendingTransaction(self, neon_sign):
+        t = mempool().get_tx(neon_sign)
+        if t is None:
+            logger.debug("Not found pending transaction")
+            return None
+        return {
+            "blockHash": None,
+            "blockNumber": None,
+            "hash": t.sign,
+            "transactionIndex": None,
+            "from": t.addr,
+            "nonce": t.nonce,
+            "gasPrice": t.gas_price,
+            "gas": t.gas_limit,
+            "to": t.to_addr,
+            "value": t.value,
+            "input": t.calldata,
+            "v": t.v,
+            "r": t.r,
+            "s": t.s,
+        }
+
     def eth_getTransactionByHash(self, trxId):
         logger.debug('eth_getTransactionByHash: %s', trxId)
 
         neon_sign = trxId.lower()
         tx = self.db.get_tx_by_neon_sign(neon_sign)
+        if tx is None and MEMPOOL_MODE:
+            return self._getPendingTransaction(neon_sign)
         if tx is None:
             logger.debug ("Not found receipt")
             return None
-        return self._getTransaction(tx)
+        trx = self._getTransaction(tx)
+        if tx.block.finalized:
+            self._set_final_result()
+        return trx
 
     def eth_getCode(self, param,  param1):
         return "0x01"
@@ -365,27 +491,50 @@ class EthereumModel:
             raise Exception("The transaction gasPrice is less then the minimum allowable value ({}<{})".format(trx.gasPrice, MINIMAL_GAS_PRICE))
 
         eth_signature = '0x' + bytes(Web3.keccak(bytes.fromhex(rawTrx[2:]))).hex()
+        self.db.forget_unknown_tx(eth_signature)
 
         sender = trx.sender()
         logger.debug('Eth Sender: %s', sender)
         logger.debug('Eth Signature: %s', trx.signature().hex())
         logger.debug('Eth Hash: %s', eth_signature)
 
-        nonce = int(self.eth_getTransactionCount('0x' + sender, None), base=16)
+        if MEMPOOL_MODE:
+            return self._submit_transaction(trx, eth_signature)
+        return self._execute_transaction(trx, eth_signature)
+
+    def _submit_transaction(self, trx: EthTrx, eth_signature: str):
+        """Checks the nonce and returns the hash, the transaction is executed in background"""
+        def get_nonce() -> int:
+            return int(self.eth_getTransactionCount('0x' + trx.sender(), None), base=16)
 
-        logger.debug('Eth Sender trx nonce in solana: %s', nonce)
-        logger.debug('Eth Sender trx nonce in transaction: %s', trx.nonce)
+        nonce = get_nonce()
+        if trx.nonce < nonce or trx.nonce - nonce > SENDER_QUEUE_MAX_GAP:
+            raise self._get_nonce_error(nonce, trx.nonce)
+
+        neon_tx = NeonTxInfo()
+        neon_tx.init_from_eth_tx(trx)
+        # The mempool runs the transaction when its nonce is the next one, so it doesn't wait in the sender queue long
+        mempool().submit(neon_tx, lambda: self._execute_transaction(trx, eth_signature), nonce, get_nonce)
+        return eth_signature
+
+    def _execute_transaction(self, trx: EthTrx, eth_signature: str):
+        sender = trx.sender()
+
+        def get_nonce() -> int:
+            return int(self.eth_getTransactionCount('0x' + sender, None), base=16)
 
-        if (int(nonce) != int(trx.nonce)):
-            raise EthereumError(-32002, 'Verifying nonce before send transaction: Error processing Instruction 1: invalid program argument'
-                                .format(int(nonce), int(trx.nonce)),
-                                {
-                                    'logs': [
-                                        '/src/entrypoint.rs Invalid Ethereum transaction nonce: acc {}, trx {}'.format(nonce, trx.nonce),
-                                    ]
-                                })
         try:
-            neon_res, signature = call_signed(self.signer, self.client, trx, steps=250)
+            # Transactions of the sender are executed in the order of nonces, also by other workers
+            with sender_queue().ordered(sender, trx.nonce, get_nonce) as nonce:
+                logger.debug('Eth Sender trx nonce in solana: %s', nonce)
+                logger.debug('Eth Sender trx nonce in transaction: %s', trx.nonce)
+
+                if (int(nonce) != int(trx.nonce)):
+                    raise self._get_nonce_error(nonce, trx.nonce)
+                with self.signer_pool.signer() as signer:
+                    neon_res, signature = call_signed(signer, self.client, trx, steps=EVM_STEPS)
+            # The transaction can change the state which results of eth_call in the current block depend on
+            self.eth_call_cache.clear()
             logger.debug('Transaction signature: %s %s', signature, eth_signature)
             neon_tx = NeonTxInfo()
             neon_tx.init_from_eth_tx(trx)
@@ -402,6 +551,16 @@ class EthereumModel:
             logger.debug("eth_sendRawTransaction type(err):%s, Exception:%s", type(err), err)
             raise
 
+    @staticmethod
+    def _get_nonce_error(nonce: int, trx_nonce: int) -> EthereumError:
+        return EthereumError(-32002, 'Verifying nonce before send transaction: Error processing Instruction 1: invalid program argument'
+                             .format(int(nonce), int(trx_nonce)),
+                             {
+                                 'logs': [
+                                     '/src/entrypoint.rs Invalid Ethereum transaction nonce: acc {}, trx {}'.format(nonce, trx_nonce),
+                                 ]
+                             })
+
     def _log_transaction_error(self, error: SolanaTrxError, logger):
         result = copy.deepcopy(error.result)
         logs = result.get("data", {}).get("logs", [])
@@ -410,6 +569,37 @@ class EthereumModel:
         logger.error(f"Got SendTransactionError: {log_msg}")
 
 
+class RenderedJson:
+    """JSON text of a result, which is put into the response as is"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __len__(self):
+        return len(self.text)
+
+    def __str__(self):
+        return self.text
+
+
+def dumps_response(response) -> str:
+    """json.dumps() which inserts texts of RenderedJson values without parsing them"""
+    rendered_list = []
+    marker = os.urandom(8).hex()
+
+    def replace_rendered(obj):
+        if isinstance(obj, RenderedJson):
+            rendered_list.append(obj.text)
+            return f'{marker}:{len(rendered_list) - 1}'
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    text = json.dumps(response, default=replace_rendered)
+    if not rendered_list:
+        return text
+    return re.sub(f'"{marker}:([0-9]+)"', lambda m: rendered_list[int(m.group(1))], text)
+
+
 class JsonEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, bytearray):
@@ -478,6 +668,31 @@ class SolanaContractTests(unittest.TestCase):
         self.assertTrue(receiptId in block['transactions'])
 
 
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool for batch requests, shared by all connections of the current process"""
+    global batchExecutor, batchExecutorPid
+
+    with batchExecutorLock:
+        if batchExecutor is None or batchExecutorPid != os.getpid():
+            batchExecutor = ThreadPoolExecutor(max_workers=BATCH_REQUEST_POOL_SIZE, thread_name_prefix='batch')
+            batchExecutorPid = os.getpid()
+        return batchExecutor
+
+
+def get_response_cache() -> LRUCache:
+    """
+    Returns the cache of rendered responses, shared by all connections of the current process,
+    it is bounded by RESPONSE_CACHE_SIZE characters of JSON texts
+    """
+    global responseCache, responseCachePid
+
+    with responseCacheLock:
+        if responseCache is None or responseCachePid != os.getpid():
+            responseCache = LRUCache(RESPONSE_CACHE_SIZE, sizeof=len)
+            responseCachePid = os.getpid()
+        return responseCache
+
+
 class SolanaProxyPlugin(HttpWebServerBasePlugin):
     """Extend in-built Web Server to add Reverse Proxy capabilities.
     """
@@ -486,6 +701,9 @@ class SolanaProxyPlugin(HttpWebServerBasePlugin):
     SOLANA_PROXY_PASS = [
         b'http://localhost:8545/'
     ]
+    # Methods, whose results are cached by parameters, when the model marks them as immutable
+    CACHED_METHODS = {'eth_getBlockByHash', 'eth_getBlockByNumber',
+                      'eth_getTransactionReceipt', 'eth_getTransactionByHash'}
 
     def __init__(self, *args):
         HttpWebServerBasePlugin.__init__(self, *args)
@@ -515,9 +733,8 @@ class SolanaProxyPlugin(HttpWebServerBasePlugin):
             if not hasattr(self.model, request['method']):
                 response['error'] = {'code': -32000, 'message': f'method {request["method"]} is not supported'}
             else:
-                method = getattr(self.model, request['method'])
                 params = request.get('params', [])
-                response['result'] = method(*params)
+                response['result'] = self.call_method(request['method'], params)
         except SolanaTrxError as err:
             # traceback.print_exc()
             response['error'] = err.result
@@ -532,6 +749,68 @@ class SolanaProxyPlugin(HttpWebServerBasePlugin):
 
         return response
 
+    def call_method(self, method_name: str, params: List[Any]) -> Any:
+        """Calls the model method, immutable results of CACHED_METHODS are returned as RenderedJson from the cache"""
+        method = getattr(self.model, method_name)
+        response_cache = get_response_cache()
+        if method_name not in self.CACHED_METHODS or response_cache.max_size == 0:
+            return method(*params)
+
+        cache_key = (method_name, json.dumps(params))
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        self.model.take_final_result()
+        result = method(*params)
+        if self.model.take_final_result():
+            response_cache.put(cache_key, RenderedJson(json.dumps(result)))
+        return result
+
+    def process_batch_request(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Processes elements of the batch concurrently, at most BATCH_REQUEST_MAX_WORKERS at once.
+        eth_sendRawTransaction requests from the same sender are processed one after another in the batch order,
+        because their nonces depend on each other.
+        """
+        groups: Dict[Any, List[int]] = {}
+        for idx, request in enumerate(requests):
+            groups.setdefault(self._get_batch_group(idx, request), []).append(idx)
+
+        if len(groups) == 1:
+            return [self.process_request(r) for r in requests]
+
+        response: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        group_queue = queue.Queue()
+        for group in groups.values():
+            group_queue.put(group)
+
+        def process_groups():
+            while True:
+                try:
+                    group = group_queue.get_nowait()
+                except queue.Empty:
+                    return
+                for idx in group:
+                    response[idx] = self.process_request(requests[idx])
+
+        executor = get_batch_executor()
+        futures = [executor.submit(process_groups) for _ in range(min(BATCH_REQUEST_MAX_WORKERS, len(groups)))]
+        for future in futures:
+            future.result()
+        return response
+
+    @staticmethod
+    def _get_batch_group(idx: int, request: Dict[str, Any]):
+        if isinstance(request, dict) and request.get('method') == 'eth_sendRawTransaction':
+            try:
+                raw_trx = request['params'][0]
+                return EthTrx.fromString(bytearray.fromhex(raw_trx[2:])).sender()
+            except Exception:
+                # The error is returned by eth_sendRawTransaction itself
+                pass
+        return idx
+
     def handle_request(self, request: HttpParser) -> None:
         if request.method == b'OPTIONS':
             self.client.queue(memoryview(build_http_response(
@@ -551,11 +830,11 @@ class SolanaProxyPlugin(HttpWebServerBasePlugin):
             request = json.loads(request.body)
             print('type(request) = ', type(request), request)
             if isinstance(request, list):
-                response = []
                 if len(request) == 0:
                     raise Exception("Empty batch request")
-                for r in request:
-                    response.append(self.process_request(r))
+                if BATCH_REQUEST_MAX_SIZE and len(request) > BATCH_REQUEST_MAX_SIZE:
+                    raise Exception(f"Batch request is too large ({len(request)}>{BATCH_REQUEST_MAX_SIZE})")
+                response = self.process_batch_request(request)
             elif isinstance(request, object):
                 response = self.process_request(request)
             else:
@@ -565,12 +844,13 @@ class SolanaProxyPlugin(HttpWebServerBasePlugin):
             response = {'jsonrpc': '2.0', 'error': {'code': -32000, 'message': str(err)}}
 
         resp_time_ms = (time.time() - start_time)*1000  # convert this into milliseconds
-        logger.debug('>>> %s 0x%0x %s %s resp_time_ms= %s', threading.get_ident(), id(self.model), json.dumps(response),
-                     request.get('method', '---'),
+        response_text = dumps_response(response)
+        logger.debug('>>> %s 0x%0x %s %s resp_time_ms= %s', threading.get_ident(), id(self.model), response_text,
+                     request.get('method', '---') if isinstance(request, dict) else '---',
                      resp_time_ms)
 
         self.client.queue(memoryview(build_http_response(
-            httpStatusCodes.OK, body=json.dumps(response).encode('utf8'),
+            httpStatusCodes.OK, body=response_text.encode('utf8'),
             headers={
                 b'Content-Type': b'application/json',
                 b'Access-Control-Allow-Origin': b'*',
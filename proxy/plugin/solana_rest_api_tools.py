@@ -6,6 +6,7 @@ from solana.account import Account as SolanaAccount
 from solana.publickey import PublicKey
 from solana.rpc.api import Client as SolanaClient
 from solana.rpc.commitment import Confirmed
+from typing import Optional
 
 from ..common_neon.address import ether2program, getTokenAddr, EthereumAddress, AccountInfo
 from ..common_neon.errors import SolanaAccountNotFoundError, SolanaErrors
@@ -13,7 +14,7 @@ from ..common_neon.layouts import ACCOUNT_INFO_LAYOUT
 from ..common_neon.neon_instruction import NeonInstruction
 from ..common_neon.solana_interactor import SolanaInteractor
 from ..common_neon.transaction_sender import TransactionSender
-from ..common_neon.emulator_interactor import call_emulated
+from ..common_neon.emulator_interactor import call_emulated, emulation_cache, get_emulation_key
 from ..common_neon.utils import get_from_dict
 from ..environment import NEW_USER_AIRDROP_AMOUNT, read_elf_params, TIMEOUT_TO_RELOAD_NEON_CONFIG, EXTRA_GAS
 
@@ -112,17 +113,34 @@ def get_token_balance_or_airdrop(client: SolanaClient, signer: SolanaAccount, et
 
 
 def is_account_exists(client: SolanaClient, eth_account: EthereumAddress) -> bool:
+    return get_trx_count(client, eth_account) is not None
+
+
+def get_trx_count(client: SolanaClient, eth_account: EthereumAddress) -> Optional[int]:
+    """Returns the nonce of the account, or None if the account doesn't exist"""
     pda_account, nonce = ether2program(eth_account)
     info = client.get_account_info(pda_account, commitment=Confirmed)
     value = get_from_dict(info, "result", "value")
-    return value is not None
+    if value is None:
+        return None
+    data = base64.b64decode(value['data'][0])
+    if len(data) < ACCOUNT_INFO_LAYOUT.sizeof():
+        raise Exception("Wrong data length for account data {}".format(pda_account))
+    return int.from_bytes(AccountInfo.frombytes(data).trx_count, 'little')
 
 
 def estimate_gas(client: SolanaClient, signer: SolanaAccount, contract_id: str, caller_eth_account: EthereumAddress,
                  data: str = None, value: str = None):
-    if not is_account_exists(client, caller_eth_account):
+    trx_count = get_trx_count(client, caller_eth_account)
+    if trx_count is None:
         create_eth_account_and_airdrop(client, signer, caller_eth_account)
+        trx_count = 0
     result = call_emulated(contract_id, str(caller_eth_account), data, value)
+    cache = emulation_cache()
+    if cache.is_enabled():
+        # The transaction, which is sent after the estimate, can reuse the emulation
+        key = get_emulation_key(contract_id, str(caller_eth_account), data, value, trx_count)
+        cache.put(key, result)
     used_gas = result.get("used_gas")
     if used_gas is None:
         logger.error(f"Failed estimate_gas, unexpected result, by contract_id: {contract_id}, caller_eth_account: "
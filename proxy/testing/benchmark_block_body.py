@@ -0,0 +1,89 @@
+"""
+Compares loading of transactions of a block by a query per Solana signature and by one bulk query.
+
+    python3 -m proxy.testing.benchmark_block_body [signatures per block ...]
+
+The benchmark writes synthetic blocks and transactions to the configured database and removes them at the end.
+"""
+import os
+import sys
+import time
+
+from base58 import b58encode
+
+from proxy.indexer.blocks_db import SolanaBlocksDB, SolanaBlockDBInfo
+from proxy.indexer.indexer_db import IndexerDB
+from proxy.indexer.pg_common import pg_pool
+from proxy.indexer.transactions_db import NeonTxsDB, NeonTxDBInfo
+from proxy.indexer.utils import NeonTxInfo, NeonTxResultInfo, SolanaIxSignInfo
+
+BENCHMARK_SLOT = 2 ** 62
+
+
+def make_block(slot: int, sign_count: int) -> SolanaBlockDBInfo:
+    signs = [b58encode(os.urandom(64)).decode('utf-8') for _ in range(sign_count)]
+    return SolanaBlockDBInfo(slot=slot, finalized=True, height=slot, hash='0x' + os.urandom(32).hex(),
+                             parent_hash='0x' + os.urandom(32).hex(), time=int(time.time()), signs=signs)
+
+
+def store_block(blocks_db: SolanaBlocksDB, txs_db: NeonTxsDB, block: SolanaBlockDBInfo):
+    blocks_db.set_block(block)
+    for idx, sol_sign in enumerate(block.signs):
+        neon_tx = NeonTxInfo()
+        neon_tx.sign = '0x' + os.urandom(32).hex()
+        neon_tx.addr = '0x' + os.urandom(20).hex()
+        neon_tx.nonce = hex(idx)
+        neon_tx.gas_price = hex(1)
+        neon_tx.gas_limit = hex(1000000)
+        neon_tx.to_addr = '0x' + os.urandom(20).hex()
+        neon_tx.value = hex(0)
+        neon_tx.calldata = '0x' + os.urandom(68).hex()
+        neon_tx.v, neon_tx.r, neon_tx.s = hex(0x102), hex(1), hex(2)
+        neon_res = NeonTxResultInfo()
+        neon_res.sol_sign = sol_sign
+        neon_res.slot = block.slot
+        neon_res.idx = 0
+        neon_res.status = '0x1'
+        neon_res.gas_used = hex(21000)
+        neon_res.logs = [{'address': neon_tx.to_addr, 'topics': ['0x' + os.urandom(32).hex()], 'data': '0x'}]
+        used_ixs = [SolanaIxSignInfo(sign=sol_sign, slot=block.slot, idx=0)]
+        txs_db.set_tx(NeonTxDBInfo(neon_tx=neon_tx, neon_res=neon_res, block=block, used_ixs=used_ixs))
+
+
+def remove_blocks(from_slot: int, to_slot: int):
+    with pg_pool().cursor() as cursor:
+        for table in ('solana_blocks', 'neon_transactions', 'solana_neon_transactions'):
+            cursor.execute(f'DELETE FROM {table} WHERE slot >= %s AND slot <= %s', (from_slot, to_slot))
+
+
+def main():
+    sign_counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500]
+    db = IndexerDB(client=None)
+    blocks_db, txs_db = SolanaBlocksDB(), NeonTxsDB()
+    repeat = 5
+
+    try:
+        for idx, sign_count in enumerate(sign_counts):
+            block = make_block(BENCHMARK_SLOT + idx, sign_count)
+            store_block(blocks_db, txs_db, block)
+
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                per_sign = [db.get_tx_by_sol_sign(sol_sign) for sol_sign in block.signs]
+            per_sign_time = (time.perf_counter() - start_time) / repeat
+
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                bulk = db.get_txs_by_sol_signs(block.signs)
+            bulk_time = (time.perf_counter() - start_time) / repeat
+
+            assert [(tx.neon_tx.sign, tx.block.hash) for tx in per_sign] == \
+                   [(bulk[sign].neon_tx.sign, bulk[sign].block.hash) for sign in block.signs]
+            print(f'{sign_count:>5} signatures: per signature {per_sign_time * 1000:9.2f} ms, '
+                  f'bulk {bulk_time * 1000:9.2f} ms')
+    finally:
+        remove_blocks(BENCHMARK_SLOT, BENCHMARK_SLOT + len(sign_counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares allocation of storage/holder ids by SharedIdAllocator with the former Manager().list() based free list.
+
+    python3 -m proxy.testing.benchmark_id_allocator [cycles per process] [process count ...]
+
+Each process repeats allocate/free cycles, the time is the wall time of all processes per cycle.
+"""
+import multiprocessing
+import sys
+import time
+
+from proxy.common_neon.id_allocator import SharedIdAllocator
+
+
+class ManagerIdAllocator:
+    """The former implementation: a counter of new ids and a free list in a manager process"""
+    def __init__(self, manager):
+        self._new_id = multiprocessing.Value('i', 0)
+        self._free_list = manager.list()
+
+    def allocate(self) -> int:
+        with self._new_id.get_lock():
+            try:
+                return self._free_list.pop(0)
+            except IndexError:
+                acc_id = self._new_id.value
+                self._new_id.value += 1
+                return acc_id
+
+    def free(self, acc_id: int):
+        with self._new_id.get_lock():
+            self._free_list.append(acc_id)
+
+
+def run_cycles(allocator, cycles: int):
+    for _ in range(cycles):
+        allocator.free(allocator.allocate())
+
+
+def measure(name: str, allocator, cycles: int, process_count: int):
+    processes = [multiprocessing.Process(target=run_cycles, args=(allocator, cycles)) for _ in range(process_count)]
+    start_time = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start_time
+    print(f'{name:>8}, {process_count} processes: {elapsed / (cycles * process_count) * 1e6:8.1f} us per cycle')
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    process_counts = [int(arg) for arg in sys.argv[2:]] or [1, 4]
+    manager = multiprocessing.Manager()
+    for process_count in process_counts:
+        measure('manager', ManagerIdAllocator(manager), cycles, process_count)
+        measure('shared', SharedIdAllocator(1024), cycles, process_count)
+
+
+if __name__ == '__main__':
+    main()
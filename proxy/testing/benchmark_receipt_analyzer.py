@@ -0,0 +1,149 @@
+"""
+Compares the single-pass receipt analysis with the former helpers, which walked the receipt once per question.
+
+    python3 -m proxy.testing.benchmark_receipt_analyzer [iterations] [log lines]
+
+The success case reads what a confirmed iteration needs: the error flag, measurements, Neon results and the cost;
+the blocked case reads the error class, the blocked-account flag and the logs of a failed iteration.
+"""
+import base58
+import re
+import sys
+import time
+
+from proxy.common_neon.receipt_analyzer import analyze_receipt
+from proxy.common_neon.utils import get_from_dict
+from proxy.environment import EVM_LOADER_ID
+from proxy.indexer.utils import NeonTxResultInfo, check_error
+from proxy.testing.test_receipt_analyzer import make_receipt
+
+
+def get_error_definition_from_reciept(receipt):
+    for path in (('result', 'meta', 'err', 'InstructionError'), ('meta', 'err', 'InstructionError'),
+                 ('data', 'err', 'InstructionError'), ('err', 'InstructionError')):
+        err = get_from_dict(receipt, *path)
+        if err is not None:
+            return err
+    return None
+
+
+def check_if_program_exceeded_instructions(receipt):
+    error_arr = get_error_definition_from_reciept(receipt)
+    if error_arr is not None and isinstance(error_arr, list):
+        return error_arr[1] in ('ProgramFailedToComplete', 'ComputationalBudgetExceeded')
+    return False
+
+
+def get_logs_from_reciept(receipt):
+    for path in (('result', 'meta', 'logMessages'), ('meta', 'logMessages'), ('logMessages',),
+                 ('data', 'logs'), ('logs',)):
+        logs = get_from_dict(receipt, *path)
+        if logs is not None:
+            return logs
+    return None
+
+
+def check_if_accounts_blocked(receipt):
+    for log in get_logs_from_reciept(receipt):
+        if log.find("trying to execute transaction on ro locked account") >= 0 or \
+                log.find("trying to execute transaction on rw locked account") >= 0:
+            return True
+    return False
+
+
+def extract_measurements_from_receipt(receipt):
+    if get_error_definition_from_reciept(receipt) is not None:
+        return []
+    accounts = receipt['transaction']['message']['accountKeys']
+    instructions = [{'program': accounts[instr['programIdIndex']], 'data': base58.b58decode(instr['data']).hex()}
+                    for instr in receipt['transaction']['message']['instructions']]
+    pattern = re.compile('Program ([0-9A-Za-z]+) (.*)')
+    messages = []
+    for log in receipt['meta']['logMessages']:
+        res = pattern.match(log)
+        if res and res.group(2) == 'invoke [1]':
+            messages.append({'program': res.group(1), 'logs': []})
+        messages[-1]['logs'].append(log)
+    result = []
+    for instr in instructions:
+        if instr['program'] == 'KeccakSecp256k11111111111111111111111111111':
+            continue
+        logs = messages.pop(0)['logs']
+        re.match(r'Program %s (success)' % instr['program'], logs[-1])
+        if instr['program'] == EVM_LOADER_ID:
+            memory = re.match(r'Program log: Total memory occupied: ([0-9]+)', logs[-3])
+            consumed = re.match(r'Program %s consumed ([0-9]+) of ([0-9]+) compute units' % instr['program'], logs[-2])
+            result.append({'program': instr['program'], 'data': instr['data'],
+                           'measurements': {'instructions': consumed.group(1), 'memory': memory.group(1)}})
+    return result
+
+
+def get_transaction_cost(receipt):
+    cost = receipt['meta']['preBalances'][0] - receipt['meta']['postBalances'][0]
+    accounts = receipt["transaction"]["message"]["accountKeys"]
+    evm_loader_instructions = [idx for idx, instruction in enumerate(receipt["transaction"]["message"]["instructions"])
+                               if accounts[instruction["programIdIndex"]] == EVM_LOADER_ID]
+    used_gas = None
+    for inner in receipt['meta']['innerInstructions']:
+        if inner["index"] in evm_loader_instructions:
+            for event in inner['instructions']:
+                if accounts[event['programIdIndex']] == EVM_LOADER_ID:
+                    used_gas = int().from_bytes(base58.b58decode(event['data'])[2:10], "little")
+    return cost, used_gas
+
+
+def former_success(receipt):
+    check_error(receipt)
+    extract_measurements_from_receipt(receipt)
+    NeonTxResultInfo(receipt)
+    get_transaction_cost(receipt)
+
+
+def former_blocked(receipt):
+    check_error(receipt)
+    check_if_accounts_blocked(receipt)
+    check_if_program_exceeded_instructions(receipt)
+    get_logs_from_reciept(receipt)
+    get_transaction_cost(receipt)
+
+
+def analyzer_success(receipt):
+    info = analyze_receipt(receipt)
+    info.get_neon_res()
+
+
+def analyzer_blocked(receipt):
+    info = analyze_receipt(receipt)
+    info.is_compute_limit_exceeded()
+
+
+def measure(func, receipt, iterations: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func(receipt)
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    log_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    logs = [f'Program {EVM_LOADER_ID} invoke [1]'] + ['Program log: step'] * log_count + [
+        'Program log: Total memory occupied: 1024',
+        f'Program {EVM_LOADER_ID} consumed 180000 of 200000 compute units',
+        f'Program {EVM_LOADER_ID} success']
+    success = make_receipt(logs=logs)
+    blocked = make_receipt(err={'InstructionError': [1, {'Custom': 5}]},
+                           logs=logs[:-1] + ['Program log: trying to execute transaction on rw locked account'])
+
+    print(f'{iterations} iterations, {len(logs)} log lines')
+    for name, former, analyzer, receipt in (('success', former_success, analyzer_success, success),
+                                            ('blocked', former_blocked, analyzer_blocked, blocked)):
+        former_time = measure(former, receipt, iterations)
+        analyzer_time = measure(analyzer, receipt, iterations)
+        print(f'{name:8} former {former_time:8.1f} us, analyzer {analyzer_time:8.1f} us, '
+              f'x{former_time / analyzer_time:.2f}')
+
+
+if __name__ == '__main__':
+    main()
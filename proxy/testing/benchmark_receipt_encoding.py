@@ -0,0 +1,93 @@
+"""
+Compares the JSON receipt encoding with pickle: encode/decode time and the size of the stored value.
+JSON is chosen for readability, not for speed: it is slower and slightly larger than pickle.
+
+    python3 -m proxy.testing.benchmark_receipt_encoding [iterations]
+"""
+import base64
+import os
+import sys
+import time
+
+from base58 import b58encode
+
+from proxy.indexer.pg_common import encode, decode, encode_json, decode_json
+
+
+def random_key() -> str:
+    return b58encode(os.urandom(32)).decode('utf-8')
+
+
+def make_receipt(account_count: int = 12, log_count: int = 20) -> dict:
+    """Builds a receipt with the shape of a getTransaction result for an iterative Neon transaction"""
+    keys = [random_key() for _ in range(account_count)]
+    evm_loader = keys[-1]
+    return {
+        'blockTime': 1638000000,
+        'slot': 104345000,
+        'meta': {
+            'err': None,
+            'fee': 5000,
+            'status': {'Ok': None},
+            'preBalances': [1000000000 + idx for idx in range(account_count)],
+            'postBalances': [999995000 + idx for idx in range(account_count)],
+            'preTokenBalances': [],
+            'postTokenBalances': [],
+            'rewards': [],
+            'innerInstructions': [{
+                'index': 1,
+                'instructions': [{
+                    'accounts': [0, 1],
+                    'data': b58encode(os.urandom(40)).decode('utf-8'),
+                    'programIdIndex': account_count - 1,
+                } for _ in range(4)],
+            }],
+            'logMessages': [f'Program {evm_loader} invoke [1]'] +
+                           [f'Program log: {base64.b64encode(os.urandom(48)).decode("utf-8")}'
+                            for _ in range(log_count)] +
+                           [f'Program {evm_loader} consumed 198512 of 200000 compute units',
+                            f'Program {evm_loader} success'],
+        },
+        'transaction': {
+            'message': {
+                'accountKeys': keys,
+                'header': {'numReadonlySignedAccounts': 0, 'numReadonlyUnsignedAccounts': 3,
+                           'numRequiredSignatures': 1},
+                'instructions': [
+                    {'accounts': [], 'data': '3DTZbgwsozUF', 'programIdIndex': account_count - 2},
+                    {'accounts': list(range(account_count - 1)),
+                     'data': b58encode(os.urandom(200)).decode('utf-8'),
+                     'programIdIndex': account_count - 1},
+                ],
+                'recentBlockhash': random_key(),
+            },
+            'signatures': [b58encode(os.urandom(64)).decode('utf-8')],
+        },
+    }
+
+
+def measure(name, encoder, decoder, receipts):
+    start_time = time.perf_counter()
+    values = [encoder(receipt).adapted for receipt in receipts]
+    encode_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for value in values:
+        decoder(value)
+    decode_time = time.perf_counter() - start_time
+
+    size = sum(len(value) for value in values) / len(values)
+    count = len(receipts)
+    print(f'{name:>9}: encode {encode_time / count * 1e6:8.1f} us, decode {decode_time / count * 1e6:8.1f} us, '
+          f'size {size:8.1f} bytes')
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    receipts = [make_receipt() for _ in range(iterations)]
+    measure('pickle', encode, decode, receipts)
+    measure('json', encode_json, decode_json, receipts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Stand-in for a persistent neon-cli emulator, see proxy/common_neon/emulator_pool.py for the protocol.
+
+The stub doesn't emulate anything, it returns a successful result with the calldata as a return value.
+Special calldata values are used by tests:
+- "sleep:<seconds>" - delay the response;
+- "wait:<path>" - delay the response until the file exists, pings aren't answered meanwhile, like a daemon which
+  processes one request at a time;
+- "crash" - exit the process without response.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+output_lock = threading.Lock()
+waiting = threading.Semaphore(1)
+
+
+def respond(response):
+    with output_lock:
+        sys.stdout.write(json.dumps(response) + '\n')
+        sys.stdout.flush()
+
+
+def process(request):
+    if request['method'] == 'ping':
+        with waiting:
+            return respond({'id': request['id'], 'result': 'pong'})
+
+    # emulate --token_mint <mint> <sender> <contract> <data> <value>
+    data = request['params'][4]
+    if data == 'crash':
+        sys.stdout.flush()
+        os._exit(1)
+    if data.startswith('sleep:'):
+        time.sleep(float(data[len('sleep:'):]))
+    if data.startswith('wait:'):
+        with waiting:
+            while not os.path.exists(data[len('wait:'):]):
+                time.sleep(0.01)
+
+    result = {'exit_status': 'succeed', 'result': data, 'used_gas': 1, 'steps_executed': 1,
+              'accounts': [], 'token_accounts': [], 'solana_accounts': []}
+    respond({'id': request['id'], 'result': json.dumps(result)})
+
+
+def main():
+    for line in sys.stdin:
+        request = json.loads(line)
+        threading.Thread(target=process, args=(request,), daemon=True).start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import threading
+import time
+import unittest
+
+from proxy.plugin.solana_rest_api import SolanaProxyPlugin
+
+
+class FakeModel:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+
+    def eth_slow(self, value):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+            self.calls.append(value)
+        return value
+
+
+class TestBatchRequest(unittest.TestCase):
+    def setUp(self):
+        self.plugin = SolanaProxyPlugin.__new__(SolanaProxyPlugin)
+        self.plugin.model = FakeModel()
+
+    def test_concurrent_in_order(self):
+        requests = [{'jsonrpc': '2.0', 'id': i, 'method': 'eth_slow', 'params': [i]} for i in range(8)]
+        start_time = time.time()
+        response = self.plugin.process_batch_request(requests)
+        self.assertLess(time.time() - start_time, 0.5)
+        self.assertGreater(self.plugin.model.max_running, 1)
+        self.assertEqual([r['id'] for r in response], list(range(8)))
+        self.assertEqual([r['result'] for r in response], list(range(8)))
+
+    def test_same_group_is_serialized(self):
+        self.plugin._get_batch_group = lambda idx, request: 'sender'
+        requests = [{'jsonrpc': '2.0', 'id': i, 'method': 'eth_slow', 'params': [i]} for i in range(3)]
+        response = self.plugin.process_batch_request(requests)
+        self.assertEqual(self.plugin.model.max_running, 1)
+        self.assertEqual(self.plugin.model.calls, [0, 1, 2])
+        self.assertEqual([r['result'] for r in response], [0, 1, 2])
+
+    def test_unknown_method(self):
+        requests = [{'jsonrpc': '2.0', 'id': 1, 'method': 'eth_slow', 'params': [1]},
+                    {'jsonrpc': '2.0', 'id': 2, 'method': 'eth_unknown'}]
+        response = self.plugin.process_batch_request(requests)
+        self.assertEqual(response[0]['result'], 1)
+        self.assertIn('error', response[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
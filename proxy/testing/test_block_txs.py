@@ -0,0 +1,36 @@
+import unittest
+
+from proxy.indexer.blocks_db import SolanaBlocksDB
+from proxy.indexer.indexer_db import IndexerDB
+from proxy.indexer.transactions_db import NeonTxsDB
+from proxy.testing.benchmark_block_body import make_block, store_block, remove_blocks
+
+TEST_SLOT = 2 ** 62 - 100
+
+
+class TestBlockTxs(unittest.TestCase):
+    def setUp(self):
+        self.db = IndexerDB(client=None)
+        self.block = make_block(TEST_SLOT, 5)
+        store_block(SolanaBlocksDB(), NeonTxsDB(), self.block)
+
+    def tearDown(self):
+        remove_blocks(TEST_SLOT, TEST_SLOT)
+
+    def test_get_txs_by_sol_signs(self):
+        unknown_sign = make_block(TEST_SLOT, 1).signs[0]
+        tx_dict = self.db.get_txs_by_sol_signs(self.block.signs + [unknown_sign])
+        self.assertEqual(set(tx_dict.keys()), set(self.block.signs))
+        for sol_sign in self.block.signs:
+            expected = self.db.get_tx_by_sol_sign(sol_sign)
+            tx = tx_dict[sol_sign]
+            self.assertEqual(str(tx.neon_tx), str(expected.neon_tx))
+            self.assertEqual(str(tx.neon_res), str(expected.neon_res))
+            self.assertEqual(str(tx.block), str(expected.block))
+
+    def test_empty(self):
+        self.assertEqual(self.db.get_txs_by_sol_signs([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import time
+import unittest
+
+from solana.account import Account
+from solana.system_program import TransferParams, transfer
+from solana.transaction import Transaction
+
+from proxy.common_neon.blockhash_provider import RecentBlockhashProvider
+
+
+class FakeClient:
+    def __init__(self):
+        self.request_count = 0
+
+    def get_recent_blockhash(self, commitment=None):
+        self.request_count += 1
+        return {'result': {'value': {'blockhash': f'hash{self.request_count}'}}}
+
+
+def make_transfer(signer: Account) -> Transaction:
+    return Transaction().add(transfer(TransferParams(from_pubkey=signer.public_key(),
+                                                     to_pubkey=Account().public_key(), lamports=1)))
+
+
+class TestRecentBlockhashProvider(unittest.TestCase):
+    def test_cached_within_ttl(self):
+        client = FakeClient()
+        provider = RecentBlockhashProvider(client, ttl=60, idle_timeout=60)
+        self.assertEqual(provider.get_blockhash(), 'hash1')
+        self.assertEqual(provider.get_blockhash(), 'hash1')
+        self.assertEqual(client.request_count, 1)
+
+    def test_invalidate(self):
+        client = FakeClient()
+        provider = RecentBlockhashProvider(client, ttl=60, idle_timeout=60)
+        self.assertEqual(provider.get_blockhash(), 'hash1')
+        provider.invalidate('unknown')
+        self.assertEqual(provider.get_blockhash(), 'hash1')
+        provider.invalidate('hash1')
+        self.assertEqual(provider.get_blockhash(), 'hash2')
+
+    def test_background_refresh(self):
+        client = FakeClient()
+        provider = RecentBlockhashProvider(client, ttl=0.2, idle_timeout=0.3)
+        provider.get_blockhash()
+        time.sleep(0.35)
+        refreshed_count = client.request_count
+        self.assertGreater(refreshed_count, 1)
+        # The refresher stops after the idle timeout
+        time.sleep(0.5)
+        idle_count = client.request_count
+        time.sleep(0.3)
+        self.assertEqual(client.request_count, idle_count)
+
+    def test_disabled(self):
+        client = FakeClient()
+        provider = RecentBlockhashProvider(client, ttl=0, idle_timeout=60)
+        self.assertEqual(provider.get_blockhash(), 'hash1')
+        self.assertEqual(provider.get_blockhash(), 'hash2')
+
+    def test_resign_with_new_blockhash(self):
+        client = FakeClient()
+        provider = RecentBlockhashProvider(client, ttl=60, idle_timeout=60)
+        provider.NEW_BLOCKHASH_CHECK_DELAY = 0.01
+        signer = Account()
+        trx = make_transfer(signer)
+        self.assertEqual(provider.sign(trx, signer), 'hash1')
+        signature = trx.signature()
+
+        # The same message is signed by a newer blockhash, so it isn't a duplicate
+        self.assertEqual(provider.sign(trx, signer), 'hash2')
+        self.assertNotEqual(trx.signature(), signature)
+        self.assertEqual(provider.get_blockhash(), 'hash2')
+
+        # Another message uses the recent blockhash
+        self.assertEqual(provider.sign(make_transfer(signer), signer), 'hash2')
+        self.assertEqual(provider.get_stats(), {'signatures': 3, 'resigned': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
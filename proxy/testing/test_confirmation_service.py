@@ -0,0 +1,93 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from solana.rpc.api import Client as SolanaClient
+
+from proxy.common_neon.confirmation_service import ConfirmationService
+
+
+class FakeRpc:
+    """Reports a signature as processed on the first check and as confirmed on the next ones"""
+    def __init__(self, fail_count=0):
+        self.fail_count = fail_count
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.rounds = []
+
+    def __call__(self, client, method, params_list):
+        assert method == 'getSignatureStatuses'
+        params_list = list(params_list)
+        with self.lock:
+            self.rounds.append([len(params[0]) for params in params_list])
+            if self.fail_count > 0:
+                self.fail_count -= 1
+                return [{'id': 1, 'result': None} for _ in params_list]
+
+            response = []
+            for (sign_list,) in params_list:
+                value = []
+                for sign in sign_list:
+                    status = 'confirmed' if sign in self.seen else 'processed'
+                    self.seen.add(sign)
+                    value.append({'slot': 1, 'confirmations': 0, 'err': None, 'confirmationStatus': status})
+                response.append({'id': 1, 'result': {'context': {'slot': 1}, 'value': value}})
+            return response
+
+
+class TestConfirmationService(unittest.TestCase):
+    def setUp(self):
+        self.service = ConfirmationService(SolanaClient('http://localhost:1'), batch_size=256, check_delay=0.05)
+
+    def test_merge_callers(self):
+        rpc = FakeRpc()
+        results = []
+
+        def confirm(idx):
+            signatures = [f'sign{idx}_{i}' for i in range(200)]
+            results.append(self.service.confirm(signatures, timeout=5))
+
+        with patch('proxy.common_neon.confirmation_service.send_rpc_batch_request', rpc):
+            threads = [threading.Thread(target=confirm, args=(idx,)) for idx in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(len(rpc.seen), 800)
+        for sign_counts in rpc.rounds:
+            self.assertTrue(all(count <= 256 for count in sign_counts))
+        # Each round checks signatures of all callers, so there are much less rounds than signatures
+        self.assertLess(len(rpc.rounds), 20)
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+        self.assertEqual(self.service.get_stats()['confirmed'], 800)
+
+    def test_same_signature(self):
+        rpc = FakeRpc()
+        with patch('proxy.common_neon.confirmation_service.send_rpc_batch_request', rpc):
+            threads = [threading.Thread(target=self.service.confirm, args=(['sign'], 5)) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertTrue(all(sign_counts == [1] for sign_counts in rpc.rounds))
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+
+    def test_no_result(self):
+        rpc = FakeRpc(fail_count=1000)
+        with patch('proxy.common_neon.confirmation_service.send_rpc_batch_request', rpc):
+            self.assertFalse(self.service.confirm(['sign'], timeout=0.3))
+        # Failed rounds are delayed as well
+        self.assertLess(len(rpc.rounds), 10)
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+
+    def test_recover_after_no_result(self):
+        rpc = FakeRpc(fail_count=2)
+        with patch('proxy.common_neon.confirmation_service.send_rpc_batch_request', rpc):
+            self.assertTrue(self.service.confirm(['sign'], timeout=5))
+        self.assertEqual(self.service.get_stats()['errors'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
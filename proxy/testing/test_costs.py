@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from proxy.common_neon.costs import CostRecorder, SQLCost, operator_cost
+from proxy.indexer.pg_common import pg_pool
+
+
+class BlockedDB:
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches = []
+
+    def insert_batch(self, rows):
+        self.release.wait(5)
+        self.batches.append(rows)
+
+
+def make_row(hash: str, idx: int):
+    return (hash, 5000, 21000, 'sender', 'to_address', f'sig{idx}', 'ok', '')
+
+
+class TestCostRecorder(unittest.TestCase):
+    def test_write_batches(self):
+        hash = os.urandom(32).hex()
+        recorder = CostRecorder(SQLCost(), queue_size=100, batch_size=4, flush_interval=0.2, queue_timeout=1)
+        for idx in range(10):
+            recorder.add(make_row(hash, idx))
+        for _ in range(50):
+            if recorder.get_stats()['written'] == 10:
+                break
+            time.sleep(0.1)
+
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT sig FROM OPERATOR_COST WHERE hash = %s', (hash,))
+            self.assertEqual(sorted(row[0].strip() for row in cursor.fetchall()), sorted(f'sig{idx}' for idx in range(10)))
+        stats = recorder.get_stats()
+        self.assertEqual((stats['added'], stats['queued'], stats['dropped'], stats['failed']), (10, 0, 0, 0))
+        self.assertLess(stats['batches'], 10)
+
+    def test_backpressure(self):
+        db = BlockedDB()
+        recorder = CostRecorder(db, queue_size=2, batch_size=1, flush_interval=0.1, queue_timeout=0.2)
+        recorder.add(make_row('hash', 0))
+        # The writer is blocked by the first row, the next two fill the queue
+        for _ in range(50):
+            if recorder.get_stats()['queued'] == 0:
+                break
+            time.sleep(0.01)
+        recorder.add(make_row('hash', 1))
+        recorder.add(make_row('hash', 2))
+
+        start_time = time.time()
+        recorder.add(make_row('hash', 3))
+        self.assertGreaterEqual(time.time() - start_time, 0.2)
+        stats = recorder.get_stats()
+        self.assertEqual((stats['added'], stats['waits'], stats['dropped']), (3, 1, 1))
+
+        db.release.set()
+        recorder.close(timeout=5)
+        self.assertEqual([row[5] for rows in db.batches for row in rows], ['sig0', 'sig1', 'sig2'])
+        self.assertEqual(recorder.get_stats()['written'], 3)
+
+    def test_close_writes_queued_rows(self):
+        db = BlockedDB()
+        db.release.set()
+        recorder = CostRecorder(db, queue_size=100, batch_size=100, flush_interval=60, queue_timeout=1)
+        for idx in range(5):
+            recorder.add(make_row('hash', idx))
+        recorder.close(timeout=5)
+        self.assertEqual(sum(len(rows) for rows in db.batches), 5)
+        self.assertEqual(recorder.get_stats()['queued'], 0)
+
+
+def add_cost_in_child(hash: str):
+    # The row stays queued until the process exits
+    with patch('proxy.common_neon.costs.OPERATOR_COST_FLUSH_INTERVAL', 60), \
+            patch('proxy.common_neon.costs.OPERATOR_COST_BATCH_SIZE', 100):
+        operator_cost().add(make_row(hash, 0))
+
+
+class TestOperatorCost(unittest.TestCase):
+    def test_flush_at_child_exit(self):
+        hash = os.urandom(32).hex()
+        process = multiprocessing.get_context('fork').Process(target=add_cost_in_child, args=(hash,))
+        process.start()
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT sig FROM OPERATOR_COST WHERE hash = %s', (hash,))
+            self.assertEqual([row[0].strip() for row in cursor.fetchall()], ['sig0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import patch
+
+from proxy.common_neon.emulator_interactor import EmulationCache, get_emulation_key
+
+
+class TestEmulationCache(unittest.TestCase):
+    def test_emulation_key(self):
+        # eth_estimateGas parameters as they come from a client, and the same call from the raw transaction
+        estimate_key = get_emulation_key('0xABcd', '0x1234', '0x60AB', '0x10', 5)
+        send_key = get_emulation_key('abcd', '1234', '60ab', hex(16), 5)
+        self.assertEqual(estimate_key, send_key)
+
+        self.assertEqual(get_emulation_key('deploy', '0x1234', 'None', '', 0),
+                         get_emulation_key('deploy', '1234', '', '0x0', 0))
+        self.assertNotEqual(estimate_key, get_emulation_key('abcd', '1234', '60ab', hex(16), 6))
+
+    def test_ttl(self):
+        cache = EmulationCache(max_entries=10, ttl=1.0)
+        with patch('proxy.common_neon.emulator_interactor.time.time', return_value=100.0):
+            cache.put('a', {'used_gas': 1})
+            cache.put('b', {'used_gas': 2})
+        with patch('proxy.common_neon.emulator_interactor.time.time', return_value=100.5):
+            self.assertEqual(cache.pop('a'), {'used_gas': 1})
+            # An entry is reused only once
+            self.assertIsNone(cache.pop('a'))
+        with patch('proxy.common_neon.emulator_interactor.time.time', return_value=101.5):
+            self.assertIsNone(cache.pop('b'))
+        self.assertEqual(cache.get_stats(), {'entries': 0, 'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3})
+
+    def test_disabled(self):
+        self.assertFalse(EmulationCache(max_entries=0, ttl=1.0).is_enabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from proxy.common_neon.emulator_interactor import call_emulated
+from proxy.common_neon.emulator_pool import EmulatorPool, EmulatorError
+
+STUB_EMULATOR = os.path.join(os.path.dirname(__file__), 'stub_emulator.py')
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestEmulatorPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = EmulatorPool([sys.executable, STUB_EMULATOR], size=2, timeout=5, health_check_interval=0)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+
+    def emulate(self, data):
+        return json.loads(self.pool.call('--token_mint', 'mint', 'sender', 'contract', data, ''))
+
+    def test_call(self):
+        result = self.emulate('0102')
+        self.assertEqual(result['exit_status'], 'succeed')
+        self.assertEqual(result['result'], '0102')
+        self.assertEqual(self.pool.get_stats()['requests'], 1)
+
+    def start_slow_call(self, pool, results):
+        """Starts a request, which is answered after the returned file is created"""
+        release_path = os.path.join(tempfile.mkdtemp(), 'release')
+        data = f'wait:{release_path}'
+
+        def call():
+            try:
+                results[data] = json.loads(pool.call('--token_mint', 'mint', 'sender', 'contract', data, ''))['result']
+            except Exception as err:
+                results[data] = err
+
+        slow = threading.Thread(target=call)
+        slow.start()
+        self.assertTrue(wait_for(lambda: pool.get_stats()['queue_depth'] == 1))
+        return slow, release_path, data
+
+    def test_multiplexing(self):
+        """Fast requests are not blocked by a slow request in the same process"""
+        results = {}
+        slow, release_path, data = self.start_slow_call(self.pool, results)
+        for idx in range(10):
+            results[f'{idx:02x}'] = self.emulate(f'{idx:02x}')['result']
+        self.assertEqual(len(results), 10)
+
+        open(release_path, 'w').close()
+        slow.join()
+        self.assertEqual(results[data], data)
+        self.assertEqual(self.pool.get_stats()['max_queue_depth'], 2)
+
+    def test_call_emulated(self):
+        """eth_call and the senders emulate through the pool, when NEON_EMULATOR_DAEMON is set"""
+        with patch('proxy.common_neon.emulator_interactor.emulator_pool', lambda: self.pool):
+            result = call_emulated('contract', 'sender', '0102', '0x0')
+        self.assertEqual(result['result'], '0102')
+        self.assertEqual(self.pool.get_stats()['requests'], 1)
+
+    def test_restart_on_crash(self):
+        with self.assertRaises(EmulatorError):
+            self.emulate('crash')
+        self.assertEqual(self.emulate('03')['result'], '03')
+        self.assertEqual(self.emulate('04')['result'], '04')
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['alive_workers'], 2)
+        self.assertEqual(stats['restarts'], 1)
+        self.assertEqual(stats['errors'], 1)
+
+    def test_health_check(self):
+        for worker in self.pool._workers:
+            self.assertTrue(worker.ping(timeout=5))
+
+    def test_health_check_skips_busy_worker(self):
+        pool = EmulatorPool([sys.executable, STUB_EMULATOR], size=1, timeout=5, health_check_interval=0.01)
+        pool.PING_TIMEOUT = 0.05
+        self.addCleanup(pool.close)
+        # The worker answers pings, before it is busy
+        self.assertTrue(wait_for(lambda: pool._workers[0].ping(timeout=5)))
+
+        results = {}
+        slow, release_path, data = self.start_slow_call(pool, results)
+        # The worker doesn't answer pings during the slow request, several health checks pass meanwhile
+        self.assertFalse(pool._workers[0].ping(timeout=0.3))
+        open(release_path, 'w').close()
+        slow.join()
+        self.assertEqual(results[data], data)
+        self.assertEqual(pool.get_stats()['restarts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
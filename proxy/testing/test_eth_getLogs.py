@@ -172,14 +172,14 @@ class Test_eth_getLogs(unittest.TestCase):
             'fromBlock': 0,
             'toBlock': 'latest',
             'address': self.storage_contract.address,
-            'topics': self.topics,
+            'topics': [self.topics[0]],
         })
         print('receipts: ', receipts)
         self.assertEqual(len(receipts), 4)
 
     def test_get_logs_by_address(self):
         print("\ntest_get_logs_by_address")
-        receipts = proxy.eth.get_logs({'address': self.storage_contract.address})
+        receipts = proxy.eth.get_logs({'fromBlock': 0, 'address': self.storage_contract.address})
         print('receipts: ', receipts)
         self.assertEqual(len(receipts), 4)
 
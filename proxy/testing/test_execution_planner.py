@@ -0,0 +1,58 @@
+import unittest
+
+from solana.account import Account
+from solana.blockhash import Blockhash
+from solana.publickey import PublicKey
+from solana.transaction import AccountMeta, Transaction, TransactionInstruction
+
+from proxy.common_neon.execution_planner import ExecutionPlanner, get_transaction_size
+
+
+def make_transaction(account_count: int, data_size: int) -> Transaction:
+    keys = [AccountMeta(pubkey=PublicKey(idx + 1), is_signer=False, is_writable=True) for idx in range(account_count)]
+    return Transaction().add(TransactionInstruction(program_id=PublicKey(255), data=bytes(data_size), keys=keys))
+
+
+class TestExecutionPlanner(unittest.TestCase):
+    def setUp(self):
+        self.planner = ExecutionPlanner(noniterative_max_steps=1000)
+
+    def test_transaction_size(self):
+        signer = Account(1)
+        for account_count, data_size in [(1, 10), (10, 300), (20, 400)]:
+            size, accounts = get_transaction_size(make_transaction(account_count, data_size), signer.public_key())
+            trx = make_transaction(account_count, data_size)
+            trx.recent_blockhash = Blockhash(str(PublicKey(3)))
+            trx.sign(signer)
+            self.assertEqual(size, len(trx.serialize()))
+            # Accounts of the instruction, the operator and the program
+            self.assertEqual(accounts, account_count + 2)
+
+        size, _ = get_transaction_size(make_transaction(20, 500), signer.public_key())
+        self.assertGreater(size, self.planner.max_trx_size)
+
+    def test_plan(self):
+        planner = self.planner
+        self.assertEqual(planner.plan(True, 10, 250, 0, 0).strategy, planner.HOLDER)
+        self.assertEqual(planner.plan(False, 10, 250, 1300, 30).strategy, planner.HOLDER)
+        self.assertEqual(planner.plan(False, 2000, 250, 800, 10).strategy, planner.ITERATIVE)
+        self.assertEqual(planner.plan(False, 100000, 250, 800, 10).strategy, planner.HOLDER)
+        self.assertEqual(planner.plan(False, 500, 250, 800, 10).strategy, planner.NONITERATIVE)
+        self.assertEqual(planner.get_stats()['planned'], {'noniterative': 1, 'iterative': 1, 'holder': 3})
+
+    def test_accuracy(self):
+        planner = self.planner
+        plan = planner.plan(False, 500, 250, 800, 10)
+        planner.record(plan, planner.NONITERATIVE)
+        plan = planner.plan(False, 900, 250, 800, 10)
+        planner.record(plan, planner.ITERATIVE)
+
+        stats = planner.get_stats()
+        self.assertEqual(stats['fallbacks'], {'noniterative->iterative': 1})
+        self.assertEqual(stats['accuracy'], 0.5)
+        self.assertEqual(stats['max_noniterative_steps_ok'], 500)
+        self.assertEqual(stats['min_noniterative_steps_failed'], 900)
+
+
+if __name__ == '__main__':
+    unittest.main()
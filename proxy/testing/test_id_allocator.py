@@ -0,0 +1,84 @@
+import multiprocessing
+import select
+import time
+import unittest
+
+from proxy.common_neon.id_allocator import SharedIdAllocator
+
+
+def lease_ids(allocator: SharedIdAllocator, count: int, result):
+    for idx in range(count):
+        result[idx] = allocator.allocate()
+
+
+class TestSharedIdAllocator(unittest.TestCase):
+    def test_allocate_and_free(self):
+        allocator = SharedIdAllocator(4)
+        self.assertEqual([allocator.allocate() for _ in range(4)], [0, 1, 2, 3])
+        self.assertIsNone(allocator.allocate())
+
+        allocator.free(2)
+        allocator.free(1)
+        self.assertEqual(allocator.allocate(), 1)
+        self.assertEqual(allocator.allocate(), 2)
+        self.assertEqual(allocator.get_stats(), {'capacity': 4, 'namespaces': 1, 'max_namespaces': 1, 'used': 4})
+
+    def test_namespaces(self):
+        allocator = SharedIdAllocator(2, max_namespaces=2)
+        self.assertEqual([allocator.allocate(b'operator1') for _ in range(3)], [0, 1, None])
+        self.assertEqual([allocator.allocate(b'operator2') for _ in range(3)], [0, 1, None])
+        with self.assertRaises(RuntimeError):
+            allocator.allocate(b'operator3')
+
+        allocator.free(0, b'operator2')
+        self.assertIsNone(allocator.allocate(b'operator1'))
+        self.assertEqual(allocator.allocate(b'operator2'), 0)
+        self.assertEqual(allocator.get_stats(), {'capacity': 2, 'namespaces': 2, 'max_namespaces': 2, 'used': 4})
+
+    def test_processes(self):
+        allocator = SharedIdAllocator(64)
+        results = [multiprocessing.Array('i', 8) for _ in range(4)]
+        processes = [multiprocessing.Process(target=lease_ids, args=(allocator, 8, result)) for result in results]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        leased = [acc_id for result in results for acc_id in result]
+        self.assertEqual(sorted(leased), list(range(32)))
+        for process, result in zip(processes, results):
+            for acc_id in result:
+                self.assertEqual(allocator.get_owner(acc_id), process.pid)
+
+    def test_reclaim_dead_process(self):
+        allocator = SharedIdAllocator(4)
+        self.assertEqual(allocator.allocate(), 0)
+
+        result = multiprocessing.Array('i', 3)
+        process = multiprocessing.Process(target=lease_ids, args=(allocator, 3, result))
+        process.start()
+        process.join()
+        self.assertEqual(list(result), [1, 2, 3])
+
+        # The child exited without freeing its ids
+        self.assertIn(allocator.allocate(), [1, 2, 3])
+        self.assertEqual(allocator.get_owner(0), multiprocessing.current_process().pid)
+
+    def test_reclaim_zombie(self):
+        allocator = SharedIdAllocator(1)
+        result = multiprocessing.Array('i', 1)
+        process = multiprocessing.Process(target=lease_ids, args=(allocator, 1, result))
+        process.start()
+        # Wait for the exit without reaping the process
+        select.select([process.sentinel], [], [], 10)
+        deadline = time.time() + 5
+        acc_id = allocator.allocate()
+        while acc_id is None and time.time() < deadline:
+            time.sleep(0.01)
+            acc_id = allocator.allocate()
+        self.assertEqual(acc_id, 0)
+        process.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
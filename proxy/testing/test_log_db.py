@@ -0,0 +1,135 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from proxy.common_neon.errors import EthereumError
+from proxy.indexer.blocks_db import SolanaBlockDBInfo
+from proxy.indexer.pg_common import pg_pool
+from proxy.indexer.utils import LogDB
+from proxy.plugin.solana_rest_api import EthereumModel
+
+
+class SeparateLogDB(LogDB):
+    def _create_table_sql(self) -> str:
+        sql = LogDB._create_table_sql(self).replace(self._table_name, 'test_neon_logs')
+        self._table_name = 'test_neon_logs'
+        return sql
+
+
+def make_log(block_number, tx_idx, log_idx, address, topics):
+    return {
+        'address': address,
+        'topics': topics,
+        'data': '0x',
+        'transactionLogIndex': hex(0),
+        'transactionIndex': hex(tx_idx),
+        'logIndex': hex(log_idx),
+        'transactionHash': '0x' + f'{block_number:02x}{tx_idx:02x}'.rjust(64, '0'),
+        'blockHash': '0x' + f'{block_number:02x}'.rjust(64, '0'),
+        'blockNumber': hex(block_number),
+    }
+
+
+ADDR_A = '0x' + 'a' * 40
+ADDR_B = '0x' + 'b' * 40
+TOPIC_1 = '0x' + '1' * 64
+TOPIC_2 = '0x' + '2' * 64
+TOPIC_3 = '0x' + '3' * 64
+
+
+class TestLogs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.testee = SeparateLogDB()
+        with pg_pool().cursor() as cursor:
+            cursor.execute('DELETE FROM test_neon_logs')
+
+        cls.logs = [
+            make_log(1, 0, 0, ADDR_A, [TOPIC_1, TOPIC_2]),
+            make_log(1, 0, 1, ADDR_A, [TOPIC_2, TOPIC_1]),
+            make_log(2, 0, 0, ADDR_B, [TOPIC_1]),
+            make_log(2, 1, 0, ADDR_B, [TOPIC_3, TOPIC_2, TOPIC_1]),
+        ]
+        cls.testee.push_logs(cls.logs[:2], SolanaBlockDBInfo(slot=10, finalized=False))
+        cls.testee.push_logs(cls.logs[:2], SolanaBlockDBInfo(slot=10, finalized=True))
+        cls.testee.push_logs(cls.logs[2:], SolanaBlockDBInfo(slot=11, finalized=True))
+
+    def test_positional_topics(self):
+        self.assertEqual(self.testee.get_logs(topics=[TOPIC_1]), [self.logs[0], self.logs[2]])
+        self.assertEqual(self.testee.get_logs(topics=[None, TOPIC_1]), [self.logs[1]])
+        self.assertEqual(self.testee.get_logs(topics=[[TOPIC_2, TOPIC_3], TOPIC_2]), [self.logs[3]])
+        self.assertEqual(self.testee.get_logs(topics=[]), self.logs)
+        self.assertEqual(self.testee.get_logs(topics=[[TOPIC_1, None], TOPIC_2]), [self.logs[0], self.logs[3]])
+        with self.assertRaises(EthereumError):
+            self.testee.get_logs(topics=[None] * 5)
+
+    def test_filters(self):
+        self.assertEqual(self.testee.get_logs(address=[ADDR_B.upper()]), self.logs[2:])
+        self.assertEqual(self.testee.get_logs(fromBlock=2, toBlock=2), self.logs[2:])
+        self.assertEqual(self.testee.get_logs(blockHash=self.logs[0]['blockHash']), self.logs[:2])
+
+    def test_max_results(self):
+        self.assertEqual(len(self.testee.get_logs(max_results=4)), 4)
+        with self.assertRaises(EthereumError):
+            self.testee.get_logs(max_results=3)
+
+    def test_migrate_from_old_table(self):
+        testee = SeparateLogDB()
+        with pg_pool().cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS test_old_logs')
+            cursor.execute('CREATE TABLE test_old_logs (slot BIGINT, finalized BOOLEAN, topic TEXT, json TEXT)')
+            for log in self.logs:
+                for topic in log['topics']:
+                    cursor.execute('INSERT INTO test_old_logs VALUES (%s, %s, %s, %s)',
+                                   (int(log['blockNumber'], 16), True, topic, json.dumps(log)))
+            cursor.execute('DELETE FROM test_neon_logs')
+
+        testee.migrate_from_old_table('test_old_logs', batch_size=3)
+        self.assertEqual(testee.get_logs(topics=[TOPIC_1]), [self.logs[0], self.logs[2]])
+        self.assertEqual(testee.get_logs(), self.logs)
+
+        with pg_pool().cursor() as cursor:
+            cursor.execute('DROP TABLE test_old_logs')
+
+
+class FakeDB:
+    def __init__(self, last_block_height):
+        self.last_block_height = last_block_height
+        self.requests = []
+
+    def get_last_block_height(self):
+        return self.last_block_height
+
+    def get_logs(self, *args):
+        self.requests.append(args)
+        return []
+
+
+@patch('proxy.plugin.solana_rest_api.GET_LOGS_MAX_BLOCK_RANGE', 100)
+class TestGetLogsRange(unittest.TestCase):
+    def setUp(self):
+        self.model = EthereumModel.__new__(EthereumModel)
+        self.model.db = FakeDB(last_block_height=1000)
+
+    def test_missing_from_block_is_latest(self):
+        self.model.eth_getLogs({})
+        self.model.eth_getLogs({'toBlock': hex(1000)})
+        self.assertEqual([request[:2] for request in self.model.db.requests], [(1000, None), (1000, 1000)])
+
+    def test_from_genesis(self):
+        # Limited only by the number of results
+        for obj in ({'fromBlock': 'earliest'}, {'fromBlock': '0x0', 'address': ADDR_A}, {'fromBlock': 0}):
+            self.model.eth_getLogs(obj)
+        self.assertEqual([request[0] for request in self.model.db.requests], [None, None, None])
+
+    def test_block_range(self):
+        self.model.eth_getLogs({'fromBlock': hex(900)})
+        self.model.eth_getLogs({'blockHash': '0x01'})
+        self.assertEqual(len(self.model.db.requests), 2)
+        for obj in ({'fromBlock': hex(800)}, {'fromBlock': '0x1', 'toBlock': hex(200)}):
+            with self.assertRaises(EthereumError):
+                self.model.eth_getLogs(obj)
+        self.assertEqual(len(self.model.db.requests), 2)
+
+if __name__ == '__main__':
+    unittest.main()
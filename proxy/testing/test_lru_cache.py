@@ -0,0 +1,68 @@
+import unittest
+
+from proxy.common_neon.emulator_interactor import EthCallCache
+from proxy.common_neon.errors import EthereumError
+from proxy.common_neon.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evict_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertIsNone(cache.get('b'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (3, 1, 2))
+
+    def test_bounded_by_size(self):
+        cache = LRUCache(10, sizeof=len)
+        self.assertTrue(cache.put('a', b'12345'))
+        self.assertTrue(cache.put('b', b'1234'))
+        self.assertFalse(cache.put('c', b'12345678901'))
+        self.assertTrue(cache.put('d', b'123'))
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get_stats()['size'], 7)
+        self.assertEqual(cache.pop('b'), b'1234')
+        self.assertEqual(cache.get_stats()['size'], 3)
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        self.assertFalse(cache.put('a', 1))
+        self.assertEqual(len(cache), 0)
+
+
+class TestEthCallCache(unittest.TestCase):
+    def test_invalidate_on_new_block(self):
+        cache = EthCallCache(max_entries=10, max_entry_size=100)
+        key = ('0xfrom', '0xto', '0x70a08231', '')
+        self.assertIsNone(cache.get(key, 1))
+        cache.put(key, 1, '0x01')
+        self.assertEqual(cache.get(key, 1), '0x01')
+        self.assertIsNone(cache.get(key, 2))
+
+    def test_skip_result_of_old_block(self):
+        cache = EthCallCache(max_entries=10, max_entry_size=100)
+        cache.get('key', 2)
+        # The emulation started at block 1 and finished after a request at block 2
+        cache.put('key', 1, '0x01')
+        self.assertIsNone(cache.get('key', 2))
+        self.assertIsNone(cache.get('key', 1))
+
+    def test_cache_revert(self):
+        cache = EthCallCache(max_entries=10, max_entry_size=100)
+        cache.put('key', 1, EthereumError(code=3, message='execution reverted', data='0x'))
+        self.assertIsInstance(cache.get('key', 1), EthereumError)
+
+    def test_entry_size_cap(self):
+        cache = EthCallCache(max_entries=10, max_entry_size=4)
+        cache.put('key', 1, '0x0102')
+        self.assertIsNone(cache.get('key', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+import unittest
+
+from proxy.common_neon.errors import EthereumError
+from proxy.common_neon.mempool import Mempool
+from proxy.common_neon.sender_queue import SenderQueue
+from proxy.indexer.pending_txs_db import PendingTxsDB
+from proxy.indexer.pg_common import pg_notify
+from proxy.indexer.utils import NeonTxInfo
+
+
+def make_neon_tx(addr: str, nonce: int) -> NeonTxInfo:
+    neon_tx = NeonTxInfo()
+    neon_tx.sign = '0x' + os.urandom(32).hex()
+    neon_tx.addr = addr
+    neon_tx.nonce = hex(nonce)
+    return neon_tx
+
+
+class TestMempool(unittest.TestCase):
+    def setUp(self):
+        self.mempool = Mempool(PendingTxsDB(), workers=2, max_size=2, max_age=60)
+        self.addr = '0x' + os.urandom(20).hex()
+
+    def test_pending_transactions(self):
+        release = threading.Event()
+        executed = []
+
+        def execute(neon_tx):
+            release.wait(5)
+            executed.append(neon_tx.sign)
+
+        neon_tx_list = [make_neon_tx(self.addr, nonce) for nonce in (3, 4, 6)]
+        for neon_tx in neon_tx_list[:2]:
+            self.mempool.submit(neon_tx, lambda neon_tx=neon_tx: execute(neon_tx), 3, lambda: 3)
+        with self.assertRaises(EthereumError):
+            self.mempool.submit(neon_tx_list[2], lambda: execute(neon_tx_list[2]), 3, lambda: 3)
+
+        self.assertEqual(self.mempool.get_tx(neon_tx_list[0].sign).nonce, hex(3))
+        self.assertEqual(self.mempool.get_pending_nonce(self.addr.upper(), 3), 5)
+        self.assertEqual(self.mempool.get_pending_nonce(self.addr, 2), 2)
+
+        release.set()
+        for _ in range(50):
+            if self.mempool.get_stats()['size'] == 0:
+                break
+            time.sleep(0.1)
+        self.assertEqual(sorted(executed), sorted(neon_tx.sign for neon_tx in neon_tx_list[:2]))
+        self.assertIsNone(self.mempool.get_tx(neon_tx_list[0].sign))
+        self.assertEqual(self.mempool.get_pending_nonce(self.addr, 3), 3)
+        stats = self.mempool.get_stats()
+        self.assertEqual((stats['accepted'], stats['rejected'], stats['executed']), (2, 1, 2))
+
+    def test_expired_transaction(self):
+        self.mempool.max_age = 0
+        executed = []
+        self.mempool.submit(make_neon_tx(self.addr, 0), lambda: executed.append(True), 0, lambda: 0)
+        for _ in range(50):
+            if self.mempool.get_stats()['size'] == 0:
+                break
+            time.sleep(0.1)
+        self.assertEqual(executed, [])
+        self.assertEqual(self.mempool.get_stats()['expired'], 1)
+
+    def wait_empty(self):
+        for _ in range(50):
+            if self.mempool.get_stats()['size'] == 0:
+                break
+            time.sleep(0.1)
+
+    def test_out_of_order_nonces(self):
+        self.mempool.max_size = 16
+        executed = []
+        nonce_list = [3]
+
+        def execute(nonce):
+            time.sleep(0.05)
+            executed.append(nonce)
+            nonce_list[0] = nonce + 1
+
+        for nonce in (5, 4, 3):
+            self.mempool.submit(make_neon_tx(self.addr, nonce), lambda nonce=nonce: execute(nonce),
+                                3, lambda: nonce_list[0])
+        self.wait_empty()
+        self.assertEqual(executed, [3, 4, 5])
+        stats = self.mempool.get_stats()
+        self.assertEqual((stats['executed'], stats['senders'], stats['parked']), (3, 0, 0))
+
+    def test_future_nonces_do_not_take_threads(self):
+        self.mempool.max_size = 16
+        executed = []
+        # A gap before the nonces of the sender: none of its transactions can be executed
+        for nonce in range(11, 19):
+            self.mempool.submit(make_neon_tx(self.addr, nonce), lambda: executed.append('gap'), 10, lambda: 10)
+        self.assertEqual(self.mempool.get_stats()['parked'], 8)
+
+        other_addr = '0x' + os.urandom(20).hex()
+        self.mempool.submit(make_neon_tx(other_addr, 0), lambda: executed.append('other'), 0, lambda: 0)
+        for _ in range(50):
+            if self.mempool.get_stats()['size'] == 8:
+                break
+            time.sleep(0.02)
+        self.assertEqual(executed, ['other'])
+        self.assertEqual(self.mempool.get_stats()['parked'], 8)
+
+    def test_failed_transaction(self):
+        self.mempool.max_size = 16
+        executed = []
+
+        def fail():
+            raise RuntimeError('failed')
+
+        def get_nonce():
+            return len(executed)
+
+        self.mempool.submit(make_neon_tx(self.addr, 0), fail, 0, get_nonce)
+        self.mempool.submit(make_neon_tx(self.addr, 0), lambda: executed.append(0), 0, get_nonce)
+        self.mempool.submit(make_neon_tx(self.addr, 1), lambda: executed.append(1), 0, get_nonce)
+        self.wait_empty()
+        # The second transaction with the nonce 0 is executed after the first one failed
+        self.assertEqual(executed, [0, 1])
+        self.assertEqual(self.mempool.get_stats()['failed'], 1)
+
+    def test_stale_nonce(self):
+        self.mempool.max_size = 16
+        executed = []
+        self.mempool.submit(make_neon_tx(self.addr, 0), lambda: executed.append(0), 0, lambda: len(executed))
+        self.wait_empty()
+        # The nonce was read before the previous transaction was executed
+        self.mempool.submit(make_neon_tx(self.addr, 1), lambda: executed.append(1), 0, lambda: len(executed))
+        self.wait_empty()
+        self.assertEqual(executed, [0, 1])
+
+    def test_executed_by_other_worker(self):
+        executed = []
+        nonce_list = [0]
+        self.mempool.submit(make_neon_tx(self.addr, 1), lambda: executed.append(1), 0, lambda: nonce_list[0])
+        time.sleep(0.2)
+        self.assertEqual(self.mempool.get_stats()['parked'], 1)
+
+        # Another worker executed the nonce 0
+        nonce_list[0] = 1
+        pg_notify(SenderQueue.CHANNEL, self.addr[2:])
+        self.wait_empty()
+        self.assertEqual(executed, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
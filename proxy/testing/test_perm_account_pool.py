@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+
+from solana.account import Account
+
+from proxy.common_neon.constants import FINALIZED_STORAGE_TAG
+from proxy.common_neon.perm_account_pool import PermAccountPool
+from proxy.common_neon.solana_interactor import AccountInfo
+from proxy.environment import EVM_LOADER_ID
+
+
+class FakeSolanaInteractor:
+    """Keeps created accounts in memory"""
+    def __init__(self):
+        self.operator = Account(1)
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.rpc_count = 0
+
+    def get_operator_key(self):
+        return self.operator.public_key()
+
+    def get_multiple_accounts_info(self, accounts):
+        with self.lock:
+            self.rpc_count += 1
+            return [self.accounts.get(str(account)) for account in accounts]
+
+    def get_multiple_rent_exempt_balances_for_size(self, size_list):
+        with self.lock:
+            self.rpc_count += 1
+        return [1000 for _ in size_list]
+
+    def send_transaction(self, trx, eth_trx, reason=None):
+        with self.lock:
+            self.rpc_count += 1
+            for instr in trx.instructions:
+                self.accounts[str(instr.keys[1].pubkey)] = AccountInfo(FINALIZED_STORAGE_TAG, 1000, EVM_LOADER_ID)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestPermAccountPool(unittest.TestCase):
+    def setUp(self):
+        self.sender = FakeSolanaInteractor()
+        self.pool = PermAccountPool(self.sender, size=2, max_size=4, wait_timeout=5, retry_delay=0.01)
+
+    def test_prepare_in_advance(self):
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['ready'] == 2))
+        self.assertEqual(len(self.sender.accounts), 4)
+
+        rpc_count = self.sender.rpc_count
+        accounts = self.pool.acquire()
+        self.assertEqual(self.sender.rpc_count, rpc_count)
+        self.assertEqual(str(accounts.storage) in self.sender.accounts, True)
+        self.assertEqual(self.pool.get_stats()['in_use'], 1)
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['ready'] == 2))
+
+        self.pool.release(accounts, is_valid=True)
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['ready'] == 3))
+        self.assertEqual(self.pool.get_stats()['in_use'], 0)
+
+    def test_grow_to_max_size(self):
+        acquired = [self.pool.acquire() for _ in range(4)]
+        self.assertEqual(len({accounts.acc_id for accounts in acquired}), 4)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['in_use'], 4)
+        self.assertEqual(stats['created'], 4)
+        self.assertGreaterEqual(stats['waits'], 1)
+
+        self.pool.wait_timeout = 0.1
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+        self.pool.release(acquired[0], is_valid=True)
+        self.assertEqual(self.pool.acquire(), acquired[0])
+
+    def test_revalidate_after_failure(self):
+        accounts = self.pool.acquire()
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['ready'] == 2))
+
+        # The transaction failed in the middle of execution
+        self.sender.accounts[str(accounts.storage)] = AccountInfo(1, 1000, EVM_LOADER_ID)
+        self.pool.release(accounts, is_valid=False)
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['dropped'] >= 1))
+        acquired = [self.pool.acquire() for _ in range(2)]
+        self.assertNotIn(accounts, acquired)
+
+        # The id of the dropped pair is freed, the pair becomes ready as soon as it is valid again
+        self.sender.accounts[str(accounts.storage)] = AccountInfo(FINALIZED_STORAGE_TAG, 1000, EVM_LOADER_ID)
+        self.assertTrue(wait_for(lambda: accounts in self.pool._ready))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+
+import psycopg2
+
+from proxy.indexer.pg_common import PostgresPool, pg_pool, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, \
+    POSTGRES_HOST
+
+
+class TestPostgresPool(unittest.TestCase):
+    def test_reuse_connection(self):
+        pool = PostgresPool(min_size=1, max_size=2, health_check_interval=30)
+        with pool.connection() as conn:
+            first = conn
+        with pool.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        with pool.connection() as conn:
+            self.assertIs(conn, first)
+        stats = pool.get_stats()
+        self.assertEqual((stats['opened'], stats['in_use'], stats['checkouts']), (1, 0, 3))
+
+    def test_wait_for_free_connection(self):
+        pool = PostgresPool(min_size=0, max_size=1, health_check_interval=30)
+        order = []
+
+        def use():
+            with pool.cursor() as cursor:
+                order.append('start')
+                cursor.execute('SELECT pg_sleep(0.2)')
+                order.append('end')
+
+        threads = [threading.Thread(target=use) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['start', 'end', 'start', 'end'])
+        stats = pool.get_stats()
+        self.assertEqual((stats['opened'], stats['max_in_use'], stats['waits']), (1, 1, 1))
+
+    def test_reconnect(self):
+        pool = PostgresPool(min_size=1, max_size=1, health_check_interval=0)
+        with pool.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            backend_pid = cursor.fetchone()[0]
+        admin = psycopg2.connect(dbname=POSTGRES_DB, user=POSTGRES_USER, password=POSTGRES_PASSWORD, host=POSTGRES_HOST)
+        admin.autocommit = True
+        admin.cursor().execute('SELECT pg_terminate_backend(%s)', (backend_pid,))
+        admin.close()
+        time.sleep(0.1)
+
+        with pool.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            self.assertNotEqual(cursor.fetchone()[0], backend_pid)
+        self.assertEqual(pool.get_stats()['reconnects'], 1)
+
+    def test_transaction_rollback(self):
+        with pg_pool().cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS test_pg_pool (value INT)')
+            cursor.execute('DELETE FROM test_pg_pool')
+
+        with self.assertRaises(ZeroDivisionError):
+            with pg_pool().transaction() as cursor:
+                cursor.execute('INSERT INTO test_pg_pool VALUES (1)')
+                1 / 0
+
+        with pg_pool().transaction() as cursor:
+            cursor.execute('INSERT INTO test_pg_pool VALUES (2)')
+
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT value FROM test_pg_pool')
+            self.assertEqual(cursor.fetchall(), [(2,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
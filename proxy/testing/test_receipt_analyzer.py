@@ -0,0 +1,121 @@
+import os
+import unittest
+
+from base58 import b58encode
+
+from proxy.common_neon.receipt_analyzer import analyze_receipt
+from proxy.environment import EVM_LOADER_ID
+from proxy.indexer.utils import NeonTxResultInfo
+
+KECCAK_PROGRAM_ID = 'KeccakSecp256k11111111111111111111111111111'
+
+
+def b58(data: bytes) -> str:
+    return b58encode(data).decode('utf-8')
+
+
+def make_receipt(err=None, logs=None) -> dict:
+    """A combined iteration: the Keccak precompile and an evm_loader instruction with an event and the result"""
+    keys = ['Operator1111111111111111111111111111111111', KECCAK_PROGRAM_ID, EVM_LOADER_ID]
+    iteration_data = bytes.fromhex('0e') + bytes(4) + (250).to_bytes(8, 'little')
+    event = bytes([7]) + bytes(range(20)) + (1).to_bytes(8, 'little') + bytes(32) + b'data'
+    result = bytes([6, 0x11]) + (21000).to_bytes(8, 'little') + bytes.fromhex('beef')
+    if logs is None:
+        logs = [
+            f'Program {EVM_LOADER_ID} invoke [1]',
+            'Program log: iteration',
+            'Program log: Total memory occupied: 1024',
+            f'Program {EVM_LOADER_ID} consumed 180000 of 200000 compute units',
+            f'Program {EVM_LOADER_ID} success',
+        ]
+    return {
+        'slot': 1000,
+        'meta': {
+            'err': err,
+            'preBalances': [100000, 0, 0],
+            'postBalances': [95000, 0, 0],
+            'innerInstructions': [{
+                'index': 1,
+                'instructions': [
+                    {'programIdIndex': 2, 'accounts': [], 'data': b58(event)},
+                    {'programIdIndex': 2, 'accounts': [], 'data': b58(result)},
+                ],
+            }],
+            'logMessages': logs,
+        },
+        'transaction': {
+            'signatures': ['Signature'],
+            'message': {
+                'accountKeys': keys,
+                'instructions': [
+                    {'programIdIndex': 1, 'accounts': [], 'data': b58(os.urandom(12))},
+                    {'programIdIndex': 2, 'accounts': [0], 'data': b58(iteration_data)},
+                ],
+            },
+        },
+    }
+
+
+class TestReceiptAnalyzer(unittest.TestCase):
+    def test_successful_receipt(self):
+        tx = make_receipt()
+        receipt = analyze_receipt(tx)
+        self.assertFalse(receipt.is_error())
+        self.assertFalse(receipt.is_blocked)
+        self.assertEqual((receipt.signature, receipt.slot, receipt.cost), ('Signature', 1000, 5000))
+        self.assertEqual((receipt.used_gas, receipt.iteration_steps), (21000, 250))
+        self.assertIsNone(receipt.measurement_error)
+        self.assertEqual(receipt.measurements, [{
+            'program': EVM_LOADER_ID,
+            'measurements': {'instructions': '180000', 'memory': '1024'},
+            'result': 'success',
+            'data': '0e' + '00' * 4 + (250).to_bytes(8, 'little').hex(),
+        }])
+
+        neon_res = receipt.get_neon_res()
+        self.assertEqual(vars(neon_res), vars(NeonTxResultInfo(tx)))
+        self.assertEqual((neon_res.status, neon_res.gas_used, len(neon_res.logs)), ('0x1', hex(21000), 1))
+        self.assertEqual(vars(receipt.get_neon_res(1)), vars(NeonTxResultInfo(tx, 1)))
+        self.assertFalse(receipt.get_neon_res(0).is_valid())
+
+    def test_rpc_response(self):
+        receipt = analyze_receipt({'jsonrpc': '2.0', 'result': make_receipt()})
+        self.assertEqual(receipt.signature, 'Signature')
+        self.assertEqual(len(receipt.measurements), 1)
+
+    def test_blocked_accounts(self):
+        logs = [f'Program {EVM_LOADER_ID} invoke [1]',
+                'Program log: trying to execute transaction on rw locked account',
+                f'Program {EVM_LOADER_ID} failed: custom program error: 0x5']
+        receipt = analyze_receipt(make_receipt(err={'InstructionError': [1, {'Custom': 5}]}, logs=logs))
+        self.assertTrue(receipt.is_error())
+        self.assertTrue(receipt.is_blocked)
+        self.assertFalse(receipt.is_compute_limit_exceeded())
+        self.assertEqual(receipt.measurements, [])
+
+    def test_compute_limit(self):
+        receipt = analyze_receipt(make_receipt(err={'InstructionError': [1, 'ComputationalBudgetExceeded']}))
+        self.assertTrue(receipt.is_compute_limit_exceeded())
+        self.assertFalse(receipt.is_blocked)
+        self.assertEqual(receipt.iteration_steps, 250)
+
+    def test_send_transaction_error(self):
+        receipt = analyze_receipt({'code': -32002, 'data': {'err': {'InstructionError': [0, {'Custom': 4}]},
+                                                            'logs': ['Program log: storage is empty']}})
+        self.assertTrue(receipt.is_storage_empty())
+        self.assertEqual(receipt.logs, ['Program log: storage is empty'])
+        self.assertIsNone(receipt.signature)
+
+        receipt = analyze_receipt({'err': None, 'logs': ['Program log: ok']})
+        self.assertFalse(receipt.is_error())
+        self.assertEqual(receipt.logs, ['Program log: ok'])
+
+    def test_unexpected_logs(self):
+        receipt = analyze_receipt(make_receipt(logs=[f'Program {EVM_LOADER_ID} invoke [1]',
+                                                     f'Program {EVM_LOADER_ID} success']))
+        self.assertEqual(receipt.measurements, [])
+        self.assertEqual(receipt.measurement_error, "Can't parse measurements for evm_loader")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+
+from solana.rpc.api import Client as SolanaClient
+
+from proxy.indexer.indexer_base import TxReceiptsFetcher
+
+
+class FakeRpc:
+    """Fails batches larger than max_batch_size, returns no receipt for some signatures a few times"""
+    def __init__(self, max_batch_size, missing_counts=None):
+        self.max_batch_size = max_batch_size
+        self.missing_counts = dict(missing_counts or {})
+        self.batch_sizes = []
+
+    def __call__(self, client, method, params_list):
+        params_list = list(params_list)
+        self.batch_sizes.append(len(params_list))
+        if len(params_list) > self.max_batch_size:
+            raise Exception('429 Too Many Requests')
+        response = []
+        for sign, _ in params_list:
+            if self.missing_counts.get(sign, 0) > 0:
+                self.missing_counts[sign] -= 1
+                response.append({'id': 1, 'result': None})
+            else:
+                response.append({'id': 1, 'result': {'sign': sign}})
+        return response
+
+
+class TestTxReceiptsFetcher(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = TxReceiptsFetcher(SolanaClient('http://localhost:1'), concurrency=2, max_batch_size=32,
+                                         max_retries=3, retry_delay=0.01, max_retry_delay=0.05)
+        self.receipts = {}
+
+    def on_receipt(self, sign, trx):
+        self.receipts[sign] = trx
+
+    def test_adaptive_batch_size(self):
+        rpc = FakeRpc(max_batch_size=10)
+        signatures = [f'sign{i}' for i in range(200)]
+        with patch('proxy.indexer.indexer_base.send_rpc_batch_request', rpc):
+            failed = self.fetcher.fetch(signatures, self.on_receipt)
+        self.assertEqual(failed, [])
+        self.assertEqual(set(self.receipts), set(signatures))
+        self.assertLess(self.fetcher.batch_size, 32)
+        self.assertEqual(rpc.batch_sizes[0], 32)
+
+    def test_retry_missing_receipts(self):
+        rpc = FakeRpc(max_batch_size=100, missing_counts={'sign1': 2, 'sign2': 10})
+        with patch('proxy.indexer.indexer_base.send_rpc_batch_request', rpc):
+            failed = self.fetcher.fetch(['sign0', 'sign1', 'sign2'], self.on_receipt)
+        self.assertEqual(failed, ['sign2'])
+        self.assertEqual(set(self.receipts), {'sign0', 'sign1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
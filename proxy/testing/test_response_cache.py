@@ -0,0 +1,86 @@
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from proxy.common_neon.lru_cache import LRUCache
+from proxy.indexer.blocks_db import SolanaBlockDBInfo
+from proxy.indexer.transactions_db import NeonTxDBInfo
+from proxy.indexer.utils import NeonTxInfo, NeonTxResultInfo
+from proxy.plugin.solana_rest_api import EthereumModel, RenderedJson, SolanaProxyPlugin, dumps_response
+
+
+class FakeDB:
+    def __init__(self):
+        self.requests = 0
+        self.txs = {}
+
+    def get_tx_by_neon_sign(self, neon_sign):
+        self.requests += 1
+        return self.txs.get(neon_sign)
+
+
+def make_tx(neon_sign, finalized):
+    neon_tx = NeonTxInfo()
+    neon_tx.sign = neon_sign
+    neon_res = NeonTxResultInfo()
+    neon_res.gas_used = '0x5208'
+    block = SolanaBlockDBInfo(slot=1, finalized=finalized, height=1, hash='0x01')
+    return NeonTxDBInfo(neon_tx=neon_tx, neon_res=neon_res, block=block)
+
+
+class TestDumpsResponse(unittest.TestCase):
+    def test_splice_rendered(self):
+        rendered = RenderedJson(json.dumps({'a': [1, 2], 'b': 'text'}))
+        response = [{'jsonrpc': '2.0', 'id': 1, 'result': rendered},
+                    {'jsonrpc': '2.0', 'id': 2, 'result': 'plain'}]
+        self.assertEqual(json.loads(dumps_response(response)),
+                         [{'jsonrpc': '2.0', 'id': 1, 'result': {'a': [1, 2], 'b': 'text'}},
+                          {'jsonrpc': '2.0', 'id': 2, 'result': 'plain'}])
+
+    def test_without_rendered(self):
+        response = {'jsonrpc': '2.0', 'id': 1, 'result': ['0x1']}
+        self.assertEqual(dumps_response(response), json.dumps(response))
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.model = EthereumModel.__new__(EthereumModel)
+        self.model.db = FakeDB()
+        self.model.request_local = threading.local()
+        self.plugin = SolanaProxyPlugin.__new__(SolanaProxyPlugin)
+        self.plugin.model = self.model
+        self.cache = LRUCache(1024 * 1024, sizeof=len)
+        patcher = patch('proxy.plugin.solana_rest_api.get_response_cache', lambda: self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_receipt(self, neon_sign):
+        request = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_getTransactionReceipt', 'params': [neon_sign]}
+        return self.plugin.process_request(request)['result']
+
+    def test_finalized_receipt(self):
+        self.model.db.txs['0xaa'] = make_tx('0xaa', finalized=True)
+        receipt = self.get_receipt('0xaa')
+        cached = self.get_receipt('0xaa')
+        self.assertIsInstance(cached, RenderedJson)
+        self.assertEqual(json.loads(cached.text), receipt)
+        self.assertEqual(self.model.db.requests, 1)
+
+    def test_model_returns_dicts(self):
+        self.model.db.txs['0xaa'] = make_tx('0xaa', finalized=True)
+        self.get_receipt('0xaa')
+        for _ in range(2):
+            receipt = self.model.eth_getTransactionReceipt('0xAA')
+            self.assertEqual(receipt['blockNumber'], '0x1')
+        self.assertEqual(self.model.db.requests, 3)
+
+    def test_not_finalized_receipt(self):
+        self.model.db.txs['0xbb'] = make_tx('0xbb', finalized=False)
+        self.get_receipt('0xbb')
+        self.assertIsInstance(self.get_receipt('0xbb'), dict)
+        self.assertEqual(self.model.db.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from solana.rpc.api import Client as SolanaClient
+
+from proxy.common_neon.confirmation_service import ConfirmationService
+from proxy.common_neon.solana_interactor import SolanaInteractor
+
+
+class FakeChain:
+    """
+    Sends transactions by names, the signature is the name with the number of the attempt.
+    Signatures in failed_signs are executed with an error, ones in lost_signs are never confirmed,
+    sending of not_sent_signs returns None.
+    """
+    def __init__(self, failed_signs=(), lost_signs=(), not_sent_signs=()):
+        self.failed_signs = set(failed_signs)
+        self.lost_signs = set(lost_signs)
+        self.not_sent_signs = set(not_sent_signs)
+        self.lock = threading.Lock()
+        self.attempts = Counter()
+        self.batches = []
+
+    def send(self, transactions):
+        sign_list = []
+        with self.lock:
+            self.batches.append(len(transactions))
+            for trx in transactions:
+                self.attempts[trx] += 1
+                sign = f'{trx}_{self.attempts[trx]}'
+                sign_list.append(None if sign in self.not_sent_signs else sign)
+        return sign_list
+
+    def rpc(self, client, method, params_list):
+        assert method == 'getSignatureStatuses'
+        response = []
+        for (sign_list,) in params_list:
+            value = []
+            for sign in sign_list:
+                if sign in self.lost_signs:
+                    value.append(None)
+                    continue
+                err = {'InstructionError': [0, {'Custom': 1}]} if sign in self.failed_signs else None
+                value.append({'slot': 1, 'confirmations': 0, 'err': err, 'confirmationStatus': 'confirmed'})
+            response.append({'id': 1, 'result': {'context': {'slot': 1}, 'value': value}})
+        return response
+
+
+class TestSendPipelined(unittest.TestCase):
+    def setUp(self):
+        self.interactor = SolanaInteractor(None, SolanaClient('http://localhost:1'))
+        self.service = ConfirmationService(self.interactor.client, batch_size=256, check_delay=0.01)
+        self.interactor.confirmation_service = self.service
+
+    def send_pipelined(self, chain, transactions, window, max_attempts, reason=None):
+        with patch.object(self.interactor, 'send_multiple_transactions_unconfirmed', chain.send), \
+                patch('proxy.common_neon.confirmation_service.send_rpc_batch_request', chain.rpc), \
+                patch('proxy.common_neon.solana_interactor.CONFIRMATION_TIMEOUT', 0.3):
+            return self.interactor.send_pipelined(transactions, window, max_attempts, reason=reason)
+
+    def test_resend_lost_transactions(self):
+        transactions = [f'trx{idx}' for idx in range(30)]
+        chain = FakeChain(lost_signs=['trx7_1'], not_sent_signs=['trx5_1'])
+        result = self.send_pipelined(chain, transactions, window=8, max_attempts=3)
+
+        expected = [f'{trx}_2' if trx in ('trx5', 'trx7') else f'{trx}_1' for trx in transactions]
+        self.assertEqual(result.signatures, expected)
+        self.assertEqual(result.sent, 32)
+        self.assertEqual(result.max_in_flight, 8)
+        self.assertEqual(chain.batches[0], 8)
+        self.assertTrue(all(size <= 8 for size in chain.batches))
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+
+    def test_fail_on_error(self):
+        # An error of the program repeats on a resend
+        chain = FakeChain(failed_signs=['trx1_1'])
+        with self.assertRaises(RuntimeError):
+            self.send_pipelined(chain, ['trx0', 'trx1', 'trx2'], window=2, max_attempts=3)
+        self.assertEqual(chain.attempts['trx1'], 1)
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+
+    def test_max_attempts(self):
+        chain = FakeChain(lost_signs=[f'trx1_{attempt}' for attempt in range(1, 4)])
+        with self.assertRaises(RuntimeError):
+            self.send_pipelined(chain, ['trx0', 'trx1', 'trx2'], window=2, max_attempts=3)
+        self.assertEqual(chain.attempts['trx1'], 3)
+        self.assertEqual(self.service.get_stats()['pending'], 0)
+
+    def test_cost_reason(self):
+        chain = FakeChain()
+        with patch('proxy.common_neon.solana_interactor.WRITE_TRANSACTION_COST_IN_DB', True), \
+                patch('proxy.common_neon.solana_interactor.analyze_receipt', lambda transaction: transaction), \
+                patch('proxy.common_neon.solana_interactor.update_transaction_cost') as update_transaction_cost, \
+                patch.object(self.interactor, 'get_multiple_confirmed_transactions', lambda sign_list: sign_list):
+            self.send_pipelined(chain, ['trx0'], window=1, max_attempts=1, reason='WriteHolder')
+        update_transaction_cost.assert_called_once_with('trx0_1', None, reason='WriteHolder')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import unittest
+
+from proxy.common_neon.sender_queue import SenderQueue
+from proxy.indexer.pg_common import pg_pool
+from proxy.indexer.sender_locks_db import SenderLocksDB
+
+
+class FakeSender:
+    def __init__(self):
+        self.address = os.urandom(20).hex()
+        self.nonce = 0
+        self.executed = []
+
+    def execute(self, queue: SenderQueue, nonce: int):
+        with queue.ordered(self.address, nonce, lambda: self.nonce) as current_nonce:
+            if current_nonce != nonce:
+                self.executed.append(('rejected', nonce))
+                return
+            time.sleep(0.05)
+            self.executed.append(('executed', nonce))
+            self.nonce += 1
+
+
+class TestSenderQueue(unittest.TestCase):
+    def setUp(self):
+        self.locks_db = SenderLocksDB()
+        self.queue = SenderQueue(self.locks_db, queue_timeout=5, max_gap=4, lock_timeout=10)
+        self.sender = FakeSender()
+
+    def run_in_threads(self, nonce_list):
+        threads = []
+        for nonce in nonce_list:
+            threads.append(threading.Thread(target=self.sender.execute, args=(self.queue, nonce)))
+            threads[-1].start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+
+    def test_out_of_order_nonces(self):
+        self.run_in_threads([2, 1, 0])
+        self.assertEqual(self.sender.executed, [('executed', 0), ('executed', 1), ('executed', 2)])
+        self.assertEqual(self.queue.get_stats()['queued'], 2)
+        self.assertEqual(self.queue.get_stats()['waiting_senders'], 0)
+
+    def test_same_nonce(self):
+        # The second transaction sees the nonce of the first one only after it is executed
+        self.run_in_threads([0, 0])
+        self.assertEqual(self.sender.executed, [('executed', 0), ('rejected', 0)])
+
+    def test_gap(self):
+        start_time = time.time()
+        self.sender.execute(self.queue, 5)
+        self.assertEqual(self.sender.executed, [('rejected', 5)])
+        self.assertLess(time.time() - start_time, 1)
+
+        self.queue.queue_timeout = 0.2
+        self.sender.execute(self.queue, 1)
+        self.assertEqual(self.sender.executed, [('rejected', 5), ('rejected', 1)])
+        self.assertGreaterEqual(self.queue.get_stats()['max_wait_time'], 0.2)
+
+    def test_failed_transaction(self):
+        def fail():
+            with self.queue.ordered(self.sender.address, 0, lambda: self.sender.nonce):
+                time.sleep(0.1)
+                self.sender.nonce += 1
+                raise RuntimeError('failed after execution')
+
+        thread = threading.Thread(target=lambda: self.assertRaises(RuntimeError, fail))
+        thread.start()
+        time.sleep(0.02)
+        start_time = time.time()
+        self.sender.execute(self.queue, 1)
+        thread.join()
+        self.assertEqual(self.sender.executed, [('executed', 1)])
+        self.assertLess(time.time() - start_time, 2)
+
+    def test_no_connection_while_executing(self):
+        with self.queue.ordered(self.sender.address, 0, lambda: self.sender.nonce) as nonce:
+            self.assertEqual(nonce, 0)
+            self.assertEqual(pg_pool().get_stats()['in_use'], 0)
+            self.assertEqual(self.queue.get_stats()['locked_senders'], 1)
+        self.assertEqual(self.queue.get_stats()['locked_senders'], 0)
+
+    def test_leased_by_other_worker(self):
+        sender = self.sender.address
+        self.assertTrue(self.locks_db.try_lock(sender, 'other', lock_timeout=10))
+        threading.Timer(0.3, lambda: self.locks_db.unlock(sender, 'other', SenderQueue.CHANNEL, sender)).start()
+
+        start_time = time.time()
+        self.sender.execute(self.queue, 0)
+        self.assertEqual(self.sender.executed, [('executed', 0)])
+        self.assertGreaterEqual(time.time() - start_time, 0.3)
+        self.assertLess(time.time() - start_time, 2)
+
+    def test_expired_lease(self):
+        sender = self.sender.address
+        self.assertTrue(self.locks_db.try_lock(sender, 'dead', lock_timeout=10))
+        self.queue.lock_timeout = 0.3
+        self.queue.LOCK_POLL_INTERVAL = 0.1
+        self.sender.execute(self.queue, 0)
+        self.assertEqual(self.sender.executed, [('executed', 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
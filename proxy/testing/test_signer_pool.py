@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+from solana.account import Account as sol_Account
+from unittest.mock import MagicMock
+
+from proxy.common_neon.signer_pool import SignerPool, read_keypair_dir
+
+
+class TestSignerPool(unittest.TestCase):
+    def setUp(self):
+        self.signers = [sol_Account(bytes([idx + 1] * 32)) for idx in range(3)]
+        self.client = MagicMock()
+
+    def test_least_in_flight(self):
+        pool = SignerPool(self.signers, self.client)
+        with pool.signer() as first:
+            with pool.signer() as second:
+                with pool.signer() as third:
+                    self.assertEqual([first, second, third], self.signers)
+            # Only the first operator is busy, round-robin order continues from it to the second one
+            with pool.signer() as fourth:
+                self.assertIs(fourth, self.signers[1])
+
+        stats = pool.get_stats()[str(self.signers[1].public_key())]
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_start_index(self):
+        pool = SignerPool(self.signers, self.client, start_index=4)
+        with pool.signer() as signer:
+            self.assertIs(signer, self.signers[1])
+
+    def test_errors_and_balances(self):
+        pool = SignerPool(self.signers[:1], self.client)
+        with self.assertRaises(RuntimeError):
+            with pool.signer():
+                raise RuntimeError('failed transaction')
+
+        self.client.get_balance.return_value = {'result': {'value': 42}}
+        pool.update_balances()
+        stats = pool.get_stats()[str(self.signers[0].public_key())]
+        self.assertEqual((stats['requests'], stats['errors'], stats['balance']), (1, 1, 42))
+
+    def test_read_keypair_dir(self):
+        with tempfile.TemporaryDirectory() as path:
+            for name, signer in zip(['b.json', 'a.json', 'c.json'], self.signers):
+                with open(os.path.join(path, name), 'w') as file:
+                    json.dump(list(signer.secret_key()) + [0] * 32, file)
+            with open(os.path.join(path, 'a-copy.json'), 'w') as file:
+                json.dump(list(self.signers[1].secret_key()) + [0] * 32, file)
+
+            signers = read_keypair_dir(path)
+        self.assertEqual([signer.public_key() for signer in signers],
+                         [self.signers[1].public_key(), self.signers[0].public_key(), self.signers[2].public_key()])
+
+
+if __name__ == '__main__':
+    unittest.main()
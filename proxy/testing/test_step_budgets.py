@@ -0,0 +1,97 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from proxy.common_neon.step_budgets import StepBudgets, get_iteration_steps
+from proxy.indexer.pg_common import pg_pool
+from proxy.indexer.step_budgets_db import StepBudgetsDB
+
+
+def make_measurement(tag: str, steps: int, compute_units: int):
+    data = tag + '01000000' + steps.to_bytes(8, byteorder='little').hex()
+    return {'program': 'evm_loader', 'measurements': {'instructions': str(compute_units), 'memory': '0'},
+            'result': 'success', 'data': data}
+
+
+class TestStepBudgets(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = StepBudgetsDB()
+
+    def setUp(self):
+        self.budgets = StepBudgets(self.db, compute_units=180000, min_steps=50, max_steps=1000)
+        self.contract = os.urandom(20)
+
+    def tearDown(self):
+        with pg_pool().cursor() as cursor:
+            cursor.execute('DELETE FROM neon_step_budgets WHERE contract = %s', (self.contract.hex(),))
+
+    def submit(self, iterations=(), compute_limit_steps=None):
+        sample = self.budgets.new_sample(self.contract)
+        for measurement in iterations:
+            sample.on_iteration([measurement])
+        sample.on_compute_limit(compute_limit_steps)
+        self.budgets.submit(sample)
+        self.budgets._queue.join()
+
+    def get_samples(self):
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT samples FROM neon_step_budgets WHERE contract = %s', (self.contract.hex(),))
+            return cursor.fetchone()[0]
+
+    def test_iteration_steps(self):
+        self.assertEqual(get_iteration_steps(make_measurement('0d', 250, 0)['data']), 250)
+        self.assertEqual(get_iteration_steps(make_measurement('0E', 300, 0)['data'] + '05' * 8), 300)
+        self.assertIsNone(get_iteration_steps('05' + '01000000' + 'ff' * 8))
+
+    def test_learn_from_iterations(self):
+        self.assertEqual(self.budgets.get_steps(self.contract, 250), 250)
+        self.assertEqual(self.budgets.get_steps(None, 250), 250)
+
+        # A light contract: 200 CU per step, all iterations of a transaction are one sample
+        self.submit([make_measurement('0d', 250, 50000), make_measurement('0e', 250, 50000)])
+        self.assertEqual(self.budgets.get_steps(self.contract, 250), 900)
+        self.assertEqual(self.get_samples(), 1)
+        for _ in range(10):
+            self.submit([make_measurement('0e', 250, 25000)])
+        self.assertEqual(self.budgets.get_steps(self.contract, 250), 1000)
+
+    def test_compute_limit(self):
+        self.submit([make_measurement('0d', 250, 125000)])
+        self.assertEqual(self.budgets.get_steps(self.contract, 250), 360)
+
+        self.submit(compute_limit_steps=300)
+        steps = self.budgets.get_steps(self.contract, 250)
+        self.assertLess(steps, 300)
+        self.assertGreaterEqual(steps, 50)
+
+    def test_empty_sample(self):
+        self.submit()
+        self.assertEqual(self.budgets.get_steps(self.contract, 250), 250)
+
+    def test_cached_reads(self):
+        self.submit([make_measurement('0d', 250, 125000)])
+        budgets = StepBudgets(self.db, compute_units=180000, min_steps=50, max_steps=1000)
+        with patch.object(self.db, 'get_cu_per_step', wraps=self.db.get_cu_per_step) as get_cu_per_step:
+            for _ in range(3):
+                self.assertEqual(budgets.get_steps(self.contract, 250), 360)
+            self.assertEqual(get_cu_per_step.call_count, 1)
+
+    def test_concurrent_updates(self):
+        # Samples from other workers aren't lost
+        workers = [StepBudgets(self.db, compute_units=180000, min_steps=50, max_steps=1000) for _ in range(4)]
+
+        def update(budgets):
+            for _ in range(5):
+                sample = budgets.new_sample(self.contract)
+                sample.on_iteration([make_measurement('0d', 250, 50000)])
+                budgets.update(sample)
+
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            list(executor.map(update, workers))
+        self.assertEqual(self.get_samples(), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 from unittest import TestCase
 from proxy.indexer.trx_receipts_storage import TrxReceiptsStorage
+from proxy.indexer.pg_common import encode, encode_json, migrate_to_json, pg_pool
 from random import randint
 from base58 import b58encode
 
@@ -68,4 +69,80 @@ class TestTrxReceiptsStorage(TestCase):
         # query in descending order
         retrieved_trxs = [item for item in self.testee.get_trxs(start_slot, True)]
         self.assertLessEqual(retrieved_trxs[0][0], max_slot)
-        self.assertGreaterEqual(retrieved_trxs[-1][0], start_slot)
\ No newline at end of file
+        self.assertGreaterEqual(retrieved_trxs[-1][0], start_slot)
+    def test_buffered_write(self):
+        """
+        Test receipts are written by batches and on flush
+        """
+        testee = TrxReceiptsStorage('test_storage', write_batch_size=10, write_interval=3600)
+        testee.clear()
+
+        for idx in range(15):
+            signature = self.create_signature()
+            testee.add_trx(idx, signature, {'slot': idx, 'signature': signature})
+            self.assertTrue(testee.contains(idx, signature))
+
+        self.assertEqual(testee.size(), 10)
+        self.assertEqual(testee.max_known_trx()[0], 9)
+
+        testee.flush()
+        self.assertEqual(testee.size(), 15)
+        self.assertEqual(testee.max_known_trx()[0], 14)
+
+    def test_query_range(self):
+        """
+        Test get_trxs streams receipts in the slot range by small batches
+        """
+        testee = TrxReceiptsStorage('test_storage', read_batch_size=3)
+        testee.clear()
+        for slot in range(20):
+            signature = self.create_signature()
+            testee.add_trx(slot, signature, {'slot': slot, 'signature': signature})
+
+        retrieved_slots = [item[0] for item in testee.get_trxs(5, False, end_slot=14)]
+        self.assertEqual(retrieved_slots, list(range(5, 15)))
+
+        retrieved_slots = [item[0] for item in testee.get_trxs(15, True)]
+        self.assertEqual(retrieved_slots, list(range(19, 14, -1)))
+
+    def test_migrate_pickled_receipts(self):
+        """
+        Test receipts stored by pickle are readable and are converted to the JSON encoding
+        """
+        self.testee.clear()
+        signature = self.create_signature()
+        trx = {'slot': 1, 'signature': signature, 'meta': {'err': None, 'logMessages': ['Program log: 1']}}
+        with pg_pool().cursor() as cursor:
+            cursor.execute('INSERT INTO test_storage (slot, signature, trx) VALUES (%s, %s, %s)',
+                           (1, signature, encode(trx)))
+        self.testee.add_trx(2, signature, trx)
+
+        self.assertEqual([item[2] for item in self.testee.get_trxs()], [trx, trx])
+
+        self.testee.migrate_encoding()
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT get_byte(trx, 0) FROM test_storage ORDER BY slot')
+            self.assertEqual(cursor.fetchall(), [(1,), (1,)])
+        self.assertEqual([item[2] for item in self.testee.get_trxs()], [trx, trx])
+
+    def test_migrate_by_batches(self):
+        """
+        Test pickled receipts are converted by batches, which walk the primary key, and JSON values are kept as is
+        """
+        self.testee.clear()
+        trx_list = [{'slot': slot, 'signature': self.create_signature()} for slot in range(1, 8)]
+        with pg_pool().cursor() as cursor:
+            for trx in trx_list:
+                value = encode_json(trx) if trx['slot'] == 3 else encode(trx)
+                cursor.execute('INSERT INTO test_storage (slot, signature, trx) VALUES (%s, %s, %s)',
+                               (trx['slot'], trx['signature'], value))
+
+        self.assertEqual(migrate_to_json('test_storage', ['slot', 'signature'], 'trx', batch_size=2), 6)
+        self.assertEqual(migrate_to_json('test_storage', ['slot', 'signature'], 'trx', batch_size=2), 0)
+        with pg_pool().cursor() as cursor:
+            cursor.execute('SELECT get_byte(trx, 0) FROM test_storage ORDER BY slot')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [1] * 7)
+            cursor.execute("SELECT convert_from(substring(trx from 2), 'UTF8')::jsonb->>'signature' "
+                           "FROM test_storage WHERE slot = 1")
+            self.assertEqual(cursor.fetchone()[0], trx_list[0]['signature'])
+        self.assertEqual([item[2] for item in self.testee.get_trxs()], trx_list)
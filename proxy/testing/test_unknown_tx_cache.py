@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+import unittest
+
+from proxy.indexer.blocks_db import SolanaBlocksDB
+from proxy.indexer.indexer_db import IndexerDB, NEON_TX_STORED_CHANNEL
+from proxy.indexer.pg_common import pg_notify
+from proxy.indexer.transactions_db import NeonTxDBInfo
+from proxy.indexer.utils import NeonTxInfo, NeonTxResultInfo
+from proxy.testing.benchmark_block_body import make_block, remove_blocks
+
+TEST_SLOT = 2 ** 62 - 200
+
+
+class FakeNeonTxsDB:
+    def __init__(self):
+        self.txs = {}
+        self.request_count = 0
+
+    def get_tx_by_neon_sign(self, neon_sign):
+        self.request_count += 1
+        return self.txs.get(neon_sign)
+
+
+def make_tx(neon_sign: str) -> NeonTxDBInfo:
+    neon_tx = NeonTxInfo()
+    neon_tx.sign = neon_sign
+    neon_res = NeonTxResultInfo()
+    neon_res.slot = TEST_SLOT
+    return NeonTxDBInfo(neon_tx=neon_tx, neon_res=neon_res)
+
+
+class TestUnknownTxCache(unittest.TestCase):
+    def setUp(self):
+        SolanaBlocksDB().set_block(make_block(TEST_SLOT, 0))
+        self.db = IndexerDB(client=None)
+        self.txs_db = FakeNeonTxsDB()
+        self.db._txs_db = self.txs_db
+        self.neon_sign = '0x' + os.urandom(32).hex()
+
+    def tearDown(self):
+        remove_blocks(TEST_SLOT, TEST_SLOT)
+
+    def test_unknown_tx_is_cached(self):
+        self.assertIsNone(self.db.get_tx_by_neon_sign(self.neon_sign))
+        self.assertIsNone(self.db.get_tx_by_neon_sign(self.neon_sign))
+        self.assertEqual(self.txs_db.request_count, 1)
+
+        self.db.forget_unknown_tx(self.neon_sign)
+        self.txs_db.txs[self.neon_sign] = make_tx(self.neon_sign)
+        tx = self.db.get_tx_by_neon_sign(self.neon_sign)
+        self.assertEqual(tx.neon_tx.sign, self.neon_sign)
+        self.assertEqual(tx.block.slot, TEST_SLOT)
+        self.assertEqual(self.txs_db.request_count, 2)
+
+    def test_notification_drops_unknown_tx(self):
+        self.assertIsNone(self.db.get_tx_by_neon_sign(self.neon_sign))
+        self.txs_db.txs[self.neon_sign] = make_tx(self.neon_sign)
+
+        # The listener connects in background, so notify until it receives a notification
+        deadline = time.time() + 5
+        while self.neon_sign in self.db._unknown_txs and time.time() < deadline:
+            pg_notify(NEON_TX_STORED_CHANNEL, self.neon_sign)
+            time.sleep(0.1)
+        self.assertIsNotNone(self.db.get_tx_by_neon_sign(self.neon_sign))
+
+    def test_wait_for_stored_tx(self):
+        def store_tx():
+            time.sleep(0.3)
+            self.txs_db.txs[self.neon_sign] = make_tx(self.neon_sign)
+            pg_notify(NEON_TX_STORED_CHANNEL, self.neon_sign)
+
+        threading.Thread(target=store_tx).start()
+        start_time = time.time()
+        tx = self.db.wait_for_tx_by_neon_sign(self.neon_sign, 10)
+        self.assertEqual(tx.neon_tx.sign, self.neon_sign)
+        self.assertLess(time.time() - start_time, 3)
+        self.assertEqual(self.db._tx_waiters, {})
+
+    def test_wait_timeout(self):
+        start_time = time.time()
+        self.assertIsNone(self.db.wait_for_tx_by_neon_sign(self.neon_sign, 0.3))
+        self.assertGreaterEqual(time.time() - start_time, 0.3)
+        self.assertEqual(self.db._tx_waiters, {})
+
+
+if __name__ == '__main__':
+    unittest.main()